@@ -1,4 +1,5 @@
 import logging
+import time
 from typing import Optional, Tuple
 
 from app.domain.entities.authorized_keys import AuthorizedKeysBuilder
@@ -10,32 +11,66 @@ from pydantic import BaseModel
 class AuthResponse(BaseModel):
     allowed: bool
     authorized_keys_entry: Optional[str] = None
+    expires_at: Optional[int] = None
+    signature: Optional[str] = None
+    ssh_certificate: Optional[str] = None
+    session_ticket: Optional[str] = None
+    serial_id: Optional[str] = None
 
 
 class AuthenticateService:
     def __init__(self,
                  certificate_repository: CertificateRepository,
                  authorized_keys_builder: AuthorizedKeysBuilder,
-                 logger: logging.Logger = logging.getLogger(__name__)):
+                 logger: logging.Logger = logging.getLogger(__name__),
+                 decision_signer=None,
+                 ssh_certificate_issuer=None,
+                 session_ticket_service=None,
+                 fingerprint_index=None,
+                 audit_log=None):
         self.certificate_repository = certificate_repository
         self.authorized_keys_builder = authorized_keys_builder
         self.logger = logger
+        # Optional DecisionSigner; when set, positive decisions are signed
+        self.decision_signer = decision_signer
+        # Optional SSHCertificateIssuer; when set, allowed logins get an OpenSSH user certificate
+        self.ssh_certificate_issuer = ssh_certificate_issuer
+        # Optional SessionTicketService; when set, allowed logins get a ticket for repeat logins
+        self.session_ticket_service = session_ticket_service
+        # Optional KeyFingerprintIndex, needed by authenticate_key
+        self.fingerprint_index = fingerprint_index
+        # Optional AuditLog; when set, every decision is recorded
+        self.audit_log = audit_log
 
     def authenticate(self, serial_id: str, username: str) -> Tuple[AuthResponse, dict]:
-        isRevoked, err = self.certificate_repository.is_revoked(serial_id)
+        if self.audit_log is None:
+            return self._authenticate(serial_id, username, {})
+        started = time.perf_counter()
+        audit = {"serial": serial_id, "user": username, "cn": None, "role": None}
+        response, err = self._authenticate(serial_id, username, audit)
         if err:
-            return None, {"error": "is_revoked call failed", "detail": err}
-        if isRevoked:
-            return AuthResponse(allowed=False), None
-
-        certificate, err = self.certificate_repository.get_certificate(
-            serial_id)
+            audit["outcome"] = "error"
+            audit["reason"] = err.get("error")
+        else:
+            audit["outcome"] = "allow" if response.allowed else "deny"
+        audit["latency_ms"] = round((time.perf_counter() - started) * 1000, 3)
+        self.audit_log.submit(audit)
+        return response, err
 
+    def _authenticate(self, serial_id: str, username: str, audit: dict) -> Tuple[AuthResponse, dict]:
+        status, err = self.certificate_repository.get_certificate_status(serial_id)
         if err:
-            return None, {"error": "get_certificate failed", "detail": err}
+            return None, err
+        if status.revoked:
+            audit["reason"] = "revoked"
+            return AuthResponse(allowed=False), None
+        certificate = status.certificate
 
+        audit["cn"] = certificate.subject_components.get("CN")
+        audit["role"] = certificate.subject_components.get("role")
         if certificate.is_expired():
             self.logger.info("Certificate is expired")
+            audit["reason"] = "expired"
             return AuthResponse(allowed=False), None
         self.logger.debug("Certificate role: %s",
                           certificate.subject_components["role"])
@@ -45,6 +80,7 @@ class AuthenticateService:
         roles_str = certificate.subject_components["role"] # Toma el rol del certicado
         roles = [role.strip() for role in roles_str.split(",")] # Puede tener mas de un rol
         if username not in roles: # Revisa si el nombre del usuario destino corresponde al rol de acceso
+            audit["reason"] = "role"
             return AuthResponse(allowed=False), None # Lo rechaza si corresponde
         user_role = username # Establece el Rol
         try:
@@ -57,4 +93,46 @@ class AuthenticateService:
             )
         except Exception as e:
             return None, {"error": "authorized_keys_builder failed", "detail": str(e)}
-        return AuthResponse(allowed=True, authorized_keys_entry=authorized_keys_entry), None
+        ssh_certificate = None
+        if self.ssh_certificate_issuer is not None:
+            try:
+                # Principals are every role of the certificate, not only the requested one
+                ssh_certificate = self.ssh_certificate_issuer.issue(
+                    certificate, [role for role in roles if role])
+            except Exception as e:
+                return None, {"error": "ssh_certificate_issuer failed", "detail": str(e)}
+        session_ticket = None
+        if self.session_ticket_service is not None:
+            try:
+                session_ticket = self.session_ticket_service.issue(
+                    serial_id, user_role, certificate.public_key.ssh_fingerprint(),
+                    certificate.expiry_date)
+            except Exception as e:
+                return None, {"error": "session_ticket_service failed", "detail": str(e)}
+        response = AuthResponse(allowed=True, authorized_keys_entry=authorized_keys_entry,
+                                ssh_certificate=ssh_certificate, session_ticket=session_ticket)
+        if self.decision_signer is not None:
+            response = self.decision_signer.sign(serial_id, username, response)
+        return response, None
+
+    def authenticate_key(self, fingerprint: str, username: str) -> Tuple[AuthResponse, dict]:
+        """
+        Validates a login from the SSH key fingerprint alone. Each certificate
+        carrying the key is tried, latest expiry first, until one is allowed;
+        the response names its serial.
+        """
+        if self.fingerprint_index is None:
+            return None, {"error": "fingerprint index not configured"}
+        last_err = None
+        denied = False
+        for serial_id in self.fingerprint_index.serials(fingerprint):
+            response, err = self.authenticate(serial_id, username)
+            if err:
+                last_err = err
+                continue
+            if response.allowed:
+                return response.model_copy(update={"serial_id": serial_id}), None
+            denied = True
+        if last_err is not None and not denied:
+            return None, last_err
+        return AuthResponse(allowed=False), None
@@ -0,0 +1,63 @@
+import hashlib
+import hmac
+import json
+import time
+from typing import Callable, Optional
+
+from app.application.authenticate_service import AuthResponse
+
+
+class DecisionSigner:
+    """
+    Signs positive auth decisions with HMAC-SHA256 and an expiry so that
+    bastions can verify them offline and honour them while the server is down.
+    """
+
+    def __init__(self, secret: bytes, ttl_seconds: int,
+                 clock: Callable[[], float] = time.time):
+        if not secret:
+            raise ValueError("Decision signing secret must not be empty")
+        if ttl_seconds <= 0:
+            raise ValueError("Decision signing ttl_seconds must be positive")
+        self.secret = secret
+        self.ttl_seconds = ttl_seconds
+        self._clock = clock
+
+    @classmethod
+    def from_file(cls, secret_path: str, ttl_seconds: int) -> "DecisionSigner":
+        with open(secret_path, "rb") as file:
+            return cls(file.read().strip(), ttl_seconds)
+
+    def sign(self, serial_id: str, username: str, response: AuthResponse) -> AuthResponse:
+        """Returns a copy of the response carrying expires_at and signature."""
+        expires_at = int(self._clock()) + self.ttl_seconds
+        signature = self.signature(serial_id, username, response.allowed,
+                                   response.authorized_keys_entry, expires_at)
+        return response.model_copy(update={"expires_at": expires_at, "signature": signature})
+
+    def verify(self, serial_id: str, username: str, response: AuthResponse) -> bool:
+        if response.signature is None or response.expires_at is None:
+            return False
+        if response.expires_at <= self._clock():
+            return False
+        expected = self.signature(serial_id, username, response.allowed,
+                                  response.authorized_keys_entry, response.expires_at)
+        return hmac.compare_digest(expected, response.signature)
+
+    def signature(self, serial_id: str, username: str, allowed: bool,
+                  authorized_keys_entry: Optional[str], expires_at: int) -> str:
+        payload = canonical_decision(serial_id, username, allowed,
+                                     authorized_keys_entry, expires_at)
+        return hmac.new(self.secret, payload, hashlib.sha256).hexdigest()
+
+
+def canonical_decision(serial_id: str, username: str, allowed: bool,
+                       authorized_keys_entry: Optional[str], expires_at: int) -> bytes:
+    """
+    Canonical byte encoding of a decision. The PAM side (pam-client/grace_cache.py)
+    must encode decisions exactly the same way to verify signatures.
+    """
+    return json.dumps(
+        [serial_id.upper(), username, allowed, authorized_keys_entry, expires_at],
+        separators=(",", ":"),
+    ).encode("utf-8")
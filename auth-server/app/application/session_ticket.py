@@ -0,0 +1,88 @@
+import base64
+import hashlib
+import hmac
+import json
+import time
+from datetime import datetime
+from typing import Callable, Optional, Tuple
+
+from app.infrastucture.revocation_epochs import RevocationEpochs
+
+
+class SessionTicketService:
+    """
+    Issues and verifies session tickets for repeat logins.
+
+    A ticket is "<payload>.<mac>", both base64url without padding. The payload
+    binds the serial, the role (target username), the SSH key fingerprint, the
+    expiry and the revocation epoch at issue time, together with the event log
+    feed the epoch is an offset into; the mac is HMAC-SHA256 over it. Verification is stateless apart from the epoch check, so a repeat login
+    costs one HMAC and no EJBCA call. A ticket is rejected as soon as a
+    revocation event for its serial reaches the event log.
+    """
+
+    def __init__(self, secret: bytes, ttl_seconds: int, epochs: RevocationEpochs,
+                 clock: Callable[[], float] = time.time):
+        if not secret:
+            raise ValueError("Session ticket secret must not be empty")
+        if ttl_seconds <= 0:
+            raise ValueError("Session ticket ttl_seconds must be positive")
+        self.secret = secret
+        self.ttl_seconds = ttl_seconds
+        self.epochs = epochs
+        self._clock = clock
+
+    @classmethod
+    def from_file(cls, secret_path: str, ttl_seconds: int,
+                  epochs: RevocationEpochs) -> "SessionTicketService":
+        with open(secret_path, "rb") as file:
+            return cls(file.read().strip(), ttl_seconds, epochs)
+
+    def issue(self, serial_id: str, username: str, fingerprint: str, not_after: datetime) -> str:
+        """not_after is the certificate's expiry: a ticket never outlives the certificate."""
+        claims = {
+            "s": serial_id.upper(),
+            "u": username,
+            "f": fingerprint,
+            "x": min(int(self._clock()) + self.ttl_seconds, int(not_after.timestamp())),
+            "e": self.epochs.current(),
+            "l": self.epochs.feed_id,
+        }
+        payload = _b64encode(json.dumps(claims, sort_keys=True, separators=(",", ":")).encode("utf-8"))
+        return payload + "." + self._mac(payload)
+
+    def verify(self, ticket: str, serial_id: str, username: str,
+               fingerprint: str) -> Tuple[bool, Optional[str]]:
+        """Returns (True, None) for a valid ticket, or (False, reason)."""
+        payload, _, mac = (ticket or "").partition(".")
+        if not payload or not mac:
+            return False, "malformed ticket"
+        if not hmac.compare_digest(self._mac(payload), mac):
+            return False, "bad signature"
+        try:
+            claims = json.loads(_b64decode(payload))
+            expires_at, epoch = int(claims["x"]), int(claims["e"])
+        except (ValueError, KeyError, TypeError):
+            return False, "malformed ticket"
+        if expires_at <= self._clock():
+            return False, "ticket expired"
+        if (claims.get("s"), claims.get("u"), claims.get("f")) != (
+                serial_id.upper(), username, fingerprint):
+            return False, "ticket bound to another serial, role or key"
+        if claims.get("l") != self.epochs.feed_id:
+            # Another replica's log: the epoch is an offset into a different file
+            return False, "ticket issued against another revocation feed"
+        if self.epochs.changed_since(serial_id, epoch):
+            return False, "revocation status changed since issue"
+        return True, None
+
+    def _mac(self, payload: str) -> str:
+        return _b64encode(hmac.new(self.secret, payload.encode("utf-8"), hashlib.sha256).digest())
+
+
+def _b64encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).decode("ascii").rstrip("=")
+
+
+def _b64decode(data: str) -> bytes:
+    return base64.urlsafe_b64decode(data + "=" * (-len(data) % 4))
@@ -0,0 +1,76 @@
+import secrets
+import time
+from typing import Callable, List, Sequence
+
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.serialization import (SSHCertificateBuilder,
+                                                          SSHCertificateType)
+
+from app.domain.entities.certificate import Certificate
+
+# sshd rejects certificates whose validity has not started yet; backdating
+# absorbs clock skew between the auth server and the target hosts
+CLOCK_SKEW_SECONDS = 60
+MAX_VALIDITY_SECONDS = 24 * 3600
+
+
+class SSHCertificateIssuer:
+    """
+    Signs short-lived OpenSSH user certificates for validated X.509 certificates.
+
+    Target hosts trust the CA key through sshd's TrustedUserCAKeys and verify
+    the certificate offline, so logins do not reach the auth server. There is
+    no revocation for these certificates: the validity is the window during
+    which a revoked X.509 certificate can still log in, so keep it short.
+    """
+
+    def __init__(self, ca_private_key, validity_seconds: int,
+                 extensions: Sequence[str] = ("permit-pty",),
+                 clock: Callable[[], float] = time.time):
+        if not 0 < validity_seconds <= MAX_VALIDITY_SECONDS:
+            raise ValueError("SSH certificate validity_seconds must be between 1 and %d"
+                             % MAX_VALIDITY_SECONDS)
+        self.ca_private_key = ca_private_key
+        self.validity_seconds = validity_seconds
+        self.extensions = list(extensions)
+        self._clock = clock
+
+    @classmethod
+    def from_file(cls, ca_key_path: str, validity_seconds: int,
+                  extensions: Sequence[str] = ("permit-pty",)) -> "SSHCertificateIssuer":
+        """Loads the CA key from an unencrypted OpenSSH private key (ssh-keygen -t ed25519)."""
+        with open(ca_key_path, "rb") as file:
+            ca_private_key = serialization.load_ssh_private_key(file.read(), password=None)
+        return cls(ca_private_key, validity_seconds, extensions)
+
+    def issue(self, certificate: Certificate, principals: List[str]) -> str:
+        """
+        Returns a user certificate in authorized_keys format ("ssh-ed25519-cert-v01@openssh.com AAAA...")
+        for the public key of the X.509 certificate. It never outlives the X.509 certificate.
+
+        :raises ValueError: if there are no principals or the key cannot be converted to SSH.
+        """
+        if not principals:
+            raise ValueError("SSH certificate needs at least one principal")
+        now = int(self._clock())
+        valid_before = min(now + self.validity_seconds,
+                           int(certificate.expiry_date.timestamp()))
+        if valid_before <= now:
+            raise ValueError("X.509 certificate is expired")
+        public_key = serialization.load_ssh_public_key(
+            certificate.public_key.to_ssh_public_key().encode())
+        # sshd logs the key id, so it ties each login back to the X.509 serial
+        key_id = "%s serial=%s" % (certificate.subject_components.get("CN", ""),
+                                   certificate.serial_id.to_hex_uppercase())
+        builder = (SSHCertificateBuilder()
+                   .public_key(public_key)
+                   .serial(secrets.randbits(64))
+                   .type(SSHCertificateType.USER)
+                   .key_id(key_id.encode("utf-8"))
+                   .valid_principals([principal.encode("utf-8") for principal in principals])
+                   .valid_after(now - CLOCK_SKEW_SECONDS)
+                   .valid_before(valid_before))
+        for extension in sorted(self.extensions):
+            builder = builder.add_extension(extension.encode("utf-8"), b"")
+        ssh_certificate = builder.sign(self.ca_private_key)
+        return ssh_certificate.public_bytes().decode("ascii")
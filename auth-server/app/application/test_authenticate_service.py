@@ -1,8 +1,10 @@
 from datetime import datetime, timedelta, timezone
+from functools import partial
 from unittest.mock import MagicMock
 
 import pytest
 from app.application.authenticate_service import AuthenticateService
+from app.application.decision_signer import DecisionSigner
 from app.domain.entities.authorized_keys import AuthorizedKeysBuilder
 from app.domain.entities.certificate import Certificate, SerialNumber
 from app.domain.entities.x509_public_key import X509PublicKey
@@ -11,6 +13,14 @@ from app.domain.repositories.certificate_repository import CertificateRepository
 # pylint: disable=attribute-defined-outside-init,missing-class-docstring,missing-function-docstring
 
 
+def repository_mock() -> MagicMock:
+    """Mock answering get_certificate_status from is_revoked and get_certificate."""
+    repository = MagicMock()
+    repository.get_certificate_status.side_effect = partial(
+        CertificateRepository.get_certificate_status, repository)
+    return repository
+
+
 class TestAuthenticateService:
     CERT_ID = "123ABC"
     ROLE = "test-role"
@@ -19,7 +29,7 @@ class TestAuthenticateService:
     @pytest.fixture(autouse=True)
     def setup_method(self):
         """Set up the test environment."""
-        self.certificate_repository: CertificateRepository = MagicMock()
+        self.certificate_repository: CertificateRepository = repository_mock()
         self.authorized_keys_builder: AuthorizedKeysBuilder = MagicMock()
         self.service = AuthenticateService(
             self.certificate_repository, self.authorized_keys_builder)
@@ -137,3 +147,168 @@ class TestAuthenticateService:
             valid_certificate_fixture.subject_components["role"],
             valid_certificate_fixture.public_key
         )
+
+    def test_authenticate_signs_allowed_decision(self, valid_certificate_fixture):
+        """Ensures allowed decisions are signed when a DecisionSigner is configured."""
+        self.certificate_repository.is_revoked.return_value = (False, None)
+        self.certificate_repository.get_certificate.return_value = (
+            valid_certificate_fixture, None)
+        self.authorized_keys_builder.build.return_value = self.AUTHORIZED_ENTRY
+        signer = DecisionSigner(b"secret", ttl_seconds=60)
+        service = AuthenticateService(
+            self.certificate_repository, self.authorized_keys_builder,
+            decision_signer=signer)
+
+        response, err = service.authenticate(self.CERT_ID, self.ROLE)
+
+        assert err is None
+        assert response.expires_at is not None
+        assert signer.verify(self.CERT_ID, self.ROLE, response) is True
+
+    def test_authenticate_issues_ssh_certificate_for_all_roles(self, valid_certificate_fixture):
+        """Ensures the SSH certificate carries every role of the certificate as principal."""
+        valid_certificate_fixture.subject_components["role"] = f"{self.ROLE}, deploy"
+        self.certificate_repository.is_revoked.return_value = (False, None)
+        self.certificate_repository.get_certificate.return_value = (
+            valid_certificate_fixture, None)
+        self.authorized_keys_builder.build.return_value = self.AUTHORIZED_ENTRY
+        issuer = MagicMock()
+        issuer.issue.return_value = "ssh-ed25519-cert-v01@openssh.com AAAA"
+        service = AuthenticateService(
+            self.certificate_repository, self.authorized_keys_builder,
+            ssh_certificate_issuer=issuer)
+
+        response, err = service.authenticate(self.CERT_ID, self.ROLE)
+
+        assert err is None
+        assert response.ssh_certificate == "ssh-ed25519-cert-v01@openssh.com AAAA"
+        issuer.issue.assert_called_once_with(valid_certificate_fixture, [self.ROLE, "deploy"])
+
+    def test_authenticate_reports_ssh_certificate_failure(self, valid_certificate_fixture):
+        self.certificate_repository.is_revoked.return_value = (False, None)
+        self.certificate_repository.get_certificate.return_value = (
+            valid_certificate_fixture, None)
+        self.authorized_keys_builder.build.return_value = self.AUTHORIZED_ENTRY
+        issuer = MagicMock()
+        issuer.issue.side_effect = ValueError("X.509 certificate is expired")
+        service = AuthenticateService(
+            self.certificate_repository, self.authorized_keys_builder,
+            ssh_certificate_issuer=issuer)
+
+        response, err = service.authenticate(self.CERT_ID, self.ROLE)
+
+        assert response is None
+        assert err["error"] == "ssh_certificate_issuer failed"
+
+    def test_authenticate_issues_session_ticket(self, valid_certificate_fixture):
+        """Ensures the ticket is bound to the serial, the requested role and the key fingerprint."""
+        valid_certificate_fixture.public_key.ssh_fingerprint.return_value = "SHA256:abc"
+        self.certificate_repository.is_revoked.return_value = (False, None)
+        self.certificate_repository.get_certificate.return_value = (
+            valid_certificate_fixture, None)
+        self.authorized_keys_builder.build.return_value = self.AUTHORIZED_ENTRY
+        ticket_service = MagicMock()
+        ticket_service.issue.return_value = "payload.mac"
+        service = AuthenticateService(
+            self.certificate_repository, self.authorized_keys_builder,
+            session_ticket_service=ticket_service)
+
+        response, err = service.authenticate(self.CERT_ID, self.ROLE)
+
+        assert err is None
+        assert response.session_ticket == "payload.mac"
+        ticket_service.issue.assert_called_once_with(self.CERT_ID, self.ROLE, "SHA256:abc",
+                                                     valid_certificate_fixture.expiry_date)
+
+    def test_authenticate_key_returns_first_allowed_certificate(self, valid_certificate_fixture):
+        """Ensures a key is validated through the certificates that carry it."""
+        fingerprint_index = MagicMock()
+        fingerprint_index.serials.return_value = ["AAA", "BBB"]
+        self.certificate_repository.is_revoked.side_effect = lambda serial: (serial == "AAA", None)
+        self.certificate_repository.get_certificate.return_value = (
+            valid_certificate_fixture, None)
+        self.authorized_keys_builder.build.return_value = self.AUTHORIZED_ENTRY
+        service = AuthenticateService(
+            self.certificate_repository, self.authorized_keys_builder,
+            fingerprint_index=fingerprint_index)
+
+        response, err = service.authenticate_key("SHA256:abc", self.ROLE)
+
+        assert err is None
+        assert response.allowed is True
+        assert response.serial_id == "BBB"
+        fingerprint_index.serials.assert_called_once_with("SHA256:abc")
+
+    def test_authenticate_key_unknown_fingerprint_is_denied(self):
+        fingerprint_index = MagicMock()
+        fingerprint_index.serials.return_value = []
+        service = AuthenticateService(
+            self.certificate_repository, self.authorized_keys_builder,
+            fingerprint_index=fingerprint_index)
+
+        response, err = service.authenticate_key("SHA256:abc", self.ROLE)
+
+        assert err is None
+        assert response.allowed is False
+        self.certificate_repository.is_revoked.assert_not_called()
+
+
+class TestAuthenticateServiceAudit:
+    @pytest.fixture(autouse=True)
+    def setup_method(self):
+        self.certificate_repository = repository_mock()
+        self.authorized_keys_builder = MagicMock()
+        self.authorized_keys_builder.build.return_value = "ssh-rsa AAAA"
+        self.audit_log = MagicMock()
+        self.service = AuthenticateService(self.certificate_repository, self.authorized_keys_builder,
+                                           audit_log=self.audit_log)
+        key = MagicMock(spec=X509PublicKey)
+        key.pem_key = "test-public"
+        self.certificate = Certificate(
+            serial_id=SerialNumber(123),
+            public_key=key,
+            expiry_date=datetime.now(timezone.utc) + timedelta(minutes=10),
+            subject_components={"emailAddress": "test-email", "CN": "test-CN", "role": "admin,backup"})
+
+    def _event(self):
+        self.audit_log.submit.assert_called_once()
+        return self.audit_log.submit.call_args[0][0]
+
+    def test_allowed_decision_is_audited(self):
+        self.certificate_repository.is_revoked.return_value = (False, None)
+        self.certificate_repository.get_certificate.return_value = (self.certificate, None)
+
+        self.service.authenticate("7B", "backup")
+
+        event = self._event()
+        assert event["serial"] == "7B"
+        assert event["user"] == "backup"
+        assert event["cn"] == "test-CN"
+        assert event["role"] == "admin,backup"
+        assert event["outcome"] == "allow"
+        assert event["latency_ms"] >= 0
+
+    def test_role_mismatch_is_audited_as_deny(self):
+        self.certificate_repository.is_revoked.return_value = (False, None)
+        self.certificate_repository.get_certificate.return_value = (self.certificate, None)
+
+        self.service.authenticate("7B", "root")
+
+        event = self._event()
+        assert (event["outcome"], event["reason"]) == ("deny", "role")
+
+    def test_revoked_is_audited_without_certificate_details(self):
+        self.certificate_repository.is_revoked.return_value = (True, None)
+
+        self.service.authenticate("7B", "backup")
+
+        event = self._event()
+        assert (event["outcome"], event["reason"], event["cn"]) == ("deny", "revoked", None)
+
+    def test_error_is_audited(self):
+        self.certificate_repository.is_revoked.return_value = (None, {"error": "timeout"})
+
+        self.service.authenticate("7B", "backup")
+
+        event = self._event()
+        assert (event["outcome"], event["reason"]) == ("error", "is_revoked call failed")
@@ -0,0 +1,52 @@
+import pytest
+
+from app.application.authenticate_service import AuthResponse
+from app.application.decision_signer import DecisionSigner, canonical_decision
+
+# pylint: disable=missing-function-docstring
+
+
+@pytest.fixture
+def signer():
+    return DecisionSigner(b"secret", ttl_seconds=60, clock=lambda: 1000)
+
+
+def test_sign_sets_expiry_and_signature(signer):
+    """Signed responses carry an expiry ttl_seconds in the future."""
+    response = signer.sign("abc", "admin", AuthResponse(allowed=True, authorized_keys_entry="entry"))
+
+    assert response.expires_at == 1060
+    assert response.signature is not None
+    assert signer.verify("ABC", "admin", response) is True
+
+
+def test_verify_rejects_tampered_response(signer):
+    """Changing any signed field invalidates the signature."""
+    response = signer.sign("abc", "admin", AuthResponse(allowed=True, authorized_keys_entry="entry"))
+
+    assert signer.verify("abc", "root", response) is False
+    assert signer.verify("abc", "admin", response.model_copy(
+        update={"authorized_keys_entry": "other"})) is False
+    assert signer.verify("abc", "admin", response.model_copy(
+        update={"expires_at": 9999})) is False
+
+
+def test_verify_rejects_expired_response():
+    """A signature is only honoured until expires_at."""
+    now = [1000]
+    signer = DecisionSigner(b"secret", ttl_seconds=60, clock=lambda: now[0])
+    response = signer.sign("abc", "admin", AuthResponse(allowed=True))
+
+    now[0] = 1060
+
+    assert signer.verify("abc", "admin", response) is False
+
+
+def test_canonical_decision_is_stable():
+    """The canonical encoding is shared with the PAM side and must not change."""
+    assert canonical_decision("abc", "admin", True, None, 10) == b'["ABC","admin",true,null,10]'
+
+
+def test_empty_secret_is_rejected():
+    with pytest.raises(ValueError):
+        DecisionSigner(b"", ttl_seconds=60)
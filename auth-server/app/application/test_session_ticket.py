@@ -0,0 +1,124 @@
+from datetime import datetime, timezone
+from unittest.mock import MagicMock
+
+import pytest
+
+from app.application.session_ticket import SessionTicketService
+
+SERIAL = "1EB97F"
+USERNAME = "admin"
+FINGERPRINT = "SHA256:abc"
+NOT_AFTER = datetime.fromtimestamp(10 ** 9, timezone.utc)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def epochs():
+    epochs = MagicMock()
+    epochs.current.return_value = 42
+    epochs.feed_id = "feed-a"
+    epochs.changed_since.return_value = False
+    return epochs
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture
+def service(epochs, clock):
+    return SessionTicketService(b"secret", ttl_seconds=600, epochs=epochs, clock=clock)
+
+
+def test_issued_ticket_verifies(service, epochs):
+    ticket = service.issue(SERIAL, USERNAME, FINGERPRINT, NOT_AFTER)
+
+    assert service.verify(ticket, SERIAL.lower(), USERNAME, FINGERPRINT) == (True, None)
+    epochs.changed_since.assert_called_once_with(SERIAL.lower(), 42)
+
+
+@pytest.mark.parametrize("serial_id, username, fingerprint", [
+    ("ABCDEF", USERNAME, FINGERPRINT),
+    (SERIAL, "root", FINGERPRINT),
+    (SERIAL, USERNAME, "SHA256:other"),
+])
+def test_ticket_is_bound_to_serial_role_and_key(service, serial_id, username, fingerprint):
+    ticket = service.issue(SERIAL, USERNAME, FINGERPRINT, NOT_AFTER)
+
+    valid, reason = service.verify(ticket, serial_id, username, fingerprint)
+
+    assert valid is False
+    assert "bound" in reason
+
+
+def test_expired_ticket_is_rejected(service, clock):
+    ticket = service.issue(SERIAL, USERNAME, FINGERPRINT, NOT_AFTER)
+    clock.now += 600
+
+    assert service.verify(ticket, SERIAL, USERNAME, FINGERPRINT) == (False, "ticket expired")
+
+
+def test_ticket_expires_with_certificate(service, clock):
+    # The certificate expires 100s from now, well before the 600s ttl
+    ticket = service.issue(SERIAL, USERNAME, FINGERPRINT,
+                           datetime.fromtimestamp(clock.now + 100, timezone.utc))
+
+    clock.now += 99
+    assert service.verify(ticket, SERIAL, USERNAME, FINGERPRINT) == (True, None)
+    clock.now += 1
+    assert service.verify(ticket, SERIAL, USERNAME, FINGERPRINT) == (False, "ticket expired")
+
+
+def test_ticket_is_rejected_after_revocation_event(service, epochs):
+    ticket = service.issue(SERIAL, USERNAME, FINGERPRINT, NOT_AFTER)
+    epochs.changed_since.return_value = True
+
+    valid, _ = service.verify(ticket, SERIAL, USERNAME, FINGERPRINT)
+
+    assert valid is False
+
+
+def test_ticket_from_another_feed_is_rejected(service, epochs):
+    """El epoch es un offset en el log de otra réplica: no se puede comparar."""
+    ticket = service.issue(SERIAL, USERNAME, FINGERPRINT, NOT_AFTER)
+    epochs.feed_id = "feed-b"
+
+    valid, reason = service.verify(ticket, SERIAL, USERNAME, FINGERPRINT)
+
+    assert valid is False
+    assert "feed" in reason
+    epochs.changed_since.assert_not_called()
+
+
+@pytest.mark.parametrize("tamper", [
+    lambda ticket: "x" + ticket,
+    lambda ticket: ticket[:-1] + ("A" if ticket[-1] != "A" else "B"),
+    lambda ticket: ticket.split(".")[0],
+    lambda ticket: "",
+])
+def test_tampered_ticket_is_rejected(service, tamper):
+    ticket = service.issue(SERIAL, USERNAME, FINGERPRINT, NOT_AFTER)
+
+    valid, _ = service.verify(tamper(ticket), SERIAL, USERNAME, FINGERPRINT)
+
+    assert valid is False
+
+
+def test_ticket_from_another_secret_is_rejected(service, epochs, clock):
+    other = SessionTicketService(b"other", ttl_seconds=600, epochs=epochs, clock=clock)
+
+    assert service.verify(other.issue(SERIAL, USERNAME, FINGERPRINT, NOT_AFTER),
+                          SERIAL, USERNAME, FINGERPRINT) == (False, "bad signature")
+
+
+def test_empty_secret_is_rejected(epochs):
+    with pytest.raises(ValueError):
+        SessionTicketService(b"", ttl_seconds=600, epochs=epochs)
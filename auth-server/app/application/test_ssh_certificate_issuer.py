@@ -0,0 +1,94 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ec, ed25519
+from cryptography.hazmat.primitives.serialization import (SSHCertificateType,
+                                                          load_ssh_public_identity)
+
+from app.application.ssh_certificate_issuer import (CLOCK_SKEW_SECONDS,
+                                                    SSHCertificateIssuer)
+from app.domain.entities.certificate import Certificate, SerialNumber
+from app.domain.entities.x509_public_key import X509PublicKey
+
+NOW = 1_700_000_000
+
+
+def user_certificate(private_key, expires_in: timedelta = timedelta(days=30)) -> Certificate:
+    pem = private_key.public_key().public_bytes(
+        serialization.Encoding.PEM, serialization.PublicFormat.SubjectPublicKeyInfo).decode()
+    return Certificate(
+        serial_id=SerialNumber(0xABC),
+        public_key=X509PublicKey(pem),
+        expiry_date=datetime.fromtimestamp(NOW, timezone.utc) + expires_in,
+        subject_components={"CN": "Jane Doe", "role": "admin,deploy"},
+    )
+
+
+@pytest.fixture
+def ca_key():
+    return ed25519.Ed25519PrivateKey.generate()
+
+
+@pytest.fixture
+def issuer(ca_key):
+    return SSHCertificateIssuer(ca_key, validity_seconds=900, clock=lambda: NOW)
+
+
+def test_issued_certificate_is_signed_by_the_ca(issuer, ca_key):
+    user_key = ed25519.Ed25519PrivateKey.generate()
+
+    issued = issuer.issue(user_certificate(user_key), ["admin", "deploy"])
+
+    certificate = load_ssh_public_identity(issued.encode())
+    certificate.verify_cert_signature()
+    assert issued.startswith("ssh-ed25519-cert-v01@openssh.com ")
+    assert certificate.signature_key().public_bytes(
+        serialization.Encoding.OpenSSH, serialization.PublicFormat.OpenSSH
+    ) == ca_key.public_key().public_bytes(
+        serialization.Encoding.OpenSSH, serialization.PublicFormat.OpenSSH)
+    assert certificate.type == SSHCertificateType.USER
+    assert certificate.valid_principals == [b"admin", b"deploy"]
+    assert certificate.key_id == b"Jane Doe serial=ABC"
+    assert certificate.valid_after == NOW - CLOCK_SKEW_SECONDS
+    assert certificate.valid_before == NOW + 900
+    assert certificate.extensions == {b"permit-pty": b""}
+
+
+def test_certificate_never_outlives_the_x509_certificate(issuer):
+    user_key = ec.generate_private_key(ec.SECP256R1())
+
+    issued = issuer.issue(user_certificate(user_key, timedelta(minutes=5)), ["admin"])
+
+    assert load_ssh_public_identity(issued.encode()).valid_before == NOW + 300
+
+
+def test_expired_x509_certificate_is_rejected(issuer):
+    with pytest.raises(ValueError):
+        issuer.issue(user_certificate(ed25519.Ed25519PrivateKey.generate(),
+                                      timedelta(seconds=-1)), ["admin"])
+
+
+def test_principals_are_required(issuer):
+    with pytest.raises(ValueError):
+        issuer.issue(user_certificate(ed25519.Ed25519PrivateKey.generate()), [])
+
+
+@pytest.mark.parametrize("validity_seconds", [0, 7 * 24 * 3600])
+def test_validity_is_bounded(ca_key, validity_seconds):
+    with pytest.raises(ValueError):
+        SSHCertificateIssuer(ca_key, validity_seconds)
+
+
+def test_ca_key_is_loaded_from_openssh_file(tmp_path, ca_key):
+    key_path = tmp_path / "ssh_user_ca"
+    key_path.write_bytes(ca_key.private_bytes(
+        serialization.Encoding.PEM, serialization.PrivateFormat.OpenSSH,
+        serialization.NoEncryption()))
+
+    issuer = SSHCertificateIssuer.from_file(str(key_path), 600)
+
+    assert issuer.validity_seconds == 600
+    # Uses the wall clock, so the X.509 certificate must outlive it
+    assert issuer.issue(user_certificate(ed25519.Ed25519PrivateKey.generate(),
+                                         timedelta(days=365 * 30)), ["admin"])
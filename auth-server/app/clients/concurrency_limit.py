@@ -0,0 +1,101 @@
+"""
+Adaptive limit on concurrent EJBCA requests.
+
+When EJBCA slows down, sending it more requests at once only makes every one
+of them slower. The limiter adjusts how many requests may be in flight with
+AIMD on the observed latency: each fast answer while the limit is in use adds
+1/limit (about +1 per round trip), a slow or failed answer multiplies it by
+backoff_ratio. Only requests sent after the last decrease can decrease it
+again, so one slow episode counts once rather than once per request in flight.
+Requests over the limit wait up to max_wait_seconds for a slot.
+"""
+import threading
+import time
+from typing import Callable, Optional
+
+import requests
+
+
+class ConcurrencyLimitExceeded(requests.exceptions.ConnectionError):
+    """No slot freed up within max_wait_seconds; the request was never sent."""
+
+
+class AdaptiveConcurrencyLimiter:
+    def __init__(self, initial_limit: int = 10, min_limit: int = 1, max_limit: int = 100,
+                 latency_target_seconds: float = 0.5, backoff_ratio: float = 0.9,
+                 clock: Callable[[], float] = time.monotonic):
+        if not 1 <= min_limit <= initial_limit <= max_limit:
+            raise ValueError("Limits must satisfy 1 <= min_limit <= initial_limit <= max_limit")
+        if not 0 < backoff_ratio < 1:
+            raise ValueError("backoff_ratio must be between 0 and 1")
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.latency_target_seconds = latency_target_seconds
+        self.backoff_ratio = backoff_ratio
+        self._clock = clock
+        self._limit = float(initial_limit)
+        self._in_flight = 0
+        self._last_decrease = float("-inf")
+        self._condition = threading.Condition()
+        self.rejected = 0
+
+    @property
+    def limit(self) -> int:
+        return int(self._limit)
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    def acquire(self, timeout: float) -> Optional[float]:
+        """Takes a slot and returns the send time to pass to release(), or None on timeout."""
+        deadline = self._clock() + timeout
+        with self._condition:
+            while self._in_flight >= self.limit:
+                remaining = deadline - self._clock()
+                if remaining <= 0:
+                    self.rejected += 1
+                    return None
+                self._condition.wait(remaining)
+            self._in_flight += 1
+            return self._clock()
+
+    def release(self, sent_at: float, failed: bool = False):
+        now = self._clock()
+        with self._condition:
+            in_use = self._in_flight
+            self._in_flight -= 1
+            if failed or now - sent_at > self.latency_target_seconds:
+                if sent_at >= self._last_decrease:
+                    self._limit = max(float(self.min_limit), self._limit * self.backoff_ratio)
+                    self._last_decrease = now
+            elif in_use * 2 >= self._limit:
+                # Grow only while the limit is actually in use
+                self._limit = min(float(self.max_limit), self._limit + 1 / self._limit)
+            self._condition.notify_all()
+
+
+class ConcurrencyLimitedSession(requests.Session):
+    """
+    requests.Session sending through an AdaptiveConcurrencyLimiter. A 5xx or
+    a connection error counts as failed. For streamed responses the slot is
+    held until the headers arrive.
+    """
+
+    def __init__(self, limiter: AdaptiveConcurrencyLimiter, max_wait_seconds: float = 2.0):
+        super().__init__()
+        self.limiter = limiter
+        self.max_wait_seconds = max_wait_seconds
+
+    def send(self, request, **kwargs):
+        sent_at = self.limiter.acquire(self.max_wait_seconds)
+        if sent_at is None:
+            raise ConcurrencyLimitExceeded(
+                f"EJBCA concurrency limit {self.limiter.limit} reached", request=request)
+        failed = True
+        try:
+            response = super().send(request, **kwargs)
+            failed = response.status_code >= 500
+            return response
+        finally:
+            self.limiter.release(sent_at, failed)
@@ -1,12 +1,14 @@
 import logging
 import os
-from typing import Dict, List, Optional, Tuple
+from typing import Dict, Iterator, List, NamedTuple, Optional, Tuple
 
 import requests
 from pydantic import BaseModel
 from requests.adapters import HTTPAdapter
 from urllib3.util.retry import Retry
 
+from app.clients.json_stream import iter_json_array_items
+
 
 class RevocationStatus(BaseModel):
     """
@@ -20,6 +22,12 @@ class RevocationStatus(BaseModel):
     revoked: Optional[bool]
 
 
+class SearchCursor(NamedTuple):
+    """Position in a paginated search: the page to fetch and how many of its results were already read."""
+    page: int = 1
+    index: int = 0
+
+
 class EJBCAClient:
     """ A client to interact with the EJBCA REST API. """
 
@@ -29,7 +37,6 @@ class EJBCAClient:
                  logger: logging.Logger = logging.getLogger(__name__),
                  session: requests.Session = requests.Session()):
         self.logger = logger
-        self.logger.name = __name__
 
         self.base_url = base_url
         self.key_path = certificate_path
@@ -59,7 +66,7 @@ class EJBCAClient:
         :return: A dictionary containing the revocation status information.
         """
         url = f'{self.base_url}/v1/certificate/{issuer_dn}/{cert_serial}/revocationstatus'
-        self.logger.info(f'Attemping to connect to {url}')
+        self.logger.info("Attempting to connect to %s", url)
         try:
             response = self.session.get(url)
 
@@ -109,6 +116,79 @@ class EJBCAClient:
         except requests.exceptions.RequestException as e:
             return None, {"error": str(e), "url": url}
 
+    def search_v2(self, criteria: List[Dict], page_size: int,
+                  current_page: int = 1) -> Tuple[Dict, object]:
+        """
+        Searches for certificates with the v2 endpoint. Unlike v1, each result
+        carries its status, issuerDN and revocation fields.
+
+        Args:
+            criteria (List[Dict]): Search criteria, as in search().
+            page_size (int): Maximum number of results in the page.
+            current_page (int): Page to fetch, starting at 1.
+
+        Returns:
+            Dict: Response from the EJBCA API ("certificates" and "pagination_summary").
+        """
+        url = f"{self.base_url}/v2/certificate/search"
+        body = {
+            "pagination": {"page_size": page_size, "current_page": current_page},
+            "criteria": criteria
+        }
+
+        try:
+            response = self.session.post(url, json=body)
+            if response.status_code == 200:
+                return response.json(), None
+            else:
+                return None, {"error": response.text, "url": url, "error_code": response.status_code}
+        except requests.exceptions.RequestException as e:
+            return None, {"error": str(e), "url": url}
+
+    def iter_search_v2(self, criteria: List[Dict], page_size: int = 500,
+                       cursor: Optional[SearchCursor] = None,
+                       chunk_size: int = 64 * 1024) -> Iterator[Tuple[Dict, SearchCursor]]:
+        """
+        Walks every page of a v2 search, yielding (result, cursor) pairs.
+
+        Each page is streamed and its results are parsed one at a time, so
+        memory does not grow with the page or with the number of pages. The
+        cursor yielded with a result points just past it; passing it back
+        resumes the walk there.
+
+        Raises:
+            ValueError: if a page cannot be fetched or parsed.
+        """
+        cursor = cursor or SearchCursor()
+        url = f"{self.base_url}/v2/certificate/search"
+        while True:
+            body = {
+                "pagination": {"page_size": page_size, "current_page": cursor.page},
+                "criteria": criteria
+            }
+            try:
+                response = self.session.post(url, json=body, stream=True)
+            except requests.exceptions.RequestException as e:
+                raise ValueError(f"Error searching certificates at {url}: {e}") from e
+            try:
+                if response.status_code != 200:
+                    raise ValueError(
+                        f"Error searching certificates at {url}: {response.status_code} {response.text}")
+                results = iter_json_array_items(response.iter_content(chunk_size), "certificates")
+                count = 0
+                for count, result in enumerate(results, start=1):
+                    if count <= cursor.index:
+                        continue
+                    yield result, (SearchCursor(cursor.page, count) if count < page_size
+                                   else SearchCursor(cursor.page + 1, 0))
+            except requests.exceptions.RequestException as e:
+                raise ValueError(f"Error reading search page {cursor.page} from {url}: {e}") from e
+            finally:
+                response.close()
+            if count < page_size:
+                return
+            cursor = SearchCursor(cursor.page + 1, 0)
+
     def _validate_file(self, file_path: str) -> bool:
         """Check if a given file path exists and is readable."""
         return os.path.isfile(file_path) and os.access(file_path, os.R_OK)
@@ -0,0 +1,71 @@
+"""
+Incremental parsing of large JSON responses.
+
+EJBCA search pages hold one array of certificates, each a few kilobytes of
+base64. Instead of loading the whole page, the items of that array are
+decoded one by one as chunks arrive, so memory stays bounded by the chunk
+size plus the largest single item.
+"""
+import codecs
+import json
+import re
+from typing import Any, Iterable, Iterator
+
+_WHITESPACE = re.compile(r"[\s,]*")
+
+
+def iter_json_array_items(chunks: Iterable[bytes], key: str) -> Iterator[Any]:
+    """
+    Yields the items of the array stored under `key` in a JSON object read
+    from byte chunks. Yields nothing when the key is absent.
+
+    Raises ValueError if the body ends in the middle of the array.
+    """
+    decoder = json.JSONDecoder()
+    text_decoder = codecs.getincrementaldecoder("utf-8")()
+    array_start = re.compile(r'"%s"\s*:\s*\[' % re.escape(key))
+    chunks = iter(chunks)
+    buffer = ""
+    position = 0
+    in_array = False
+    exhausted = False
+
+    while True:
+        if not in_array:
+            match = array_start.search(buffer)
+            if match:
+                buffer = buffer[match.end():]
+                position = 0
+                in_array = True
+                continue
+        else:
+            position = _WHITESPACE.match(buffer, position).end()
+            if position < len(buffer):
+                if buffer[position] == "]":
+                    return
+                try:
+                    item, end = decoder.raw_decode(buffer, position)
+                except json.JSONDecodeError:
+                    # Most likely an item split across chunks; read more and retry
+                    if exhausted:
+                        raise ValueError("Truncated JSON array in response")
+                else:
+                    # Drop the consumed text so the buffer only holds the next item
+                    buffer = buffer[end:]
+                    position = 0
+                    yield item
+                    continue
+        if exhausted:
+            if in_array:
+                raise ValueError("Truncated JSON array in response")
+            return
+        try:
+            chunk = next(chunks)
+        except StopIteration:
+            exhausted = True
+            buffer += text_decoder.decode(b"", final=True)
+            continue
+        if not in_array and len(buffer) > 4096:
+            # Keep only a tail long enough to hold a key split across chunks
+            buffer = buffer[-(len(key) + 64):]
+        buffer += text_decoder.decode(chunk)
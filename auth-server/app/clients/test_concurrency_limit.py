@@ -0,0 +1,170 @@
+import threading
+import time
+
+import pytest
+import requests
+from requests.adapters import BaseAdapter
+
+from app.clients.concurrency_limit import (AdaptiveConcurrencyLimiter,
+                                           ConcurrencyLimitedSession,
+                                           ConcurrencyLimitExceeded)
+from app.clients.ejbca_client import EJBCAClient
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_fast_answers_grow_limit_while_in_use():
+    clock = FakeClock()
+    limiter = AdaptiveConcurrencyLimiter(initial_limit=4, max_limit=6, clock=clock)
+
+    for _ in range(50):
+        sent = [limiter.acquire(0) for _ in range(limiter.limit)]
+        clock.now += 0.1
+        for sent_at in sent:
+            limiter.release(sent_at)
+
+    assert limiter.limit == 6
+
+
+def test_idle_limit_does_not_grow():
+    limiter = AdaptiveConcurrencyLimiter(initial_limit=4, clock=FakeClock())
+
+    for _ in range(50):
+        limiter.release(limiter.acquire(0))
+
+    assert limiter.limit == 4
+
+
+def test_slow_episode_decreases_once():
+    clock = FakeClock()
+    limiter = AdaptiveConcurrencyLimiter(initial_limit=10, latency_target_seconds=0.5,
+                                         backoff_ratio=0.5, clock=clock)
+    sent = [limiter.acquire(0) for _ in range(8)]
+    clock.now += 1.0
+
+    for sent_at in sent:
+        limiter.release(sent_at)
+
+    assert limiter.limit == 5
+
+
+def test_failures_decrease_down_to_min_limit():
+    clock = FakeClock()
+    limiter = AdaptiveConcurrencyLimiter(initial_limit=10, min_limit=2, backoff_ratio=0.5, clock=clock)
+
+    for _ in range(10):
+        sent_at = limiter.acquire(0)
+        clock.now += 0.01
+        limiter.release(sent_at, failed=True)
+
+    assert limiter.limit == 2
+
+
+def test_acquire_times_out_when_limit_in_use():
+    limiter = AdaptiveConcurrencyLimiter(initial_limit=1)
+    sent_at = limiter.acquire(0)
+
+    assert limiter.acquire(0.01) is None
+    assert limiter.rejected == 1
+    limiter.release(sent_at)
+    assert limiter.acquire(0.01) is not None
+
+
+def test_invalid_limits_rejected():
+    with pytest.raises(ValueError):
+        AdaptiveConcurrencyLimiter(initial_limit=0)
+    with pytest.raises(ValueError):
+        AdaptiveConcurrencyLimiter(backoff_ratio=1.0)
+
+
+class OverloadedEJBCA(BaseAdapter):
+    """Answers slower the more requests it serves at once: base * concurrency."""
+
+    def __init__(self, base_seconds=0.002, status=200):
+        super().__init__()
+        self.base_seconds = base_seconds
+        self.status = status
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+
+    def send(self, request, **kwargs):
+        with self._lock:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+            concurrency = self.in_flight
+        time.sleep(self.base_seconds * concurrency)
+        with self._lock:
+            self.in_flight -= 1
+        response = requests.Response()
+        response.status_code = self.status
+        response._content = b'{"revoked": false}'
+        response.request = request
+        return response
+
+    def close(self):
+        pass
+
+
+def test_session_caps_concurrency_in_login_storm():
+    """32 threads at once: EJBCA sees few concurrent requests and answers near the target."""
+    limiter = AdaptiveConcurrencyLimiter(initial_limit=4, max_limit=64, latency_target_seconds=0.02)
+    session = ConcurrencyLimitedSession(limiter, max_wait_seconds=10)
+    ejbca = OverloadedEJBCA()
+    session.mount("http://", ejbca)
+
+    def login():
+        for _ in range(10):
+            session.get("http://ejbca/v1/certificate/CN=CA/1/revocationstatus")
+
+    threads = [threading.Thread(target=login) for _ in range(32)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    # Without the limiter all 32 would be in flight (64ms per answer)
+    assert ejbca.max_in_flight <= 16
+    assert limiter.limit * ejbca.base_seconds <= 2 * limiter.latency_target_seconds
+    assert limiter.in_flight == 0
+
+
+def test_session_raises_when_no_slot_frees_up():
+    limiter = AdaptiveConcurrencyLimiter(initial_limit=1)
+    session = ConcurrencyLimitedSession(limiter, max_wait_seconds=0.01)
+    session.mount("http://", OverloadedEJBCA())
+    limiter.acquire(0)
+
+    with pytest.raises(ConcurrencyLimitExceeded):
+        session.get("http://ejbca/v1/certificate/CN=CA/1/revocationstatus")
+
+
+def test_server_errors_count_as_failed():
+    limiter = AdaptiveConcurrencyLimiter(initial_limit=10, backoff_ratio=0.5)
+    session = ConcurrencyLimitedSession(limiter)
+    session.mount("http://", OverloadedEJBCA(base_seconds=0, status=503))
+
+    session.get("http://ejbca/v1/certificate/CN=CA/1/revocationstatus")
+
+    assert limiter.limit == 5
+
+
+def test_ejbca_client_reports_limit_as_request_error(tmp_path):
+    key_path = tmp_path / "superadmin.pem"
+    key_path.write_text("fake")
+    limiter = AdaptiveConcurrencyLimiter(initial_limit=1)
+    session = ConcurrencyLimitedSession(limiter, max_wait_seconds=0.01)
+    client = EJBCAClient("https://ejbca", str(key_path), "fake", session=session)
+    session.mount("https://", OverloadedEJBCA())
+    limiter.acquire(0)
+
+    status, err = client.get_revocation_status("CN=CA", "1")
+
+    assert status is None
+    assert "concurrency limit" in err["error"]
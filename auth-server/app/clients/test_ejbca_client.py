@@ -1,10 +1,13 @@
+import json
+import logging
 import pytest
 import requests
 import tempfile
+import tracemalloc
 import os
 from unittest.mock import MagicMock
 
-from app.clients.ejbca_client import EJBCAClient
+from app.clients.ejbca_client import EJBCAClient, SearchCursor
 
 
 @pytest.fixture(scope="module")
@@ -125,3 +128,138 @@ def test_invalid_cert_path():
     with pytest.raises(ValueError, match="Key file not found: /nonexistent/cert.pem"):
         EJBCAClient("https://ejbca.example.com",
                     "/nonexistent/cert.pem", "password")
+
+
+def test_search_v2_sends_pagination(ejbca_client, mock_session):
+    """Prueba que la búsqueda v2 use el endpoint v2 con paginación."""
+    mock_response = MagicMock()
+    mock_response.status_code = 200
+    mock_response.json.return_value = {"certificates": [
+        {"serial_number": "12345", "status": "CERT_ACTIVE"}]}
+    mock_session.post.return_value = mock_response
+
+    results, err = ejbca_client.search_v2(
+        [{"property": "QUERY", "value": "12345", "operation": "EQUAL"}], page_size=10)
+
+    assert err is None
+    assert results["certificates"][0]["status"] == "CERT_ACTIVE"
+    url = mock_session.post.call_args.args[0]
+    body = mock_session.post.call_args.kwargs["json"]
+    assert url == "https://ejbca.example.com/v2/certificate/search"
+    assert body["pagination"] == {"page_size": 10, "current_page": 1}
+
+
+def _page_response(results, chunk_size=512):
+    response = MagicMock()
+    response.status_code = 200
+    body = json.dumps({"pagination_summary": {}, "certificates": results}).encode()
+    response.iter_content.side_effect = lambda size: (
+        body[i:i + chunk_size] for i in range(0, len(body), chunk_size))
+    return response
+
+
+def _certificates(start, count):
+    return [{"serial_number": format(i, "X"), "certificate": "A" * 1500}
+            for i in range(start, start + count)]
+
+
+def test_iter_search_v2_walks_every_page(ejbca_client, mock_session):
+    """Prueba que el iterador pida páginas hasta recibir una incompleta."""
+    mock_session.post.side_effect = [
+        _page_response(_certificates(0, 2)),
+        _page_response(_certificates(2, 2)),
+        _page_response(_certificates(4, 1)),
+    ]
+
+    results = list(ejbca_client.iter_search_v2([], page_size=2))
+
+    assert [result["serial_number"] for result, _ in results] == ["0", "1", "2", "3", "4"]
+    assert [cursor for _, cursor in results] == [
+        SearchCursor(1, 1), SearchCursor(2, 0), SearchCursor(2, 1), SearchCursor(3, 0),
+        SearchCursor(3, 1)]
+    pages = [call.kwargs["json"]["pagination"]["current_page"]
+             for call in mock_session.post.call_args_list]
+    assert pages == [1, 2, 3]
+
+
+def test_iter_search_v2_resumes_from_cursor(ejbca_client, mock_session):
+    """Prueba que un cursor reanude a mitad de página."""
+    mock_session.post.side_effect = [_page_response(_certificates(2, 2)),
+                                     _page_response([])]
+
+    results = list(ejbca_client.iter_search_v2([], page_size=2, cursor=SearchCursor(2, 1)))
+
+    assert [result["serial_number"] for result, _ in results] == ["3"]
+    assert mock_session.post.call_args_list[0].kwargs["json"]["pagination"]["current_page"] == 2
+
+
+def test_iter_search_v2_raises_on_error(ejbca_client, mock_session):
+    """Prueba que un error HTTP interrumpa el iterador con ValueError."""
+    mock_response = MagicMock()
+    mock_response.status_code = 500
+    mock_response.text = "Internal Server Error"
+    mock_session.post.return_value = mock_response
+
+    with pytest.raises(ValueError):
+        list(ejbca_client.iter_search_v2([], page_size=2))
+    mock_response.close.assert_called_once()
+
+
+class LazyPageResponse:
+    """Respuesta que genera el JSON de la página a medida que se lee, sin tenerlo entero en memoria."""
+    status_code = 200
+
+    def __init__(self, start, count):
+        self.start = start
+        self.count = count
+
+    def iter_content(self, chunk_size):
+        buffer = b'{"pagination_summary": {}, "certificates": ['
+        for i in range(self.start, self.start + self.count):
+            separator = b"," if i > self.start else b""
+            buffer += separator + json.dumps(
+                {"serial_number": format(i, "X"), "certificate": "A" * 1500}).encode()
+            if len(buffer) >= chunk_size:
+                yield buffer
+                buffer = b""
+        yield buffer + b"]}"
+
+    def close(self):
+        pass
+
+
+def test_iter_search_v2_memory_is_bounded(ejbca_client, mock_session):
+    """Benchmark: recorrer 50k resultados (~75 MB de JSON) mantiene la memoria acotada."""
+    page_size, pages = 500, 100
+    responses = (LazyPageResponse(page * page_size, page_size if page < pages else 0)
+                 for page in range(pages + 1))
+    mock_session.post.side_effect = lambda *args, **kwargs: next(responses)
+
+    tracemalloc.start()
+    count = sum(1 for _ in ejbca_client.iter_search_v2([], page_size=page_size))
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    assert count == page_size * pages
+    assert peak < 2 * 1024 * 1024
+
+
+def test_client_does_not_rename_shared_logger(temp_cert_files, mock_session):
+    """El logger recibido puede ser compartido: el cliente no le cambia el nombre."""
+    key_path, cert_path = temp_cert_files
+    logger = logging.getLogger("shared")
+
+    EJBCAClient("https://ejbca.example.com", key_path, cert_path, logger=logger, session=mock_session)
+
+    assert logger.name == "shared"
+
+
+def test_connect_message_is_formatted_lazily(ejbca_client, mock_session):
+    mock_session.get.return_value = MagicMock(status_code=404)
+    ejbca_client.logger = MagicMock()
+
+    ejbca_client.get_revocation_status("CN=Test CA", "123456")
+
+    message, url = ejbca_client.logger.info.call_args[0]
+    assert message == "Attempting to connect to %s"
+    assert url.endswith("/v1/certificate/CN=Test CA/123456/revocationstatus")
@@ -0,0 +1,37 @@
+import json
+
+import pytest
+
+from app.clients.json_stream import iter_json_array_items
+
+
+def chunked(data: bytes, size: int):
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+
+@pytest.mark.parametrize("size", [1, 3, 7, 1024])
+def test_items_split_across_chunks(size):
+    body = json.dumps({
+        "pagination_summary": {"page_size": 3, "current_page": 1},
+        "certificates": [{"serial_number": "01", "certificate": "MIIB..."},
+                         {"serial_number": "02", "subject": "CN=José"},
+                         {"serial_number": "03", "nested": {"a": [1, 2]}}],
+    }, ensure_ascii=False).encode("utf-8")
+
+    items = list(iter_json_array_items(chunked(body, size), "certificates"))
+
+    assert [item["serial_number"] for item in items] == ["01", "02", "03"]
+    assert items[1]["subject"] == "CN=José"
+
+
+def test_missing_key_yields_nothing():
+    assert list(iter_json_array_items([b'{"other": [1, 2]}'], "certificates")) == []
+
+
+def test_empty_array():
+    assert list(iter_json_array_items([b'{"certificates": [ ]}'], "certificates")) == []
+
+
+def test_truncated_body_raises():
+    with pytest.raises(ValueError):
+        list(iter_json_array_items([b'{"certificates": [{"a": 1}, {"b":'], "certificates"))
@@ -0,0 +1,37 @@
+import base64
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Optional
+
+import pytest
+from cryptography import x509
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import ed25519, rsa
+from cryptography.x509.oid import NameOID
+
+ROLE_OID = x509.ObjectIdentifier("2.5.4.72")
+NOT_AFTER = datetime(2030, 1, 1, tzinfo=timezone.utc)
+
+
+@pytest.fixture(scope="session")
+def raw_certificate() -> Callable[..., str]:
+    """
+    Fabrica de certificados autofirmados en el formato de EJBCA: base64 del
+    cuerpo PEM. Vencen en NOT_AFTER; sin clave se genera una RSA de 2048 bits.
+    """
+    def build(serial: int, key=None, common_name: str = "Jane Doe",
+              role: Optional[str] = None) -> str:
+        key = key or rsa.generate_private_key(public_exponent=65537, key_size=2048)
+        attributes = [x509.NameAttribute(NameOID.COMMON_NAME, common_name)]
+        if role is not None:
+            attributes.append(x509.NameAttribute(ROLE_OID, role))
+        name = x509.Name(attributes)
+        signature_hash = None if isinstance(key, ed25519.Ed25519PrivateKey) else hashes.SHA256()
+        certificate = (x509.CertificateBuilder()
+                       .subject_name(name).issuer_name(name)
+                       .public_key(key.public_key()).serial_number(serial)
+                       .not_valid_before(NOT_AFTER - timedelta(days=365)).not_valid_after(NOT_AFTER)
+                       .sign(key, signature_hash))
+        pem = certificate.public_bytes(serialization.Encoding.PEM).decode()
+        body = "".join(pem.strip().splitlines()[1:-1])
+        return base64.b64encode(body.encode()).decode()
+    return build
@@ -0,0 +1,64 @@
+"""
+Admission control for /validate based on queueing delay.
+
+Sync endpoints run on a bounded threadpool. In a login storm requests wait
+for a thread far longer than they take to serve, and by the time they run the
+client has often given up. ArrivalTimeMiddleware stamps each request when it
+reaches the app; the admission check runs when a thread picks the request up,
+and a request that already waited longer than max_queue_delay_seconds is
+answered 503 with Retry-After at once, so the requests that are accepted stay
+within the latency target.
+"""
+import threading
+import time
+from typing import Callable, Dict, NamedTuple, Optional
+
+ARRIVED_AT = "rbac.arrived_at"
+
+
+class ArrivalTimeMiddleware:
+    """ASGI middleware storing the monotonic arrival time in the request scope."""
+
+    def __init__(self, app, clock: Callable[[], float] = time.monotonic):
+        self.app = app
+        self._clock = clock
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http":
+            scope[ARRIVED_AT] = self._clock()
+        await self.app(scope, receive, send)
+
+
+class AdmissionDecision(NamedTuple):
+    admitted: bool
+    queue_delay_seconds: float
+
+
+class AdmissionControl:
+    def __init__(self, max_queue_delay_seconds: float, retry_after_seconds: int = 1,
+                 clock: Callable[[], float] = time.monotonic):
+        if max_queue_delay_seconds <= 0:
+            raise ValueError("max_queue_delay_seconds must be positive")
+        self.max_queue_delay_seconds = max_queue_delay_seconds
+        self.retry_after_seconds = retry_after_seconds
+        self._clock = clock
+        self._lock = threading.Lock()
+        self.admitted = 0
+        self.rejected = 0
+
+    def admit(self, arrived_at: float) -> AdmissionDecision:
+        delay = self._clock() - arrived_at
+        admitted = delay <= self.max_queue_delay_seconds
+        with self._lock:
+            if admitted:
+                self.admitted += 1
+            else:
+                self.rejected += 1
+        return AdmissionDecision(admitted, delay)
+
+    def retry_after_headers(self) -> Dict[str, str]:
+        return {"Retry-After": str(self.retry_after_seconds), "Cache-Control": "no-store"}
+
+
+def arrival_time(scope: dict) -> Optional[float]:
+    return scope.get(ARRIVED_AT)
@@ -0,0 +1,351 @@
+"""
+Long-lived components built from the configuration.
+
+Each component is rebuilt only when the config sections it depends on change
+(see ConfigComponent), so a config reload keeps unrelated connection pools and
+caches warm.
+"""
+import os
+from typing import Optional
+
+import requests
+
+from app.application.decision_signer import DecisionSigner
+from app.application.session_ticket import SessionTicketService
+from app.application.ssh_certificate_issuer import SSHCertificateIssuer
+from app.clients.concurrency_limit import (AdaptiveConcurrencyLimiter,
+                                          ConcurrencyLimitedSession)
+from app.clients.ejbca_client import EJBCAClient
+from app.core.admission_control import AdmissionControl
+from app.core.config.config_store import ConfigSnapshot
+from app.core.config.get_config import get_config_store
+from app.core.http_cache import HttpCachePolicy
+from app.domain.entities.authorized_keys import AuthorizedKeysBuilder
+from app.domain.repositories.certificate_repository import CertificateRepository
+from app.infrastucture.audit_log import AuditLog
+from app.infrastucture.certificate_cache import (CachingCertificateRepository,
+                                                CertificateCache)
+from app.infrastucture.certificate_decoder import CertificateDecoder
+from app.infrastucture.certificate_population import PopulationSnapshots
+from app.infrastucture.certificate_repository_impl import (
+    LOOKUP_REVOCATION_STATUS, LOOKUP_SINGLE_SEARCH, CertificateRespositoryImpl)
+from app.infrastucture.decode_pipeline import DecodePipeline
+from app.infrastucture.event_broadcaster import EventBroadcaster
+from app.infrastucture.fingerprint_indexing_repository import \
+    FingerprintIndexingCertificateRepository
+from app.infrastucture.key_fingerprint_index import KeyFingerprintIndex
+from app.infrastucture.revocation_epochs import RevocationEpochs
+from app.infrastucture.revocation_event_log import RevocationEventLog
+from app.infrastucture.serial_filter import IssuedSerialIndex
+from app.infrastucture.shadow_repository import ShadowCertificateRepository
+from app.infrastucture.serial_filtering_repository import \
+    SerialFilteringCertificateRepository
+from app.infrastucture.traffic_capture import (TrafficRecorder,
+                                               capture_ejbca_response)
+
+
+def _build_ejbca_client(snapshot: ConfigSnapshot) -> EJBCAClient:
+    ejbca = snapshot.section("ejbca")
+    ejbca_concurrency = snapshot.section("ejbca_concurrency")
+    if ejbca_concurrency:
+        limiter = AdaptiveConcurrencyLimiter(
+            initial_limit=ejbca_concurrency.get("initial_limit", 10),
+            min_limit=ejbca_concurrency.get("min_limit", 1),
+            max_limit=ejbca_concurrency.get("max_limit", 100),
+            latency_target_seconds=ejbca_concurrency.get("latency_target_ms", 500) / 1000,
+            backoff_ratio=ejbca_concurrency.get("backoff_ratio", 0.9),
+        )
+        session = ConcurrencyLimitedSession(limiter, ejbca_concurrency.get("max_wait_ms", 2000) / 1000)
+    else:
+        session = requests.Session()
+    # Only records while a /validate request is being captured (traffic_capture section)
+    session.hooks["response"].append(capture_ejbca_response)
+    return EJBCAClient(
+        base_url=ejbca["base_url"],
+        certificate_path=ejbca["certificate_path"],
+        cert_password=ejbca["cert_password"],
+        session=session,
+    )
+
+
+def _build_ejbca_repository(snapshot: ConfigSnapshot) -> CertificateRespositoryImpl:
+    ejbca = snapshot.section("ejbca")
+    return CertificateRespositoryImpl(
+        ejbca_client.get(),
+        CertificateDecoder(),
+        ejbca["issuer_dn"],
+        ca_name=ejbca.get("ca_name"),
+        lookup_mode=ejbca.get("lookup_mode", LOOKUP_REVOCATION_STATUS),
+        search_page_size=ejbca.get("search_page_size", 500),
+    )
+
+
+def _build_shadow_repository(snapshot: ConfigSnapshot) -> Optional[ShadowCertificateRepository]:
+    shadow = snapshot.section("shadow")
+    if not shadow:
+        return None
+    ejbca = snapshot.section("ejbca")
+    # The alternate engine available today: the other EJBCA lookup mode
+    secondary = CertificateRespositoryImpl(
+        ejbca_client.get(),
+        CertificateDecoder(),
+        ejbca["issuer_dn"],
+        ca_name=shadow.get("ca_name", ejbca.get("ca_name")),
+        lookup_mode=shadow.get("lookup_mode", LOOKUP_SINGLE_SEARCH),
+        search_page_size=ejbca.get("search_page_size", 500),
+    )
+    return ShadowCertificateRepository(
+        ejbca_repository.get(),
+        secondary,
+        workers=shadow.get("workers", 1),
+        max_pending=shadow.get("max_pending", 100),
+        log_every=shadow.get("log_every", 1000),
+    )
+
+
+def _build_serial_index(snapshot: ConfigSnapshot) -> Optional[IssuedSerialIndex]:
+    serial_filter = snapshot.section("serial_filter")
+    if not serial_filter:
+        return None
+    index = IssuedSerialIndex(
+        ejbca_repository.get().iter_issued_serials,
+        false_positive_rate=serial_filter.get("false_positive_rate", 0.001),
+        miss_refresh_interval=serial_filter.get("miss_refresh_interval_seconds", 5),
+    )
+    index.start(serial_filter.get("rebuild_interval_seconds", 600))
+    return index
+
+
+def _build_key_fingerprint_index(snapshot: ConfigSnapshot) -> Optional[KeyFingerprintIndex]:
+    key_index = snapshot.section("key_index")
+    if not key_index:
+        return None
+    repository = ejbca_repository.get()
+    pipeline = DecodePipeline(workers=key_index.get("decode_workers", 1))
+
+    def certificate_source(since):
+        return (decoded for decoded, _ in repository.iter_decoded_certificates(pipeline, since))
+
+    index = KeyFingerprintIndex(certificate_source, pipeline)
+    index.start(key_index.get("sync_interval_seconds", 300))
+    return index
+
+
+def _build_certificate_repository(snapshot: ConfigSnapshot) -> CertificateRepository:
+    repository: CertificateRepository = shadow_repository.get() or ejbca_repository.get()
+    index = serial_index.get()
+    if index is not None:
+        repository = SerialFilteringCertificateRepository(repository, index)
+    fingerprint_index = key_fingerprint_index.get()
+    if fingerprint_index is not None:
+        repository = FingerprintIndexingCertificateRepository(repository, fingerprint_index)
+    cache = certificate_cache.get()
+    if cache is not None:
+        repository = CachingCertificateRepository(repository, cache)
+    return repository
+
+
+def _build_certificate_cache(snapshot: ConfigSnapshot) -> Optional[CertificateCache]:
+    cache_config = snapshot.section("cache")
+    if not cache_config:
+        return None
+    if not snapshot.section("revocation_events"):
+        # The long TTLs are only safe while revocation events evict cached statuses
+        raise ValueError("cache requires revocation_events to be configured")
+    cache = CertificateCache(
+        snapshot.section("ejbca")["issuer_dn"],
+        revocation_ttl_seconds=cache_config.get("revocation_ttl_seconds", 3600),
+        certificate_ttl_seconds=cache_config.get("certificate_ttl_seconds", 3600),
+        max_entries=cache_config.get("max_entries", 100000),
+    )
+    cache.start_sweeper()
+    return cache
+
+
+def _apply_revocation_event(event: dict, offset: int):
+    cache = certificate_cache.get()
+    if cache is not None:
+        cache.apply_revocation_event(event["issuer_dn"], event["serial_id"], event["revoked"])
+    event_broadcaster.publish("revocation", event, offset)
+
+
+def policy_version(snapshot: Optional[ConfigSnapshot] = None) -> str:
+    """Identifies the access policy in force; equal in every worker running the same config."""
+    snapshot = snapshot or get_config_store().current()
+    return snapshot.digest[:16]
+
+
+def issuer_dn(snapshot: Optional[ConfigSnapshot] = None) -> str:
+    """DN of the CA whose certificates this server authorizes."""
+    snapshot = snapshot or get_config_store().current()
+    return snapshot.section("ejbca")["issuer_dn"]
+
+
+def _publish_policy_version(old: Optional[ConfigSnapshot], new: ConfigSnapshot):
+    event_broadcaster.publish("policy", {"version": policy_version(new)})
+
+
+def _build_revocation_event_log(snapshot: ConfigSnapshot) -> Optional[RevocationEventLog]:
+    revocation_events = snapshot.section("revocation_events")
+    if not revocation_events:
+        return None
+    event_log = RevocationEventLog(revocation_events["log_path"],
+                                   revocation_events.get("poll_interval_seconds", 1))
+    event_log.subscribe(_apply_revocation_event)
+    event_log.start()
+    return event_log
+
+
+def _build_revocation_event_token(snapshot: ConfigSnapshot) -> Optional[bytes]:
+    revocation_events = snapshot.section("revocation_events")
+    if not revocation_events:
+        return None
+    with open(revocation_events["token_path"], "rb") as file:
+        return file.read().strip() or None
+
+
+def _build_event_stream_token(snapshot: ConfigSnapshot) -> Optional[bytes]:
+    event_stream = snapshot.section("event_stream")
+    if not event_stream:
+        return None
+    with open(event_stream["token_path"], "rb") as file:
+        return file.read().strip() or None
+
+
+def _build_revocation_epochs(snapshot: ConfigSnapshot) -> Optional[RevocationEpochs]:
+    event_log = revocation_event_log.get()
+    if event_log is None:
+        return None
+    return RevocationEpochs(event_log)
+
+
+def _build_session_ticket_service(snapshot: ConfigSnapshot) -> Optional[SessionTicketService]:
+    session_tickets = snapshot.section("session_tickets")
+    if not session_tickets:
+        return None
+    epochs = revocation_epochs.get()
+    if epochs is None:
+        # Without the event log a ticket would outlive the revocation of its certificate
+        raise ValueError("session_tickets requires revocation_events to be configured")
+    return SessionTicketService.from_file(session_tickets["secret_path"],
+                                          session_tickets.get("ttl_seconds", 8 * 3600),
+                                          epochs)
+
+
+def _build_decision_signer(snapshot: ConfigSnapshot) -> Optional[DecisionSigner]:
+    decision_signing = snapshot.section("decision_signing")
+    if not decision_signing:
+        return None
+    return DecisionSigner.from_file(decision_signing["secret_path"],
+                                    decision_signing.get("ttl_seconds", 3600))
+
+
+def _build_population_snapshots(snapshot: ConfigSnapshot) -> Optional[PopulationSnapshots]:
+    population = snapshot.section("population")
+    if not population:
+        return None
+    repository = ejbca_repository.get()
+    pipeline = DecodePipeline(workers=population.get("decode_workers", 1))
+    snapshots = PopulationSnapshots(lambda: repository.iter_certificate_population(pipeline),
+                                    pipeline)
+    snapshots.start(population.get("rebuild_interval_seconds", 3600))
+    return snapshots
+
+
+def _build_admin_token(snapshot: ConfigSnapshot) -> Optional[bytes]:
+    population = snapshot.section("population")
+    if not population:
+        return None
+    with open(population["admin_token_path"], "rb") as file:
+        return file.read().strip() or None
+
+
+def _build_http_cache_policy(snapshot: ConfigSnapshot) -> Optional[HttpCachePolicy]:
+    http_cache = snapshot.section("http_cache")
+    if not http_cache:
+        return None
+    return HttpCachePolicy(allow_seconds=http_cache.get("allow_seconds", 5),
+                           deny_seconds=http_cache.get("deny_seconds", 2))
+
+
+def _build_traffic_recorder(snapshot: ConfigSnapshot) -> Optional[TrafficRecorder]:
+    traffic_capture = snapshot.section("traffic_capture")
+    if not traffic_capture:
+        return None
+    return TrafficRecorder(traffic_capture["path"],
+                           max_bytes=traffic_capture.get("max_bytes", 256 * 1024 * 1024))
+
+
+def _build_audit_log(snapshot: ConfigSnapshot) -> Optional[AuditLog]:
+    audit = snapshot.section("audit")
+    if not audit:
+        return None
+    return AuditLog(
+        # One file per worker: rotation is not coordinated between processes
+        audit["path"].format(pid=os.getpid()),
+        max_bytes=audit.get("max_bytes", 64 * 1024 * 1024),
+        backup_count=audit.get("backup_count", 5),
+        batch_size=audit.get("batch_size", 1024),
+        queue_size=audit.get("queue_size", 10000),
+        policy=audit.get("policy", "drop"),
+        block_timeout=audit.get("block_timeout_ms", 1000) / 1000,
+        fsync=audit.get("fsync", True),
+    )
+
+
+def _build_admission_control(snapshot: ConfigSnapshot) -> Optional[AdmissionControl]:
+    admission = snapshot.section("admission_control")
+    if not admission:
+        return None
+    return AdmissionControl(admission.get("max_queue_delay_ms", 250) / 1000,
+                            retry_after_seconds=admission.get("retry_after_seconds", 1))
+
+
+def _build_ssh_certificate_issuer(snapshot: ConfigSnapshot) -> Optional[SSHCertificateIssuer]:
+    ssh_certificates = snapshot.section("ssh_certificates")
+    if not ssh_certificates:
+        return None
+    return SSHCertificateIssuer.from_file(ssh_certificates["ca_key_path"],
+                                          ssh_certificates.get("validity_seconds", 3600),
+                                          ssh_certificates.get("extensions", ["permit-pty"]))
+
+
+ejbca_client = get_config_store().component(("ejbca", "ejbca_concurrency"), _build_ejbca_client)
+ejbca_repository = get_config_store().component(
+    ("ejbca",), _build_ejbca_repository, depends_on=(ejbca_client,))
+shadow_repository = get_config_store().component(
+    ("ejbca", "shadow"), _build_shadow_repository, depends_on=(ejbca_client, ejbca_repository))
+serial_index = get_config_store().component(
+    ("ejbca", "serial_filter"), _build_serial_index, depends_on=(ejbca_repository,))
+certificate_cache = get_config_store().component(
+    ("ejbca", "cache", "revocation_events"), _build_certificate_cache)
+key_fingerprint_index = get_config_store().component(
+    ("ejbca", "key_index"), _build_key_fingerprint_index, depends_on=(ejbca_repository,))
+certificate_repository = get_config_store().component(
+    ("ejbca", "serial_filter", "cache", "key_index", "shadow"), _build_certificate_repository,
+    depends_on=(ejbca_repository, shadow_repository, serial_index, key_fingerprint_index,
+                certificate_cache))
+revocation_event_log = get_config_store().component(
+    ("revocation_events",), _build_revocation_event_log)
+revocation_event_token = get_config_store().component(
+    ("revocation_events",), _build_revocation_event_token)
+event_stream_token = get_config_store().component(("event_stream",), _build_event_stream_token)
+revocation_epochs = get_config_store().component(
+    ("revocation_events",), _build_revocation_epochs, depends_on=(revocation_event_log,))
+session_ticket_service = get_config_store().component(
+    ("session_tickets", "revocation_events"), _build_session_ticket_service,
+    depends_on=(revocation_epochs,))
+decision_signer = get_config_store().component(
+    ("decision_signing",), _build_decision_signer)
+population_snapshots = get_config_store().component(
+    ("ejbca", "population"), _build_population_snapshots, depends_on=(ejbca_repository,))
+admin_token = get_config_store().component(("population",), _build_admin_token)
+http_cache_policy = get_config_store().component(("http_cache",), _build_http_cache_policy)
+audit_log = get_config_store().component(("audit",), _build_audit_log)
+admission_control = get_config_store().component(("admission_control",), _build_admission_control)
+traffic_recorder = get_config_store().component(("traffic_capture",), _build_traffic_recorder)
+ssh_certificate_issuer = get_config_store().component(
+    ("ssh_certificates",), _build_ssh_certificate_issuer)
+authorized_keys_builder = AuthorizedKeysBuilder()
+event_broadcaster = EventBroadcaster()
+get_config_store().subscribe(_publish_policy_version)
@@ -0,0 +1,212 @@
+"""Hot-reloadable configuration snapshots for the authentication server."""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+from types import MappingProxyType
+from typing import Any, Callable, Generic, List, Mapping, Optional, Tuple, TypeVar
+
+T = TypeVar("T")
+
+REQUIRED_EJBCA_KEYS = ("base_url", "certificate_path", "cert_password", "issuer_dn")
+
+
+def validate_config(config: Any) -> Optional[Exception]:
+    """Checks the settings every snapshot must have; returns the first problem found."""
+    if not isinstance(config, dict):
+        return ValueError("Config must be a mapping")
+    ejbca = config.get("ejbca")
+    if not isinstance(ejbca, dict):
+        return ValueError("Config section 'ejbca' is missing")
+    for key in REQUIRED_EJBCA_KEYS:
+        if not isinstance(ejbca.get(key), str) or not ejbca[key]:
+            return ValueError(f"Config key 'ejbca.{key}' must be a non-empty string")
+    return None
+
+
+class ConfigSnapshot:
+    """Immutable, validated view of one version of the configuration."""
+
+    def __init__(self, config: dict, version: int):
+        self.version = version
+        self.data: Mapping[str, Any] = _freeze(config)
+        self.digest = _digest(config)
+        self._section_digests = {name: _digest(value) for name, value in config.items()}
+
+    def section(self, name: str) -> Optional[Mapping[str, Any]]:
+        return self.data.get(name)
+
+    def section_digest(self, name: str) -> Optional[str]:
+        return self._section_digests.get(name)
+
+
+class ConfigStore:
+    """
+    Holds the current ConfigSnapshot. A reload validates the new config first
+    and then swaps the snapshot reference atomically; readers never see a
+    partially applied config.
+    """
+
+    def __init__(self, loader: Callable[[], Tuple[dict, Exception]],
+                 config_path: Optional[str] = None,
+                 logger: logging.Logger = logging.getLogger(__name__)):
+        self.loader = loader
+        self.config_path = config_path
+        self.logger = logger
+        self._snapshot: Optional[ConfigSnapshot] = None
+        self._lock = threading.Lock()
+        self._listeners: List[Callable[[Optional[ConfigSnapshot], ConfigSnapshot], None]] = []
+        self._watcher: Optional["ConfigWatcher"] = None
+
+    def current(self) -> ConfigSnapshot:
+        snapshot = self._snapshot
+        if snapshot is None:
+            _, err = self.reload()
+            if err:
+                raise err
+            snapshot = self._snapshot
+        return snapshot
+
+    def reload(self) -> Tuple[bool, Exception]:
+        """Loads and validates the config; returns whether a new snapshot was installed."""
+        config, err = self.loader()
+        if err is None:
+            err = validate_config(config)
+        if err:
+            self.logger.error("Config reload rejected: %s", err)
+            return False, err
+        with self._lock:
+            old = self._snapshot
+            if old is not None and old.digest == _digest(config):
+                return False, None
+            new = ConfigSnapshot(config, version=old.version + 1 if old else 1)
+            self._snapshot = new
+        self.logger.info("Config snapshot %s installed", new.version)
+        for listener in list(self._listeners):
+            try:
+                listener(old, new)
+            except Exception:  # pylint: disable=broad-except
+                self.logger.exception("Config listener failed")
+        return True, None
+
+    def subscribe(self, listener: Callable[[Optional[ConfigSnapshot], ConfigSnapshot], None]):
+        """Registers a callback invoked with (old, new) after each snapshot swap."""
+        self._listeners.append(listener)
+
+    def component(self, sections: Tuple[str, ...],
+                  factory: Callable[[ConfigSnapshot], T],
+                  depends_on: Tuple["ConfigComponent", ...] = ()) -> "ConfigComponent[T]":
+        return ConfigComponent(self, sections, factory, depends_on)
+
+    def start_watcher(self, interval_seconds: float) -> "ConfigWatcher":
+        if self.config_path is None:
+            raise ValueError("Config path unknown, cannot watch for changes")
+        with self._lock:
+            if self._watcher is None:
+                self._watcher = ConfigWatcher(self, self.config_path, interval_seconds)
+                self._watcher.start()
+        return self._watcher
+
+    def stop_watcher(self):
+        with self._lock:
+            watcher, self._watcher = self._watcher, None
+        if watcher is not None:
+            watcher.stop()
+
+
+class ConfigComponent(Generic[T]):
+    """
+    A component built from some config sections. It is built lazily and rebuilt
+    only when one of its sections changes, so unrelated edits keep warm caches
+    and connection pools. A replaced instance with a close() method is closed.
+
+    Components whose factory uses other components list them in depends_on;
+    it is also rebuilt whenever one of those is replaced, so it never keeps
+    using an outdated instance.
+    """
+
+    def __init__(self, store: ConfigStore, sections: Tuple[str, ...],
+                 factory: Callable[[ConfigSnapshot], T],
+                 depends_on: Tuple["ConfigComponent", ...] = ()):
+        self.store = store
+        self.sections = sections
+        self.factory = factory
+        self.depends_on = depends_on
+        self._current: Optional[Tuple[tuple, T]] = None
+        self._lock = threading.Lock()
+
+    def get(self) -> T:
+        snapshot = self.store.current()
+        # Dependencies are compared by identity: a rebuilt one is a new object
+        key = (tuple(snapshot.section_digest(section) for section in self.sections)
+               + tuple(_Identity(dependency.get()) for dependency in self.depends_on))
+        current = self._current
+        if current is not None and current[0] == key:
+            return current[1]
+        with self._lock:
+            current = self._current
+            if current is None or current[0] != key:
+                previous = current
+                current = (key, self.factory(snapshot))
+                self._current = current
+                if previous is not None and hasattr(previous[1], "close"):
+                    previous[1].close()
+        return current[1]
+
+
+class ConfigWatcher(threading.Thread):
+    """Polls the config file and reloads the store when it changes."""
+
+    def __init__(self, store: ConfigStore, path: str, interval_seconds: float):
+        super().__init__(name="config-watcher", daemon=True)
+        self.store = store
+        self.path = path
+        self.interval_seconds = interval_seconds
+        self._stop_event = threading.Event()
+        self._last_stat = self._stat()
+
+    def run(self):
+        while not self._stop_event.wait(self.interval_seconds):
+            stat = self._stat()
+            if stat != self._last_stat:
+                self._last_stat = stat
+                self.store.reload()
+
+    def stop(self):
+        self._stop_event.set()
+
+    def _stat(self) -> Optional[Tuple[int, int]]:
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+
+class _Identity:
+    """Compares equal only to a wrapper of the same object, whatever its __eq__."""
+    __slots__ = ("value",)
+
+    def __init__(self, value: Any):
+        self.value = value
+
+    def __eq__(self, other: Any) -> bool:
+        return isinstance(other, _Identity) and other.value is self.value
+
+    def __hash__(self) -> int:
+        return id(self.value)
+
+
+def _freeze(value: Any) -> Any:
+    if isinstance(value, dict):
+        return MappingProxyType({key: _freeze(item) for key, item in value.items()})
+    if isinstance(value, list):
+        return tuple(_freeze(item) for item in value)
+    return value
+
+
+def _digest(value: Any) -> str:
+    encoded = json.dumps(value, sort_keys=True, default=str).encode("utf-8")
+    return hashlib.sha256(encoded).hexdigest()
@@ -1,12 +1,26 @@
-from functools import lru_cache
 import os
+import threading
+from typing import Mapping
 
-from app.core.config.load_config import load_config
+from app.core.config.config_store import ConfigStore
+from app.core.config.load_config import config_file_path, load_config
 
+_store = None
+_store_lock = threading.Lock()
 
-@lru_cache
-def get_config() -> dict:
-    config, err = load_config(project_path=os.getenv("PROJECT_PATH"))
-    if err:
-        raise err
-    return config
+
+def get_config_store() -> ConfigStore:
+    """Process-wide ConfigStore; the config is loaded on first use."""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                project_path = os.getenv("PROJECT_PATH")
+                config_path, _ = config_file_path(project_path)
+                _store = ConfigStore(lambda: load_config(project_path=project_path),
+                                     config_path=config_path)
+    return _store
+
+
+def get_config() -> Mapping:
+    return get_config_store().current().data
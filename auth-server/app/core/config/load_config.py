@@ -5,13 +5,19 @@ from typing import Tuple
 import yaml
 
 
-def load_config(project_path: str) -> Tuple[dict, Exception]:
-    """Loads the correct config.yaml based on the ENV environment variable."""
+def config_file_path(project_path: str) -> Tuple[str, Exception]:
+    """Returns the path of the config file selected by the ENV environment variable."""
     env = os.getenv("ENV")
     if not env:
         return None, ValueError("ENV environment variable not set!")
+    return f"{project_path}/config/config.{env}.yaml", None
+
 
-    config_file = f"{project_path}/config/config.{env}.yaml"
+def load_config(project_path: str) -> Tuple[dict, Exception]:
+    """Loads the correct config.yaml based on the ENV environment variable."""
+    config_file, err = config_file_path(project_path)
+    if err:
+        return None, err
 
     if not os.path.exists(config_file):
         return None, FileNotFoundError(f"Config file {config_file} not found!")
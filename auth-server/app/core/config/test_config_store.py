@@ -0,0 +1,167 @@
+import copy
+import os
+import tempfile
+import time
+from unittest.mock import MagicMock
+
+import pytest
+import yaml
+
+from app.core.config.config_store import ConfigStore, validate_config
+
+# pylint: disable=missing-function-docstring
+
+
+@pytest.fixture
+def config_dict():
+    return {
+        "ejbca": {
+            "base_url": "https://ejbca-server.com",
+            "certificate_path": "/path/to/certificate.pem",
+            "cert_password": "/path/to/key.pem",
+            "issuer_dn": "CN=Test CA",
+        },
+        "decision_signing": {"secret_path": "/path/to/secret", "ttl_seconds": 60},
+    }
+
+
+@pytest.fixture
+def loader(config_dict):
+    state = {"config": config_dict, "err": None}
+    loader = MagicMock(side_effect=lambda: (copy.deepcopy(state["config"]), state["err"]))
+    loader.state = state
+    return loader
+
+
+@pytest.fixture
+def store(loader):
+    return ConfigStore(loader)
+
+
+def test_current_loads_first_snapshot(store, config_dict):
+    snapshot = store.current()
+
+    assert snapshot.version == 1
+    assert snapshot.data["ejbca"]["base_url"] == config_dict["ejbca"]["base_url"]
+
+
+def test_snapshot_is_immutable(store):
+    snapshot = store.current()
+
+    with pytest.raises(TypeError):
+        snapshot.data["ejbca"]["base_url"] = "https://other"
+
+
+def test_reload_swaps_snapshot_only_when_config_changes(store, loader):
+    first = store.current()
+
+    assert store.reload() == (False, None)
+    assert store.current() is first
+
+    loader.state["config"]["ejbca"]["base_url"] = "https://new-ejbca"
+    changed, err = store.reload()
+
+    assert changed is True and err is None
+    assert store.current().version == 2
+    assert store.current().data["ejbca"]["base_url"] == "https://new-ejbca"
+
+
+def test_invalid_config_keeps_previous_snapshot(store, loader):
+    first = store.current()
+    del loader.state["config"]["ejbca"]["issuer_dn"]
+
+    changed, err = store.reload()
+
+    assert changed is False
+    assert isinstance(err, ValueError)
+    assert store.current() is first
+
+
+def test_current_raises_when_first_load_fails(loader):
+    loader.state["err"] = FileNotFoundError("missing")
+
+    with pytest.raises(FileNotFoundError):
+        ConfigStore(loader).current()
+
+
+def test_component_is_rebuilt_only_when_its_sections_change(store, loader):
+    factory = MagicMock(side_effect=lambda snapshot: object())
+    component = store.component(("ejbca",), factory)
+    first = component.get()
+
+    loader.state["config"]["decision_signing"]["ttl_seconds"] = 120
+    store.reload()
+    assert component.get() is first
+
+    loader.state["config"]["ejbca"]["base_url"] = "https://new-ejbca"
+    store.reload()
+    assert component.get() is not first
+    assert factory.call_count == 2
+
+
+def test_listeners_receive_old_and_new_snapshots(store, loader):
+    listener = MagicMock()
+    store.current()
+    store.subscribe(listener)
+
+    loader.state["config"]["ejbca"]["base_url"] = "https://new-ejbca"
+    store.reload()
+
+    old, new = listener.call_args[0]
+    assert (old.version, new.version) == (1, 2)
+
+
+def test_watcher_reloads_when_file_changes(config_dict):
+    path = os.path.join(tempfile.mkdtemp(), "config.test.yaml")
+    with open(path, "w", encoding="utf-8") as file:
+        yaml.dump(config_dict, file)
+
+    def load():
+        with open(path, "r", encoding="utf-8") as file:
+            return yaml.safe_load(file), None
+
+    store = ConfigStore(load, config_path=path)
+    store.current()
+    store.start_watcher(0.01)
+    try:
+        config_dict["ejbca"]["base_url"] = "https://reloaded"
+        with open(path, "w", encoding="utf-8") as file:
+            yaml.dump(config_dict, file)
+        deadline = time.monotonic() + 2
+        while store.current().version == 1 and time.monotonic() < deadline:
+            time.sleep(0.01)
+    finally:
+        store.stop_watcher()
+
+    assert store.current().data["ejbca"]["base_url"] == "https://reloaded"
+
+
+def test_validate_config_requires_ejbca_section():
+    assert isinstance(validate_config({}), ValueError)
+    assert isinstance(validate_config(None), ValueError)
+
+
+def test_component_is_rebuilt_when_a_dependency_is_replaced(store, loader):
+    client = store.component(("decision_signing",), lambda snapshot: object())
+    repository = store.component(("ejbca",), lambda snapshot: {"client": client.get()},
+                                 depends_on=(client,))
+    first = repository.get()
+
+    loader.state["config"]["decision_signing"]["ttl_seconds"] = 120
+    store.reload()
+
+    assert repository.get() is not first
+    assert repository.get()["client"] is client.get()
+
+
+def test_component_keeps_instance_while_dependencies_are_unchanged(store, loader):
+    client = store.component(("ejbca",), lambda snapshot: object())
+    factory = MagicMock(side_effect=lambda snapshot: object())
+    repository = store.component(("ejbca",), factory, depends_on=(client,))
+    first = repository.get()
+
+    loader.state["config"]["decision_signing"]["ttl_seconds"] = 120
+    store.reload()
+
+    assert repository.get() is first
+    assert factory.call_count == 1
@@ -0,0 +1,52 @@
+"""
+HTTP cache headers for validation decisions.
+
+A decision depends only on the URL (serial in the path, username in the
+query), so a shared cache such as the nginx proxy can key on the request URI
+and serve repeated logins for a few seconds without reaching the app. Allow
+and deny decisions get their own short lifetimes; anything else is marked
+no-store. The ETag lets the proxy revalidate an expired entry with
+If-None-Match and get a 304 instead of the full body.
+"""
+import hashlib
+from typing import Dict, NamedTuple, Optional
+
+NO_STORE = {"Cache-Control": "no-store"}
+
+
+class HttpCachePolicy(NamedTuple):
+    allow_seconds: int = 5
+    deny_seconds: int = 2
+
+    def allow_headers(self, etag: str) -> Dict[str, str]:
+        return {"Cache-Control": _max_age(self.allow_seconds), "ETag": etag}
+
+    def deny_headers(self) -> Dict[str, str]:
+        return {"Cache-Control": _max_age(self.deny_seconds)}
+
+
+def etag_for(body: bytes) -> str:
+    return '"%s"' % hashlib.sha256(body).hexdigest()[:32]
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Weak comparison of an If-None-Match header against an ETag (RFC 9110, 13.1.2)."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag[2:] if etag.startswith("W/") else etag
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == opaque:
+            return True
+    return False
+
+
+def _max_age(seconds: int) -> str:
+    if seconds <= 0:
+        return "no-store"
+    # No must-revalidate: the proxy may serve a just-expired entry while it revalidates
+    return "public, max-age=%d" % seconds
@@ -0,0 +1,141 @@
+"""
+Logging for the auth server, with handler I/O off the request path.
+
+The root logger gets a single QueueHandler. A request thread only builds the
+record and puts it on a bounded queue; a QueueListener thread formats it and
+writes it to the real handlers (stderr, optionally a file), so a slow stream
+or disk never blocks a login. When the queue is full the record is dropped
+and counted rather than waited for.
+
+Records are queued unformatted, so "%s" arguments are rendered in the
+listener thread; log values that are not mutated afterwards.
+
+SamplingFilter thins out repetitive messages per level: within each window,
+the first `burst` records of a message template pass, then one in `every`.
+The next record that passes carries the number suppressed before it in
+record.suppressed, which SuppressedCountFormatter appends to the message.
+"""
+import logging
+import logging.handlers
+import queue
+import sys
+import threading
+import time
+from typing import Callable, Dict, Mapping, Optional, Tuple
+
+DEFAULT_FORMAT = "[%(asctime)s] %(levelname)s in %(name)s: %(message)s"
+
+
+class SamplingFilter(logging.Filter):
+    def __init__(self, rules: Mapping[int, Tuple[int, int]], window_seconds: float = 60.0,
+                 clock: Callable[[], float] = time.monotonic):
+        """rules maps a level number to (burst, every); levels without a rule are never sampled."""
+        super().__init__()
+        self.rules = dict(rules)
+        self.window_seconds = window_seconds
+        self._clock = clock
+        self._lock = threading.Lock()
+        # (level, template) -> [window start, seen, suppressed since last passed]
+        self._counts: Dict[Tuple[int, str], list] = {}
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        rule = self.rules.get(record.levelno)
+        if rule is None:
+            return True
+        burst, every = rule
+        # The template, not the formatted message: "%s" arguments differ between repeats
+        key = (record.levelno, str(record.msg))
+        now = self._clock()
+        with self._lock:
+            counts = self._counts.get(key)
+            if counts is None or now - counts[0] >= self.window_seconds:
+                if len(self._counts) > 10000:
+                    self._counts.clear()
+                counts = self._counts[key] = [now, 0, 0]
+            counts[1] += 1
+            seen = counts[1]
+            if seen > burst and (seen - burst) % every != 0:
+                counts[2] += 1
+                return False
+            suppressed, counts[2] = counts[2], 0
+        if suppressed:
+            record.suppressed = suppressed
+        return True
+
+
+class SuppressedCountFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        message = super().format(record)
+        suppressed = getattr(record, "suppressed", 0)
+        if suppressed:
+            message += f" ({suppressed} similar messages suppressed)"
+        return message
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that drops records when the queue is full instead of raising."""
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # The stdlib version formats the record here, in the request thread. The
+        # queue never leaves the process, so the record need not be made picklable
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            # Counted without a lock: an approximate figure is enough
+            self.dropped += 1
+
+
+def sampling_rules(sampling: Optional[Mapping]) -> Dict[int, Tuple[int, int]]:
+    """{"INFO": {"burst": 10, "every": 100}} -> {logging.INFO: (10, 100)}"""
+    rules = {}
+    for level_name, rule in (sampling or {}).items():
+        level = logging.getLevelName(str(level_name).upper())
+        if not isinstance(level, int):
+            raise ValueError(f"Unknown log level in sampling: {level_name}")
+        every = rule.get("every", 100)
+        if every < 1:
+            raise ValueError("sampling every must be at least 1")
+        rules[level] = (rule.get("burst", 10), every)
+    return rules
+
+
+def setup_logging(config: Optional[Mapping],
+                  logger: logging.Logger = logging.getLogger()) -> logging.handlers.QueueListener:
+    """
+    Replaces the handlers of logger (the root logger by default) with a
+    DroppingQueueHandler and starts the QueueListener that writes to stderr
+    and, with `path`, to a file. Call listener.stop() at shutdown to flush.
+    """
+    config = config or {}
+    formatter = SuppressedCountFormatter(config.get("format", DEFAULT_FORMAT))
+    handlers = []
+    stream_handler = logging.StreamHandler(sys.stderr)
+    stream_handler.setFormatter(formatter)
+    handlers.append(stream_handler)
+    if config.get("path"):
+        # WatchedFileHandler reopens the file after an external logrotate
+        file_handler = logging.handlers.WatchedFileHandler(config["path"])
+        file_handler.setFormatter(formatter)
+        handlers.append(file_handler)
+
+    queue_handler = DroppingQueueHandler(queue.Queue(config.get("queue_size", 10000)))
+    rules = sampling_rules(config.get("sampling"))
+    if rules:
+        queue_handler.addFilter(SamplingFilter(rules, config.get("sampling_window_seconds", 60)))
+
+    for handler in list(logger.handlers):
+        logger.removeHandler(handler)
+    logger.addHandler(queue_handler)
+    logger.setLevel(config.get("level", "INFO"))
+
+    listener = logging.handlers.QueueListener(queue_handler.queue, *handlers,
+                                              respect_handler_level=True)
+    listener.start()
+    return listener
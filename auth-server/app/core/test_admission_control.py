@@ -0,0 +1,40 @@
+import pytest
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+
+from app.core.admission_control import (AdmissionControl,
+                                        ArrivalTimeMiddleware, arrival_time)
+
+
+def test_admits_within_queue_delay():
+    admission = AdmissionControl(0.25, clock=lambda: 10.2)
+
+    decision = admission.admit(10.0)
+
+    assert decision.admitted
+    assert decision.queue_delay_seconds == pytest.approx(0.2)
+    assert (admission.admitted, admission.rejected) == (1, 0)
+
+
+def test_rejects_after_queue_delay():
+    admission = AdmissionControl(0.25, retry_after_seconds=3, clock=lambda: 11.0)
+
+    assert not admission.admit(10.0).admitted
+    assert admission.rejected == 1
+    assert admission.retry_after_headers()["Retry-After"] == "3"
+
+
+def test_delay_must_be_positive():
+    with pytest.raises(ValueError):
+        AdmissionControl(0)
+
+
+def test_middleware_stamps_arrival():
+    app = FastAPI()
+    app.add_middleware(ArrivalTimeMiddleware, clock=lambda: 42.0)
+
+    @app.get("/arrival")
+    def arrival(request: Request):
+        return {"arrived_at": arrival_time(request.scope)}
+
+    assert TestClient(app).get("/arrival").json() == {"arrived_at": 42.0}
@@ -0,0 +1,64 @@
+import copy
+from unittest.mock import MagicMock
+
+import pytest
+
+from app.clients.concurrency_limit import ConcurrencyLimitedSession
+from app.core import components
+from app.core.config.config_store import ConfigComponent, ConfigStore
+
+
+@pytest.fixture
+def config(tmp_path):
+    certificate = tmp_path / "superadmin.pem"
+    certificate.write_text("fake")
+    return {
+        "ejbca": {
+            "base_url": "https://ejbca.example.com",
+            "certificate_path": str(certificate),
+            "cert_password": str(certificate),
+            "issuer_dn": "CN=PSI-CA",
+        },
+    }
+
+
+@pytest.fixture
+def store(monkeypatch, config):
+    """Store de prueba conectado a todos los componentes del módulo."""
+    state = {"config": config}
+    store = ConfigStore(MagicMock(side_effect=lambda: (copy.deepcopy(state["config"]), None)))
+    store.state = state
+    for value in vars(components).values():
+        if isinstance(value, ConfigComponent):
+            monkeypatch.setattr(value, "store", store)
+            monkeypatch.setattr(value, "_current", None)
+    return store
+
+
+def test_reload_enabling_limiter_reaches_serving_repository(store):
+    assert not isinstance(components.certificate_repository.get().ejbca_client.session,
+                          ConcurrencyLimitedSession)
+
+    store.state["config"]["ejbca_concurrency"] = {"initial_limit": 4}
+    store.reload()
+
+    session = components.certificate_repository.get().ejbca_client.session
+    assert isinstance(session, ConcurrencyLimitedSession)
+    assert session is components.ejbca_client.get().session
+
+
+def test_unrelated_reload_keeps_serving_repository(store):
+    repository = components.certificate_repository.get()
+
+    store.state["config"]["http_cache"] = {"allow_seconds": 5}
+    store.reload()
+
+    assert components.certificate_repository.get() is repository
+
+
+def test_cache_without_revocation_events_is_rejected(store):
+    store.state["config"]["cache"] = {"revocation_ttl_seconds": 3600}
+    store.reload()
+
+    with pytest.raises(ValueError):
+        components.certificate_cache.get()
@@ -0,0 +1,35 @@
+from app.core.http_cache import HttpCachePolicy, etag_for, etag_matches
+
+
+def test_allow_and_deny_headers():
+    policy = HttpCachePolicy(allow_seconds=5, deny_seconds=2)
+
+    assert policy.allow_headers('"abc"') == {"Cache-Control": "public, max-age=5", "ETag": '"abc"'}
+    assert policy.deny_headers() == {"Cache-Control": "public, max-age=2"}
+
+
+def test_zero_lifetime_is_no_store():
+    policy = HttpCachePolicy(allow_seconds=0, deny_seconds=0)
+
+    assert policy.allow_headers('"abc"')["Cache-Control"] == "no-store"
+    assert policy.deny_headers() == {"Cache-Control": "no-store"}
+
+
+def test_etag_is_stable_and_quoted():
+    etag = etag_for(b"body")
+
+    assert etag == etag_for(b"body")
+    assert etag != etag_for(b"other")
+    assert etag.startswith('"') and etag.endswith('"')
+
+
+def test_etag_matches():
+    etag = etag_for(b"body")
+
+    assert etag_matches(etag, etag)
+    assert etag_matches("W/" + etag, etag)
+    assert etag_matches('"other", ' + etag, etag)
+    assert etag_matches("*", etag)
+    assert not etag_matches('"other"', etag)
+    assert not etag_matches(None, etag)
+    assert not etag_matches("", etag)
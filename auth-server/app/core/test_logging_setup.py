@@ -0,0 +1,135 @@
+import logging
+import queue
+import threading
+
+import pytest
+
+from app.core.logging_setup import (DroppingQueueHandler, SamplingFilter,
+                                    SuppressedCountFormatter, sampling_rules,
+                                    setup_logging)
+
+
+def _record(msg, level=logging.INFO, args=()):
+    return logging.LogRecord("app", level, __file__, 1, msg, args, None)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_sampling_passes_burst_then_one_in_every():
+    sampling = SamplingFilter({logging.INFO: (3, 10)}, clock=FakeClock())
+
+    passed = [sampling.filter(_record("Attempting to connect to %s", args=(index,)))
+              for index in range(33)]
+
+    # 3 of the burst, then the 10th, 20th and 30th after it
+    assert sum(passed) == 6
+    assert passed[:4] == [True, True, True, False]
+
+
+def test_passing_record_counts_suppressed():
+    sampling = SamplingFilter({logging.INFO: (1, 5)}, clock=FakeClock())
+    records = [_record("repeated") for _ in range(6)]
+
+    passed = [record for record in records if sampling.filter(record)]
+
+    assert len(passed) == 2
+    assert passed[1].suppressed == 4
+
+
+def test_formatter_shows_suppressed_count():
+    record = _record("Attempting to connect to %s", args=("ejbca",))
+    record.suppressed = 4
+    formatter = SuppressedCountFormatter("%(message)s")
+
+    assert formatter.format(record) == "Attempting to connect to ejbca (4 similar messages suppressed)"
+    assert formatter.format(_record("plain")) == "plain"
+
+
+def test_records_are_queued_unformatted():
+    handler = DroppingQueueHandler(queue.Queue())
+
+    handler.handle(_record("message %s", args=(1,)))
+
+    record = handler.queue.get_nowait()
+    assert (record.msg, record.args) == ("message %s", (1,))
+
+
+def test_sampling_is_per_template_and_level():
+    sampling = SamplingFilter({logging.INFO: (1, 1000)}, clock=FakeClock())
+
+    assert sampling.filter(_record("first %s", args=(1,)))
+    assert not sampling.filter(_record("first %s", args=(2,)))
+    assert sampling.filter(_record("second %s", args=(1,)))
+    assert sampling.filter(_record("first %s", level=logging.WARNING, args=(3,)))
+
+
+def test_window_resets_sampling():
+    clock = FakeClock()
+    sampling = SamplingFilter({logging.INFO: (1, 1000)}, window_seconds=60, clock=clock)
+    sampling.filter(_record("repeated"))
+    assert not sampling.filter(_record("repeated"))
+
+    clock.now = 61
+
+    assert sampling.filter(_record("repeated"))
+
+
+def test_sampling_rules_from_config():
+    assert sampling_rules({"info": {"burst": 2, "every": 50}}) == {logging.INFO: (2, 50)}
+    assert sampling_rules(None) == {}
+    with pytest.raises(ValueError):
+        sampling_rules({"LOUD": {}})
+    with pytest.raises(ValueError):
+        sampling_rules({"INFO": {"every": 0}})
+
+
+def test_full_queue_drops_instead_of_blocking():
+    handler = DroppingQueueHandler(queue.Queue(2))
+
+    for index in range(5):
+        handler.handle(_record("message %s", args=(index,)))
+
+    assert handler.queue.qsize() == 2
+    assert handler.dropped == 3
+
+
+class CollectingHandler(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.records = []
+        self.threads = set()
+        self.formatted = []
+
+    def emit(self, record):
+        self.records.append(record)
+        self.threads.add(threading.current_thread().name)
+        self.formatted.append(self.format(record))
+
+
+def test_setup_logging_writes_from_listener_thread(monkeypatch):
+    logger = logging.getLogger("test_logging_setup")
+    logger.propagate = False
+    collector = CollectingHandler()
+    monkeypatch.setattr(logging, "StreamHandler", lambda stream: collector)
+
+    listener = setup_logging({"level": "INFO", "format": "%(message)s",
+                              "sampling": {"INFO": {"burst": 2, "every": 5}}},
+                             logger=logger)
+    for index in range(8):
+        logger.info("Attempting to connect to %s", index)
+    logger.debug("not emitted")
+    logger.warning("warnings are never sampled")
+    listener.stop()
+    for handler in list(logger.handlers):
+        logger.removeHandler(handler)
+
+    assert collector.formatted == [
+        "Attempting to connect to 0", "Attempting to connect to 1",
+        "Attempting to connect to 6 (4 similar messages suppressed)", "warnings are never sampled"]
+    assert threading.current_thread().name not in collector.threads
@@ -14,7 +14,7 @@ class AuthorizedKeysBuilder:
                 emailAddress (str): Email address of the user.
                 commonName (str): Common name of the user.
                 role (str): Role of the user.
-                ssh_public_key (str): public key of the user in ssh compatible format.
+                public_key (X509PublicKey): public key of the user; RSA, ECDSA (P-256/384/521) or Ed25519.
             Example: environment="REMOTEUSER=german.lamberti" ssh-rsa AAAAB3NzaC1.....shortened== german.lamberti@unc.edu.ar
         """
         environment = f"REMOTEUSER={commonName}|{role}"
@@ -1,5 +1,6 @@
 from datetime import datetime, timezone
 from enum import Enum
+from typing import Optional
 
 from app.domain.entities.x509_public_key import X509PublicKey
 
@@ -31,7 +32,9 @@ class Certificate:
         self.expiry_date = expiry_date
         self.subject_components = subject_components
 
-    def is_expired(self, now: datetime = datetime.now(timezone.utc)) -> bool:
+    def is_expired(self, now: Optional[datetime] = None) -> bool:
+        if now is None:
+            now = datetime.now(timezone.utc)
         return now > self.expiry_date
 
     def __repr__(self) -> str:
@@ -0,0 +1,48 @@
+import threading
+import weakref
+
+from app.domain.entities.x509_public_key import X509PublicKey, spki_fingerprint
+
+
+class PublicKeyPool:
+    """
+    Interns X509PublicKey instances by SPKI fingerprint.
+
+    Renewed certificates usually keep their key pair, so many certificates
+    share a key. The pool hands out one instance per distinct key, parsed
+    once and with its OpenSSH encoding computed once. Entries are weak: a key
+    leaves the pool when no certificate references it anymore.
+    """
+
+    def __init__(self):
+        self._keys: "weakref.WeakValueDictionary[str, X509PublicKey]" = weakref.WeakValueDictionary()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, pem_key: str) -> X509PublicKey:
+        """
+        Returns the pooled key equal to pem_key, creating it on first use.
+
+        :raises ValueError: if the key is malformed or unsupported.
+        """
+        fingerprint = spki_fingerprint(pem_key)
+        key = self._keys.get(fingerprint)
+        if key is not None:
+            self.hits += 1
+            return key
+        # Parse outside the lock; if two threads race, the first one stored wins
+        key = X509PublicKey(pem_key)
+        with self._lock:
+            pooled = self._keys.setdefault(fingerprint, key)
+        if pooled is key:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return pooled
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+
+default_public_key_pool = PublicKeyPool()
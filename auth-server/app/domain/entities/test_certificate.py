@@ -66,3 +66,22 @@ def test_valid_certificate_is_not_expired(valid_expiry_date, mock_public_key):
                             "CN": "test-CN", "role": "test-role"}
     )
     assert certificate.is_expired() is False, "Un certificado válido no debe estar expirado"
+
+
+def test_is_expired_uses_the_current_time(mock_public_key, monkeypatch):
+    """is_expired() sin argumentos debe usar la hora actual, no la de importación del módulo."""
+    expiry_date = datetime.now(timezone.utc) + timedelta(hours=1)
+    certificate = Certificate(
+        serial_id=SerialNumber(123456789),
+        public_key=mock_public_key,
+        expiry_date=expiry_date,
+        subject_components={}
+    )
+    assert certificate.is_expired() is False
+
+    later = expiry_date + timedelta(seconds=1)
+    fake_datetime = MagicMock(wraps=datetime)
+    fake_datetime.now.return_value = later
+    monkeypatch.setattr("app.domain.entities.certificate.datetime", fake_datetime)
+
+    assert certificate.is_expired() is True
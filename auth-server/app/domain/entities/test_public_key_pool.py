@@ -0,0 +1,107 @@
+import gc
+import hashlib
+import tracemalloc
+
+import pytest
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+
+from app.domain.entities.public_key_pool import PublicKeyPool
+from app.domain.entities.x509_public_key import X509PublicKey
+from app.infrastucture.certificate_decoder import CertificateDecoder
+
+
+def pem_public_key(key) -> str:
+    return key.public_key().public_bytes(
+        serialization.Encoding.PEM, serialization.PublicFormat.SubjectPublicKeyInfo).decode()
+
+
+@pytest.fixture(scope="module")
+def keys():
+    return [rsa.generate_private_key(public_exponent=65537, key_size=1024) for _ in range(40)]
+
+
+def test_equal_keys_share_one_instance(keys):
+    pool = PublicKeyPool()
+
+    first = pool.get(pem_public_key(keys[0]))
+    second = pool.get(pem_public_key(keys[0]))
+    other = pool.get(pem_public_key(keys[1]))
+
+    assert first is second
+    assert other is not first
+    assert (pool.hits, pool.misses, len(pool)) == (1, 2, 2)
+
+
+def test_ssh_encoding_is_computed_once(keys):
+    key = PublicKeyPool().get(pem_public_key(keys[0]))
+
+    assert key.to_ssh_public_key() is key.to_ssh_public_key()
+
+
+def test_fingerprint_matches_der(keys):
+    """El fingerprint es el SHA-256 del SubjectPublicKeyInfo en DER."""
+    key = X509PublicKey(pem_public_key(keys[0]))
+    der = keys[0].public_key().public_bytes(
+        serialization.Encoding.DER, serialization.PublicFormat.SubjectPublicKeyInfo)
+    assert key.spki_fingerprint == hashlib.sha256(der).hexdigest()
+
+
+def test_unused_keys_leave_the_pool(keys):
+    pool = PublicKeyPool()
+    pool.get(pem_public_key(keys[0]))
+    gc.collect()
+
+    assert len(pool) == 0
+
+
+def test_invalid_key_is_rejected():
+    with pytest.raises(ValueError):
+        PublicKeyPool().get("not a key")
+
+
+def test_decoder_shares_keys_between_certificates(raw_certificate, keys):
+    decoder = CertificateDecoder(PublicKeyPool())
+
+    first = decoder.from_raw(raw_certificate(1, keys[0]))
+    renewed = decoder.from_raw(raw_certificate(2, keys[0]))
+
+    assert first.public_key is renewed.public_key
+
+
+class _NoPool:
+    """Sin interning: una instancia por certificado, como antes del pool."""
+
+    def get(self, pem_key: str) -> X509PublicKey:
+        return X509PublicKey(pem_key)
+
+
+def _retained_bytes(pool, raws) -> int:
+    decoder = CertificateDecoder(pool)
+    gc.collect()
+    tracemalloc.start()
+    try:
+        certificates = [decoder.from_raw(raw) for raw in raws]
+        for certificate in certificates:
+            certificate.public_key.to_ssh_public_key()
+        gc.collect()
+        retained, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    assert len(certificates) == len(raws)
+    return retained
+
+
+def test_memory_benchmark_large_population(raw_certificate, keys):
+    """
+    2000 certificados sobre 40 pares de claves (renovaciones). Solo mide la
+    memoria de Python; las claves nativas de OpenSSL no se rastrean, asi que el
+    ahorro real es mayor.
+    """
+    raws = [raw_certificate(serial, keys[serial % len(keys)], common_name="user%d" % serial)
+            for serial in range(1, 2001)]
+
+    pooled = _retained_bytes(PublicKeyPool(), raws)
+    unpooled = _retained_bytes(_NoPool(), raws)
+
+    assert pooled < unpooled * 0.8
@@ -1,5 +1,11 @@
-from cryptography.hazmat.primitives.asymmetric import rsa, ec
-from cryptography.hazmat.primitives import serialization
+import base64
+import hashlib
+import os
+import time
+
+import pytest
+from cryptography.hazmat.primitives.asymmetric import rsa, ec, ed25519, padding
+from cryptography.hazmat.primitives import hashes, serialization
 from pytest import raises
 
 from app.domain.entities.x509_public_key import X509PublicKey
@@ -59,3 +65,91 @@ def test_valid_ec_public_key():
     pk = X509PublicKey(pem_key=ec_pub_key)
     # Assert
     assert pk.pem_key == ec_pub_key, "EC public key should be valid"
+
+
+def test_ssh_fingerprint_matches_openssh_format():
+    """The fingerprint is the unpadded base64 SHA-256 of the SSH key blob."""
+    key = X509PublicKey(generate_rsa_public_key())
+    blob = base64.b64decode(key.to_ssh_public_key().split()[1])
+
+    fingerprint = key.ssh_fingerprint()
+
+    assert fingerprint.startswith("SHA256:")
+    assert "=" not in fingerprint
+    assert base64.b64decode(fingerprint[7:] + "=") == hashlib.sha256(blob).digest()
+
+
+def pem_of_public(public_key) -> str:
+    return public_key.public_bytes(
+        encoding=serialization.Encoding.PEM,
+        format=serialization.PublicFormat.SubjectPublicKeyInfo
+    ).decode()
+
+
+def pem_of(private_key) -> str:
+    return pem_of_public(private_key.public_key())
+
+
+@pytest.mark.parametrize("private_key, ssh_type", [
+    (ed25519.Ed25519PrivateKey.generate(), "ssh-ed25519"),
+    (ec.generate_private_key(ec.SECP256R1()), "ecdsa-sha2-nistp256"),
+    (ec.generate_private_key(ec.SECP384R1()), "ecdsa-sha2-nistp384"),
+])
+def test_ssh_conversion_of_ec_and_ed25519_keys(private_key, ssh_type):
+    """La clave SSH lleva el mismo material que la clave del certificado."""
+    key = X509PublicKey(pem_of(private_key))
+
+    ssh_key = key.to_ssh_public_key()
+
+    assert ssh_key.split()[0] == ssh_type
+    loaded = serialization.load_ssh_public_key(ssh_key.encode())
+    assert pem_of_public(loaded) == key.pem_key
+    assert key.ssh_fingerprint().startswith("SHA256:")
+
+
+def test_ssh_conversion_rejects_curves_openssh_does_not_support():
+    key = X509PublicKey(pem_of(ec.generate_private_key(ec.SECP256K1())))
+
+    with raises(ValueError):
+        key.to_ssh_public_key()
+
+
+def _per_operation_us(operation, rounds: int) -> float:
+    start = time.perf_counter()
+    for _ in range(rounds):
+        operation()
+    return (time.perf_counter() - start) / rounds * 1e6
+
+
+@pytest.mark.skipif(not os.environ.get("RUN_BENCHMARKS"),
+                    reason="timing ratio depends on the machine; set RUN_BENCHMARKS=1")
+def test_benchmark_signature_cost_per_login_by_key_type():
+    """
+    Costo criptografico de un login con clave publica: el cliente firma el
+    session id y sshd verifica la firma (una vez por login). Se compara por
+    tipo de clave junto con el tamano de la clave SSH.
+    """
+    session_id = hashlib.sha256(b"session").digest()
+    rsa_sha512 = (padding.PKCS1v15(), hashes.SHA512())
+    key_types = {
+        "rsa-3072": (rsa.generate_private_key(65537, 3072), rsa_sha512),
+        "rsa-4096": (rsa.generate_private_key(65537, 4096), rsa_sha512),
+        "ecdsa-p256": (ec.generate_private_key(ec.SECP256R1()), (ec.ECDSA(hashes.SHA256()),)),
+        "ecdsa-p384": (ec.generate_private_key(ec.SECP384R1()), (ec.ECDSA(hashes.SHA384()),)),
+        "ed25519": (ed25519.Ed25519PrivateKey.generate(), ()),
+    }
+    results = {}
+    for name, (private_key, algorithm) in key_types.items():
+        public_key = private_key.public_key()
+        signature = private_key.sign(session_id, *algorithm)
+        verify_us = _per_operation_us(
+            lambda: public_key.verify(signature, session_id, *algorithm), 100)
+        sign_us = _per_operation_us(lambda: private_key.sign(session_id, *algorithm), 10)
+        ssh_key = X509PublicKey(pem_of(private_key)).to_ssh_public_key()
+        results[name] = (verify_us, sign_us, len(ssh_key))
+
+    # RSA verification is cheap (small public exponent); the cost of large RSA
+    # keys is on the signing side and in key size, which grows every handshake
+    assert results["ed25519"][1] < results["rsa-3072"][1]
+    assert results["ecdsa-p256"][1] < results["rsa-3072"][1]
+    assert results["ed25519"][2] < results["rsa-3072"][2] / 4
@@ -1,20 +1,31 @@
+import base64
+import hashlib
 import re
 from cryptography.hazmat.primitives import serialization
-from cryptography.hazmat.primitives.asymmetric import rsa, ec
+from cryptography.hazmat.primitives.asymmetric import rsa, ec, ed25519
 from cryptography.exceptions import InvalidKey
 
+# Curves OpenSSH accepts as ecdsa-sha2-nistp256/384/521
+SSH_EC_CURVES = (ec.SECP256R1, ec.SECP384R1, ec.SECP521R1)
+
 class X509PublicKey:
-    """Encapsulates an X.509 public key with validation."""
+    """
+    Encapsulates an X.509 public key with validation.
+
+    Instances are immutable and may be shared between certificates; use a
+    PublicKeyPool to get one instance per distinct key.
+    """
     PEM_PUBLIC_KEY_PATTERN = re.compile(
         r"-----BEGIN PUBLIC KEY-----\n([A-Za-z0-9+/=\n]+)\n-----END PUBLIC KEY-----"
     )
+    __slots__ = ("pem_key", "_key_obj", "_ssh_public_key", "__weakref__")
 
     def __init__(self, pem_key: str):
         self._validate_pem_format(pem_key)
-        self._validate_crypto_structure(pem_key)
         self.pem_key = pem_key  # Store valid PEM key
         # Store the parsed key object for later use
-        self._key_obj = serialization.load_pem_public_key(pem_key.encode())
+        self._key_obj = self._validate_crypto_structure(pem_key)
+        self._ssh_public_key = None
 
     def _validate_pem_format(self, pem_key: str):
         """Ensure the key is in valid PEM format."""
@@ -27,25 +38,61 @@ class X509PublicKey:
         """Ensure the key can be parsed as a valid X.509 public key."""
         try:
             key_obj = serialization.load_pem_public_key(pem_key.encode())
-            if not isinstance(key_obj, (rsa.RSAPublicKey, ec.EllipticCurvePublicKey)):
-                raise ValueError("Unsupported public key type (must be RSA or EC)")
+            if not isinstance(key_obj, (rsa.RSAPublicKey, ec.EllipticCurvePublicKey,
+                                        ed25519.Ed25519PublicKey)):
+                raise ValueError("Unsupported public key type (must be RSA, EC or Ed25519)")
         except (ValueError, InvalidKey):
             raise ValueError("Invalid X.509 public key: cannot be parsed")
+        return key_obj
+
+    @property
+    def spki_fingerprint(self) -> str:
+        """Hex SHA-256 of the DER SubjectPublicKeyInfo; equal for equal keys."""
+        return spki_fingerprint(self.pem_key)
 
     def to_ssh_public_key(self) -> str:
         """
-        Converts the RSA PEM public key to the OpenSSH public key format.
+        Converts the PEM public key to the OpenSSH public key format.
 
-        :return: A string containing the SSH public key (e.g., "ssh-rsa AAAAB3NzaC1yc2EAAAADAQABAAABAQ...")
-        :raises ValueError: if the key is not an RSA key.
+        :return: A string containing the SSH public key (e.g., "ssh-rsa AAAAB3NzaC1yc2EAAAADAQABAAABAQ...",
+                 "ssh-ed25519 AAAAC3NzaC1lZDI1NTE5AAAA..." or "ecdsa-sha2-nistp256 AAAAE2VjZHNh...")
+        :raises ValueError: if the key is an EC key on a curve OpenSSH does not support.
         """
-        if not isinstance(self._key_obj, rsa.RSAPublicKey):
-            raise ValueError("SSH public key conversion is supported only for RSA keys")
+        if self._ssh_public_key is not None:
+            return self._ssh_public_key
+        if (isinstance(self._key_obj, ec.EllipticCurvePublicKey)
+                and not isinstance(self._key_obj.curve, SSH_EC_CURVES)):
+            raise ValueError(f"SSH public key conversion is not supported for curve {self._key_obj.curve.name}")
         ssh_bytes = self._key_obj.public_bytes(
             encoding=serialization.Encoding.OpenSSH,
             format=serialization.PublicFormat.OpenSSH
         )
-        return ssh_bytes.decode('utf-8')
+        self._ssh_public_key = ssh_bytes.decode('utf-8')
+        return self._ssh_public_key
+
+    def ssh_fingerprint(self) -> str:
+        """
+        Returns the OpenSSH SHA256 fingerprint of the key, as printed by ssh-keygen -l.
+
+        :raises ValueError: if the key cannot be converted to SSH format.
+        """
+        blob = base64.b64decode(self.to_ssh_public_key().split()[1])
+        digest = base64.b64encode(hashlib.sha256(blob).digest()).decode("ascii")
+        return "SHA256:" + digest.rstrip("=")
 
     def __repr__(self) -> str:
         return f"X509PublicKey(pem_key='{self.pem_key[:30]}...')"  # Truncated for readability
+
+
+def spki_fingerprint(pem_key: str) -> str:
+    """
+    Hex SHA-256 of the DER SubjectPublicKeyInfo inside a PEM public key. The
+    PEM body is that DER, so no key parsing is needed.
+
+    :raises ValueError: if the PEM is malformed.
+    """
+    match = X509PublicKey.PEM_PUBLIC_KEY_PATTERN.match(pem_key) if isinstance(pem_key, str) else None
+    if match is None:
+        raise ValueError("Invalid X.509 PEM public key format")
+    der = base64.b64decode(match.group(1))
+    return hashlib.sha256(der).hexdigest()
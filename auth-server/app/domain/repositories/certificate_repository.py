@@ -1,8 +1,15 @@
 from abc import ABC, abstractmethod
-from typing import Tuple
+from typing import NamedTuple, Optional, Tuple
 
 from app.domain.entities.certificate import Certificate
 
+
+class CertificateStatus(NamedTuple):
+    revoked: bool
+    # None when revoked: a revoked certificate is never fetched
+    certificate: Optional[Certificate]
+
+
 class CertificateRepository(ABC):
     @abstractmethod
     def is_revoked(self, serial_id: str) -> Tuple[bool, dict]:
@@ -11,3 +18,18 @@ class CertificateRepository(ABC):
     @abstractmethod
     def get_certificate(self, serial_id: str) -> Tuple[Certificate, dict]:
         pass
+
+    def get_certificate_status(self, serial_id: str) -> Tuple[CertificateStatus, dict]:
+        """
+        Revocation and, if not revoked, the certificate, as one lookup.
+        Repositories that learn both from a single backend call override this.
+        """
+        revoked, err = self.is_revoked(serial_id)
+        if err:
+            return None, {"error": "is_revoked call failed", "detail": err}
+        if revoked:
+            return CertificateStatus(True, None), None
+        certificate, err = self.get_certificate(serial_id)
+        if err:
+            return None, {"error": "get_certificate failed", "detail": err}
+        return CertificateStatus(False, certificate), None
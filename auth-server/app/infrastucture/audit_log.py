@@ -0,0 +1,139 @@
+"""
+Batched audit log of authorization decisions.
+
+submit() only puts the event on an in-memory queue; a writer thread takes
+everything queued (up to batch_size), writes it as JSON lines with one
+write() and, with fsync enabled, makes the whole batch durable with a single
+fsync (group commit). Under load batches grow, so the fsync cost per event
+falls instead of throttling requests.
+
+When the queue is full, the "drop" policy discards the event and counts it,
+so a slow disk never delays a login; "block" waits up to block_timeout for
+room, trading login latency for a complete trail. The file is rotated like
+logging's RotatingFileHandler: path.1 is the newest backup.
+"""
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from typing import Callable, List, Optional
+
+POLICY_DROP = "drop"
+POLICY_BLOCK = "block"
+POLICIES = (POLICY_DROP, POLICY_BLOCK)
+
+_STOP = object()
+
+
+class AuditLog:
+    def __init__(self, path: str, max_bytes: int = 64 * 1024 * 1024, backup_count: int = 5,
+                 batch_size: int = 1024, queue_size: int = 10000, policy: str = POLICY_DROP,
+                 block_timeout: float = 1.0, fsync: bool = True,
+                 logger: logging.Logger = logging.getLogger(__name__),
+                 clock: Callable[[], float] = time.time):
+        if policy not in POLICIES:
+            raise ValueError(f"policy must be one of {POLICIES}")
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.batch_size = batch_size
+        self.policy = policy
+        self.block_timeout = block_timeout
+        self.fsync = fsync
+        self.logger = logger
+        self._clock = clock
+        self._queue: "queue.Queue" = queue.Queue(maxsize=queue_size)
+        self._fd = self._open()
+        self.written = 0
+        self.dropped = 0
+        self.batches = 0
+        self._thread = threading.Thread(target=self._run, name="audit-log", daemon=True)
+        self._thread.start()
+
+    def submit(self, event: dict) -> bool:
+        """Queues the event, stamped with "ts"; returns False if it was dropped."""
+        event["ts"] = round(self._clock(), 6)
+        try:
+            if self.policy == POLICY_BLOCK:
+                self._queue.put(event, timeout=self.block_timeout)
+            else:
+                self._queue.put_nowait(event)
+        except queue.Full:
+            # Counted without a lock: an approximate figure is enough
+            self.dropped += 1
+            return False
+        return True
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Waits until everything submitted before the call is written (and synced)."""
+        done = threading.Event()
+        self._queue.put(done, timeout=timeout)
+        return done.wait(timeout)
+
+    def close(self, timeout: float = 5.0):
+        """Writes what is queued and stops the writer, waiting at most timeout seconds."""
+        if self._thread.is_alive():
+            deadline = time.monotonic() + timeout
+            try:
+                self._queue.put(_STOP, timeout=timeout)
+            except queue.Full:
+                # A stalled writer must not hang shutdown; the queued events are lost
+                self.logger.warning("Audit log writer stalled, %s queued events not written",
+                                    self._queue.qsize())
+                return
+            self._thread.join(max(0.0, deadline - time.monotonic()))
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            batch = [self._queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            events, waiters = [], []
+            for item in batch:
+                if item is _STOP:
+                    stopping = True
+                elif isinstance(item, threading.Event):
+                    waiters.append(item)
+                else:
+                    events.append(item)
+            try:
+                self._write(events)
+            except OSError:
+                self.logger.exception("Audit log write failed, %s events lost", len(events))
+            for waiter in waiters:
+                waiter.set()
+        os.close(self._fd)
+
+    def _write(self, events: List[dict]):
+        if not events:
+            return
+        data = b"".join(json.dumps(event, separators=(",", ":")).encode("utf-8") + b"\n"
+                        for event in events)
+        if os.fstat(self._fd).st_size + len(data) > self.max_bytes:
+            self._rotate()
+        os.write(self._fd, data)
+        if self.fsync:
+            os.fsync(self._fd)
+        self.written += len(events)
+        self.batches += 1
+
+    def _rotate(self):
+        os.close(self._fd)
+        for index in range(self.backup_count - 1, 0, -1):
+            source = f"{self.path}.{index}"
+            if os.path.exists(source):
+                os.replace(source, f"{self.path}.{index + 1}")
+        if self.backup_count > 0:
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.remove(self.path)
+        self._fd = self._open()
+
+    def _open(self) -> int:
+        return os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o640)
@@ -0,0 +1,234 @@
+"""
+Cache of EJBCA revocation statuses and certificates.
+
+Entries live for long TTLs because revocation events are pushed to every
+worker (see revocation_event_log.py) and update the cache as soon as they
+arrive. Only successful lookups are cached; errors always go back to EJBCA.
+A cached certificate never outlives its notAfter, and a sweeper thread drops
+entries as they expire so dead ones do not pile up.
+"""
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Optional, Tuple
+
+from app.domain.entities.certificate import Certificate
+from app.domain.repositories.certificate_repository import (
+    CertificateRepository, CertificateStatus)
+from app.infrastucture.certificate_repository_impl import same_dn
+from app.infrastucture.expiry_index import ExpiryIndex
+from app.infrastucture.serial_filter import normalize_serial
+
+_MISSING = object()
+
+
+class _TTLCache:
+    """
+    Thread-safe LRU map whose entries expire ttl_seconds after being stored, or
+    earlier when put() is given an expiry. Expiries are tracked in an
+    ExpiryIndex so that evict_expired() drops dead entries without a scan.
+    """
+
+    def __init__(self, ttl_seconds: float, max_entries: int, clock: Callable[[], float],
+                 wake: Optional[threading.Event] = None):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._clock = clock
+        self._wake = wake
+        self._entries: "OrderedDict[str, Tuple[float, object]]" = OrderedDict()
+        self._expiries = ExpiryIndex()
+        self._lock = threading.Lock()
+
+    def get(self, key: str):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return _MISSING
+            if entry[0] <= self._clock():
+                del self._entries[key]
+                self._expiries.discard(key)
+                return _MISSING
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def put(self, key: str, value, expires_at: Optional[float] = None):
+        if self.ttl_seconds <= 0:
+            return
+        deadline = self._clock() + self.ttl_seconds
+        if expires_at is not None:
+            deadline = min(deadline, expires_at)
+        with self._lock:
+            next_expiry = self._expiries.next_expiry()
+            self._entries[key] = (deadline, value)
+            self._entries.move_to_end(key)
+            self._expiries.schedule(key, deadline)
+            while len(self._entries) > self.max_entries:
+                evicted, _ = self._entries.popitem(last=False)
+                self._expiries.discard(evicted)
+        if self._wake is not None and (next_expiry is None or deadline < next_expiry):
+            self._wake.set()
+
+    def pop(self, key: str) -> bool:
+        with self._lock:
+            self._expiries.discard(key)
+            return self._entries.pop(key, None) is not None
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._expiries.clear()
+
+    def evict_expired(self) -> int:
+        with self._lock:
+            expired = self._expiries.pop_expired(self._clock())
+            for key in expired:
+                del self._entries[key]
+        return len(expired)
+
+    def next_expiry(self) -> Optional[float]:
+        with self._lock:
+            return self._expiries.next_expiry()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class CertificateCache:
+    """Revocation statuses and certificates of one issuer, keyed by normalized serial."""
+
+    def __init__(self, issuer_dn: str,
+                 revocation_ttl_seconds: float = 3600,
+                 certificate_ttl_seconds: float = 3600,
+                 max_entries: int = 100000,
+                 clock: Callable[[], float] = time.time,
+                 logger: logging.Logger = logging.getLogger(__name__)):
+        self.issuer_dn = issuer_dn
+        self.logger = logger
+        # Wall clock, because certificates are evicted at their notAfter
+        self._clock = clock
+        self._wake = threading.Event()
+        self._stop_event = threading.Event()
+        self._sweeper: Optional[threading.Thread] = None
+        self.revocations = _TTLCache(revocation_ttl_seconds, max_entries, clock, self._wake)
+        self.certificates = _TTLCache(certificate_ttl_seconds, max_entries, clock, self._wake)
+        # Bumped by every event; a lookup started before an event must not store its result
+        self.generation = 0
+        self._generation_lock = threading.Lock()
+
+    def apply_revocation_event(self, issuer_dn: str, serial_id: str, revoked: bool) -> bool:
+        """
+        Records a pushed revocation status. Revocations and unrevocations
+        overwrite the cached status and drop the cached certificate, so the next
+        request re-reads it. Returns False for events of another issuer.
+        """
+        serial = normalize_serial(serial_id)
+        if serial is None or not same_dn(issuer_dn, self.issuer_dn):
+            return False
+        self._bump_generation()
+        self.revocations.put(serial, revoked)
+        self.certificates.pop(serial)
+        return True
+
+    def invalidate(self, serial_id: str):
+        serial = normalize_serial(serial_id)
+        if serial is not None:
+            self._bump_generation()
+            self.revocations.pop(serial)
+            self.certificates.pop(serial)
+
+    def clear(self):
+        self._bump_generation()
+        self.revocations.clear()
+        self.certificates.clear()
+
+    def evict_expired(self) -> int:
+        """Drops every entry whose TTL or certificate notAfter has passed."""
+        return self.revocations.evict_expired() + self.certificates.evict_expired()
+
+    def start_sweeper(self, max_interval: float = 60.0):
+        """Evicts entries from a background thread as soon as they expire."""
+        if self._sweeper is not None:
+            return
+        self._sweeper = threading.Thread(target=self._sweep, args=(max_interval,),
+                                         name="certificate-cache-sweeper", daemon=True)
+        self._sweeper.start()
+
+    def close(self):
+        self._stop_event.set()
+        self._wake.set()
+
+    def _sweep(self, max_interval: float):
+        while not self._stop_event.is_set():
+            try:
+                self.evict_expired()
+            except Exception:  # pylint: disable=broad-except
+                self.logger.exception("Certificate cache sweep failed")
+            expiries = [expiry for expiry in (self.revocations.next_expiry(),
+                                              self.certificates.next_expiry())
+                        if expiry is not None]
+            timeout = max_interval
+            if expiries:
+                timeout = min(max_interval, max(0.0, min(expiries) - self._clock()))
+            # put() sets the event when it schedules an earlier expiry than we are waiting for
+            self._wake.wait(timeout)
+            self._wake.clear()
+
+    def _bump_generation(self):
+        with self._generation_lock:
+            self.generation += 1
+
+
+class CachingCertificateRepository(CertificateRepository):
+    """
+    Serves is_revoked, get_certificate and get_certificate_status from a
+    CertificateCache when possible.
+    """
+
+    def __init__(self, repository: CertificateRepository, cache: CertificateCache):
+        self.repository = repository
+        self.cache = cache
+
+    def is_revoked(self, serial_id: str) -> Tuple[bool, dict]:
+        serial = normalize_serial(serial_id)
+        if serial is not None:
+            cached = self.cache.revocations.get(serial)
+            if cached is not _MISSING:
+                return cached, None
+        generation = self.cache.generation
+        revoked, err = self.repository.is_revoked(serial_id)
+        if err is None and serial is not None and generation == self.cache.generation:
+            self.cache.revocations.put(serial, revoked)
+        return revoked, err
+
+    def get_certificate(self, serial_id: str) -> Tuple[Optional[Certificate], dict]:
+        serial = normalize_serial(serial_id)
+        if serial is not None:
+            cached = self.cache.certificates.get(serial)
+            if cached is not _MISSING:
+                return cached, None
+        generation = self.cache.generation
+        certificate, err = self.repository.get_certificate(serial_id)
+        if err is None and serial is not None and generation == self.cache.generation:
+            self.cache.certificates.put(serial, certificate,
+                                        expires_at=certificate.expiry_date.timestamp())
+        return certificate, err
+
+    def get_certificate_status(self, serial_id: str) -> Tuple[CertificateStatus, dict]:
+        serial = normalize_serial(serial_id)
+        if serial is not None:
+            revoked = self.cache.revocations.get(serial)
+            if revoked is True:
+                return CertificateStatus(True, None), None
+            if revoked is False:
+                certificate = self.cache.certificates.get(serial)
+                if certificate is not _MISSING:
+                    return CertificateStatus(False, certificate), None
+        generation = self.cache.generation
+        status, err = self.repository.get_certificate_status(serial_id)
+        if err is None and serial is not None and generation == self.cache.generation:
+            self.cache.revocations.put(serial, status.revoked)
+            if status.certificate is not None:
+                self.cache.certificates.put(serial, status.certificate,
+                                            expires_at=status.certificate.expiry_date.timestamp())
+        return status, err
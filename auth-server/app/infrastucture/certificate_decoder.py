@@ -4,12 +4,14 @@ from OpenSSL import crypto
 from datetime import datetime, timezone
 
 from app.domain.entities.certificate import Certificate, SerialNumber
-from app.domain.entities.x509_public_key import X509PublicKey
+from app.domain.entities.public_key_pool import (PublicKeyPool,
+                                                 default_public_key_pool)
 
 
 class CertificateDecoder:
-    def __init__(self):
-        pass
+    def __init__(self, public_key_pool: PublicKeyPool = default_public_key_pool):
+        # Certificates sharing a key pair share one X509PublicKey
+        self.public_key_pool = public_key_pool
 
     def from_raw(self, raw_certificate: str) -> Certificate:
         """
@@ -51,7 +53,7 @@ class CertificateDecoder:
         # Create and return the Certificate entity
         return Certificate(
             serial_id=SerialNumber(serial_number),
-            public_key=X509PublicKey(public_key),
+            public_key=self.public_key_pool.get(public_key),
             expiry_date=expiry_date,
             subject_components = subject_components_dict
         )
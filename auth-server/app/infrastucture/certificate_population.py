@@ -0,0 +1,153 @@
+"""
+Columnar snapshot of the issued certificate population for bulk analytics.
+
+Questions such as "which certificates with role X expire in the next 14
+days" touch every certificate. Instead of looping over Certificate objects
+and parsing subject strings, the snapshot keeps one NumPy column per
+attribute: expiry epochs, a revocation flag and a role bitmask (one bit per
+distinct role, in 64-bit words). Queries are boolean masks over those
+columns. A snapshot is immutable; PopulationSnapshots rebuilds a new one
+periodically and swaps it in.
+"""
+import logging
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from app.infrastucture.decode_pipeline import DecodedCertificate, DecodePipeline
+
+PopulationSource = Callable[[], Iterable[Tuple[DecodedCertificate, bool]]]
+
+
+class CertificatePopulation:
+    def __init__(self, serials: np.ndarray, expires_at: np.ndarray, revoked: np.ndarray,
+                 role_masks: np.ndarray, roles: List[str], built_at: float):
+        self.serials = serials
+        self.expires_at = expires_at
+        self.revoked = revoked
+        # Shape (certificates, words); bit i of the row is roles[i]
+        self.role_masks = role_masks
+        self.roles = roles
+        self.built_at = built_at
+        self._role_bits = {role: bit for bit, role in enumerate(roles)}
+
+    @classmethod
+    def from_records(cls, records: Iterable[Tuple[DecodedCertificate, bool]],
+                     built_at: Optional[float] = None) -> "CertificatePopulation":
+        """Builds a snapshot from (decoded, revoked) pairs; failed decodes are skipped."""
+        serials, expires_at, revoked, role_bits = [], [], [], []
+        roles: Dict[str, int] = {}
+        for decoded, is_revoked in records:
+            if decoded.error:
+                continue
+            bits = []
+            for role in (decoded.role or "").split(","):
+                role = role.strip()
+                if role:
+                    bits.append(roles.setdefault(role, len(roles)))
+            serials.append(decoded.serial)
+            expires_at.append(decoded.expires_at)
+            revoked.append(is_revoked)
+            role_bits.append(bits)
+
+        words = max(1, (len(roles) + 63) // 64)
+        rows = []
+        for bits in role_bits:
+            row = [0] * words
+            for bit in bits:
+                row[bit // 64] |= 1 << (bit % 64)
+            rows.append(row)
+        role_masks = np.array(rows, dtype=np.uint64).reshape(len(rows), words)
+        return cls(np.array(serials, dtype=object),
+                   np.array(expires_at, dtype=np.int64),
+                   np.array(revoked, dtype=bool),
+                   role_masks,
+                   list(roles),
+                   time.time() if built_at is None else built_at)
+
+    def __len__(self) -> int:
+        return len(self.serials)
+
+    def active(self, now: float) -> np.ndarray:
+        """Mask of certificates neither revoked nor expired at now."""
+        return ~self.revoked & (self.expires_at > now)
+
+    def with_role(self, role: str) -> np.ndarray:
+        bit = self._role_bits.get(role)
+        if bit is None:
+            return np.zeros(len(self), dtype=bool)
+        word = self.role_masks[:, bit // 64]
+        return (word & np.uint64(1 << (bit % 64))) != 0
+
+    def expiring(self, now: float, within_seconds: float,
+                 role: Optional[str] = None) -> List[Tuple[str, int]]:
+        """(serial, expires_at) of active certificates expiring within the window, soonest first."""
+        mask = self.active(now) & (self.expires_at <= now + within_seconds)
+        if role is not None:
+            mask &= self.with_role(role)
+        rows = np.flatnonzero(mask)
+        rows = rows[np.argsort(self.expires_at[rows], kind="stable")]
+        return [(self.serials[row], int(self.expires_at[row])) for row in rows]
+
+    def active_per_role(self, now: float) -> Dict[str, int]:
+        """Number of active certificates (principals) carrying each role."""
+        masks = self.role_masks[self.active(now)]
+        # One column per bit: little-endian bytes, each unpacked low bit first
+        bits = np.unpackbits(masks.astype("<u8").view(np.uint8), axis=1, bitorder="little")
+        counts = bits.sum(axis=0, dtype=np.int64)
+        return {role: int(counts[bit]) for bit, role in enumerate(self.roles)}
+
+    def summary(self, now: float) -> Dict[str, int]:
+        expired = ~self.revoked & (self.expires_at <= now)
+        return {
+            "total": len(self),
+            "active": int(np.count_nonzero(self.active(now))),
+            "revoked": int(np.count_nonzero(self.revoked)),
+            "expired": int(np.count_nonzero(expired)),
+        }
+
+
+class PopulationSnapshots:
+    """
+    Keeps the latest CertificatePopulation, rebuilt in the background. The
+    pipeline the source decodes with, if given, is closed on close().
+    """
+
+    def __init__(self, source: PopulationSource,
+                 pipeline: Optional[DecodePipeline] = None,
+                 logger: logging.Logger = logging.getLogger(__name__)):
+        self.source = source
+        self.pipeline = pipeline
+        self.logger = logger
+        self.current: Optional[CertificatePopulation] = None
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def rebuild(self):
+        started = time.monotonic()
+        population = CertificatePopulation.from_records(self.source())
+        self.current = population
+        self.logger.info("Certificate population snapshot rebuilt: %s certificates, %s roles in %.1fs",
+                         len(population), len(population.roles), time.monotonic() - started)
+
+    def start(self, interval_seconds: float):
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, args=(interval_seconds,),
+                                        name="certificate-population", daemon=True)
+        self._thread.start()
+
+    def close(self):
+        self._stop_event.set()
+        if self.pipeline is not None:
+            self.pipeline.close()
+
+    def _run(self, interval_seconds: float):
+        while not self._stop_event.is_set():
+            try:
+                self.rebuild()
+            except Exception:  # pylint: disable=broad-except
+                self.logger.exception("Certificate population rebuild failed")
+            self._stop_event.wait(interval_seconds)
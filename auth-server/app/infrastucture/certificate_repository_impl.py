@@ -1,10 +1,36 @@
-from typing import Tuple
+import logging
+import re
+from collections import deque
+from datetime import datetime
+from typing import Deque, Iterator, Optional, Tuple
+from urllib.parse import unquote
 
-from app.clients.ejbca_client import EJBCAClient
+from app.clients.ejbca_client import EJBCAClient, SearchCursor
 from app.domain.entities.certificate import Certificate
-from app.domain.repositories.certificate_repository import \
-    CertificateRepository
+from app.domain.repositories.certificate_repository import (
+    CertificateRepository, CertificateStatus)
 from app.infrastucture.certificate_decoder import CertificateDecoder
+from app.infrastucture.decode_pipeline import DecodedCertificate, DecodePipeline
+
+
+# Every status of a certificate that was actually issued; criteria on the same property are ORed
+ISSUED_STATUSES = ("CERT_ACTIVE", "CERT_NOTIFIEDABOUTEXPIRATION", "CERT_REVOKED")
+
+# is_revoked asks the revocationstatus endpoint; get_certificate runs a separate search
+LOOKUP_REVOCATION_STATUS = "revocation_status"
+# One v2 search answers get_certificate_status: its results carry the certificate status
+LOOKUP_SINGLE_SEARCH = "single_search"
+LOOKUP_MODES = (LOOKUP_REVOCATION_STATUS, LOOKUP_SINGLE_SEARCH)
+
+# CertificateConstants in EJBCA; v2 search reports them by name or by number. Any
+# other status (revoked, on hold, archived, unknown or missing) counts as revoked
+ACTIVE_STATUSES = ("CERT_ACTIVE", "CERT_NOTIFIEDABOUTEXPIRATION", 20, 21)
+SINGLE_SEARCH_PAGE_SIZE = 10
+
+# v2 search results are camelCase; the v1 search used by get_certificate is snake_case
+V2_SERIAL_NUMBER = "serialNumber"
+V2_CERTIFICATE = "base64Cert"
+V2_ISSUER_DN = "issuerDN"
 
 
 class CertificateRespositoryImpl(CertificateRepository):
@@ -13,12 +39,29 @@ class CertificateRespositoryImpl(CertificateRepository):
         ejbca_client: EJBCAClient,
         certificate_decoder: CertificateDecoder,
         issuer_dn: str,
+        ca_name: Optional[str] = None,
+        lookup_mode: str = LOOKUP_REVOCATION_STATUS,
+        search_page_size: int = 500,
+        logger: logging.Logger = logging.getLogger(__name__),
     ):
+        if lookup_mode not in LOOKUP_MODES:
+            raise ValueError(f"lookup_mode must be one of {LOOKUP_MODES}")
+        if lookup_mode == LOOKUP_SINGLE_SEARCH and not ca_name:
+            raise ValueError("lookup_mode single_search requires ca_name")
         self.ejbca_client = ejbca_client
         self.certificate_decoder = certificate_decoder
         self.issuer_dn = issuer_dn
+        self.ca_name = ca_name
+        self.search_page_size = search_page_size
+        self.logger = logger
+        self.lookup_mode = lookup_mode
 
     def is_revoked(self, serial_id) -> Tuple[bool, dict]:
+        if self.lookup_mode == LOOKUP_SINGLE_SEARCH:
+            result, err = self._search_by_serial(serial_id)
+            if err:
+                return None, err
+            return _is_revoked_status(result.get("status")), None
         revocationStatus, err = self.ejbca_client.get_revocation_status(
             self.issuer_dn, serial_id
         )
@@ -27,6 +70,12 @@ class CertificateRespositoryImpl(CertificateRepository):
         return revocationStatus.revoked, None
 
     def get_certificate(self, serial_id) -> Tuple[Certificate, dict]:
+        if self.lookup_mode == LOOKUP_SINGLE_SEARCH:
+            result, err = self._search_by_serial(serial_id)
+            if err:
+                return None, err
+            return self._decode(result[V2_CERTIFICATE])
+
         search_criteria = [
             {"property": "QUERY", "value": serial_id, "operation": "EQUAL"}
         ]
@@ -56,8 +105,150 @@ class CertificateRespositoryImpl(CertificateRepository):
                 "found_serial": found_serial_id,
             }
 
+        return self._decode(raw_certificate)
+
+    def get_certificate_status(self, serial_id) -> Tuple[CertificateStatus, dict]:
+        if self.lookup_mode != LOOKUP_SINGLE_SEARCH:
+            return super().get_certificate_status(serial_id)
+        result, err = self._search_by_serial(serial_id)
+        if err:
+            return None, {"error": "certificate search failed", "detail": err}
+        if _is_revoked_status(result.get("status")):
+            return CertificateStatus(True, None), None
+        certificate, err = self._decode(result[V2_CERTIFICATE])
+        if err:
+            return None, {"error": "get_certificate failed", "detail": err}
+        return CertificateStatus(False, certificate), None
+
+    def _decode(self, raw_certificate: str) -> Tuple[Certificate, dict]:
         try:
             certificate = self.certificate_decoder.from_raw(raw_certificate)
         except ValueError as e:
             return None, {"error": "Error al decodificar certificado", "cause": e}
         return certificate, None
+
+    def _search_by_serial(self, serial_id: str) -> Tuple[dict, dict]:
+        """
+        One v2 search for the serial, scoped to the CA. QUERY also matches subject
+        and username fields, so the result is only accepted if its serial and
+        issuer match exactly; a result without an issuer is never accepted.
+        """
+        search_criteria = [
+            {"property": "QUERY", "value": serial_id, "operation": "EQUAL"}
+        ]
+        search_criteria.append(
+            {"property": "CA", "value": self.ca_name, "operation": "EQUAL"})
+
+        search_response, err = self.ejbca_client.search_v2(
+            criteria=search_criteria, page_size=SINGLE_SEARCH_PAGE_SIZE
+        )
+        if err is not None:
+            return None, {
+                "error": f"Fallo busqueda de certificado con serial: {serial_id}",
+                "cause": err,
+            }
+
+        for result in search_response.get("certificates", []):
+            found_issuer_dn = result.get(V2_ISSUER_DN)
+            if (_same_serial(result.get(V2_SERIAL_NUMBER), serial_id)
+                    and found_issuer_dn and same_dn(found_issuer_dn, self.issuer_dn)
+                    and result.get(V2_CERTIFICATE)):
+                return result, None
+        return None, {"error": "No se encontraron certificados", "serial": serial_id}
+
+    def iter_issued_serials(self, since: Optional[datetime] = None) -> Iterator[str]:
+        """
+        Yields the serial of every certificate issued by the CA, or only of those
+        issued after `since`. Raises ValueError if the EJBCA search fails.
+        """
+        for result, _ in self.ejbca_client.iter_search_v2(
+                self._issued_criteria(since), page_size=self.search_page_size):
+            serial_number = result.get(V2_SERIAL_NUMBER)
+            if serial_number:
+                yield serial_number
+
+    def iter_certificates(self, since: Optional[datetime] = None,
+                          cursor: Optional[SearchCursor] = None
+                          ) -> Iterator[Tuple[Certificate, SearchCursor]]:
+        """
+        Yields (certificate, cursor) for every certificate issued by the CA, page
+        by page with bounded memory. Store the last cursor to resume an
+        interrupted sync. Certificates that cannot be decoded are logged and
+        skipped. Raises ValueError if the EJBCA search fails.
+        """
+        for result, next_cursor in self.ejbca_client.iter_search_v2(
+                self._issued_criteria(since), page_size=self.search_page_size, cursor=cursor):
+            certificate, err = self._decode(result.get(V2_CERTIFICATE, ""))
+            if err:
+                self.logger.warning("Skipping certificate %s: %s",
+                                    result.get(V2_SERIAL_NUMBER), err["cause"])
+                continue
+            yield certificate, next_cursor
+
+    def iter_decoded_certificates(self, pipeline: DecodePipeline,
+                                  since: Optional[datetime] = None,
+                                  cursor: Optional[SearchCursor] = None
+                                  ) -> Iterator[Tuple[DecodedCertificate, SearchCursor]]:
+        """
+        Like iter_certificates, but decodes in the pipeline's process pool and
+        yields compact DecodedCertificate results, including failed ones.
+        """
+        for decoded, _, next_cursor in self._iter_decoded_results(pipeline, since, cursor):
+            yield decoded, next_cursor
+
+    def iter_certificate_population(self, pipeline: DecodePipeline
+                                    ) -> Iterator[Tuple[DecodedCertificate, bool]]:
+        """Yields (decoded, revoked) for every certificate issued by the CA."""
+        for decoded, status, _ in self._iter_decoded_results(pipeline, None, None):
+            yield decoded, _is_revoked_status(status)
+
+    def _iter_decoded_results(self, pipeline: DecodePipeline, since: Optional[datetime],
+                              cursor: Optional[SearchCursor]
+                              ) -> Iterator[Tuple[DecodedCertificate, object, SearchCursor]]:
+        pending: Deque[Tuple[object, SearchCursor]] = deque()
+
+        def raw_certificates():
+            for result, next_cursor in self.ejbca_client.iter_search_v2(
+                    self._issued_criteria(since), page_size=self.search_page_size, cursor=cursor):
+                pending.append((result.get("status"), next_cursor))
+                yield result.get(V2_CERTIFICATE, "")
+
+        # Results come back in input order, one per input, so they pair up with the statuses and cursors
+        for decoded in pipeline.decode(raw_certificates(), ordered=True):
+            status, next_cursor = pending.popleft()
+            yield decoded, status, next_cursor
+
+    def _issued_criteria(self, since: Optional[datetime]) -> list:
+        search_criteria = [
+            {"property": "STATUS", "value": status, "operation": "EQUAL"}
+            for status in ISSUED_STATUSES
+        ]
+        if self.ca_name:
+            search_criteria.append(
+                {"property": "CA", "value": self.ca_name, "operation": "EQUAL"})
+        if since is not None:
+            search_criteria.append(
+                {"property": "ISSUED_DATE", "value": since.isoformat(), "operation": "AFTER"})
+        return search_criteria
+
+
+def _is_revoked_status(status) -> bool:
+    # Fails closed: only a status known to be active is not revoked
+    return str(status).upper() not in {str(active) for active in ACTIVE_STATUSES}
+
+
+def _same_serial(found_serial_id: Optional[str], serial_id: str) -> bool:
+    if not found_serial_id:
+        return False
+    try:
+        return int(found_serial_id, 16) == int(serial_id, 16)
+    except ValueError:
+        return found_serial_id.upper() == serial_id.upper()
+
+
+def same_dn(found_dn: str, issuer_dn: str) -> bool:
+    """Compares DNs ignoring URL-encoding, case and spaces around separators."""
+    # issuer_dn is URL-encoded in the config because it goes into revocationstatus URLs
+    def normalize(dn):
+        return re.sub(r"\s*([,=])\s*", r"\1", unquote(dn)).strip().lower()
+    return normalize(found_dn) == normalize(issuer_dn)
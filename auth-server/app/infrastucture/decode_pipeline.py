@@ -0,0 +1,138 @@
+"""
+Parallel certificate decoding for bulk syncs and exports.
+
+Parsing X.509 is CPU-bound, so raw certificates are decoded in a process
+pool. They are sent in chunks to amortize inter-process overhead, and each
+result is a DecodedCertificate tuple of plain strings and ints instead of a
+Certificate with its key objects, which keeps pickling cheap. At most
+`max_pending_chunks` chunks are in flight, so memory stays bounded however
+long the input is.
+"""
+import multiprocessing
+import os
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from typing import Deque, Iterable, Iterator, List, NamedTuple, Optional
+
+from app.infrastucture.certificate_decoder import CertificateDecoder
+
+
+class DecodedCertificate(NamedTuple):
+    """Compact decode result; error is set, and the other fields are None, when decoding failed."""
+    serial: Optional[str]
+    expires_at: Optional[int]
+    role: Optional[str]
+    fingerprint: Optional[str]
+    ssh_key: Optional[str]
+    error: Optional[str] = None
+
+
+_decoder: Optional[CertificateDecoder] = None
+
+
+def decode_compact(raw_certificate: str) -> DecodedCertificate:
+    global _decoder
+    if _decoder is None:
+        _decoder = CertificateDecoder()
+    try:
+        certificate = _decoder.from_raw(raw_certificate)
+    except (ValueError, TypeError) as e:
+        return DecodedCertificate(None, None, None, None, None, str(e) or type(e).__name__)
+    try:
+        ssh_key = certificate.public_key.to_ssh_public_key()
+        fingerprint = certificate.public_key.ssh_fingerprint()
+    except ValueError:
+        ssh_key = fingerprint = None
+    return DecodedCertificate(
+        certificate.serial_id.to_hex_uppercase(),
+        int(certificate.expiry_date.timestamp()),
+        certificate.subject_components.get("role"),
+        fingerprint,
+        ssh_key,
+    )
+
+
+def decode_chunk(raw_certificates: List[str]) -> List[DecodedCertificate]:
+    return [decode_compact(raw) for raw in raw_certificates]
+
+
+class DecodePipeline:
+    """
+    Decodes raw certificates in a process pool.
+
+    With workers=1 everything runs in the calling process, which is cheaper
+    for small batches than starting a pool.
+    """
+
+    def __init__(self, workers: Optional[int] = None, chunk_size: int = 256,
+                 max_pending_chunks: Optional[int] = None):
+        self.workers = workers or os.cpu_count() or 1
+        self.chunk_size = chunk_size
+        self.max_pending_chunks = max_pending_chunks or self.workers * 2
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._closed = False
+
+    def decode(self, raw_certificates: Iterable[str],
+               ordered: bool = True) -> Iterator[DecodedCertificate]:
+        """
+        Yields one DecodedCertificate per input. With ordered=True results come
+        in input order; otherwise each chunk is yielded as soon as it is done.
+        """
+        chunks = _chunked(raw_certificates, self.chunk_size)
+        if self.workers == 1:
+            for chunk in chunks:
+                yield from decode_chunk(chunk)
+            return
+
+        executor = self._get_executor()
+        pending: Deque[Future] = deque()
+        for chunk in chunks:
+            pending.append(executor.submit(decode_chunk, chunk))
+            if len(pending) >= self.max_pending_chunks:
+                yield from self._drain(pending, ordered, until=self.max_pending_chunks - 1)
+        yield from self._drain(pending, ordered, until=0)
+
+    def close(self):
+        """Shuts the pool down; a closed pipeline does not start another one."""
+        self._closed = True
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    def __enter__(self) -> "DecodePipeline":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._closed:
+            raise RuntimeError("DecodePipeline is closed")
+        if self._executor is None:
+            # Forked children would inherit locks held by other threads, such as
+            # the shared public key pool's, and could deadlock on them
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"))
+        return self._executor
+
+    @staticmethod
+    def _drain(pending: Deque[Future], ordered: bool, until: int) -> Iterator[DecodedCertificate]:
+        while len(pending) > until:
+            if ordered:
+                yield from pending.popleft().result()
+                continue
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                pending.remove(future)
+                yield from future.result()
+
+
+def _chunked(items: Iterable[str], size: int) -> Iterator[List[str]]:
+    chunk = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
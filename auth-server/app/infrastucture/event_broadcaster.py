@@ -0,0 +1,65 @@
+"""
+Fan-out of revocation and policy events to the bastion agents subscribed to
+the event stream of this worker.
+
+A subscriber is a bounded asyncio.Queue read by its streaming response, so an
+idle bastion costs one suspended coroutine and no thread. Events may be
+published from any thread (the revocation log tail, a request thread, the
+config watcher); they are handed to the event loop with call_soon_threadsafe.
+A subscriber that falls behind is disconnected and resumes from its last
+event id, instead of making the publisher wait.
+"""
+import asyncio
+import contextlib
+import logging
+from typing import Iterator, Optional, Set
+
+# Queued in place of events when a subscriber overflowed; ends its stream
+LAGGED = None
+
+
+class Subscription:
+    def __init__(self, queue_size: int):
+        self.queue: "asyncio.Queue" = asyncio.Queue(maxsize=queue_size)
+
+
+class EventBroadcaster:
+    def __init__(self, queue_size: int = 256,
+                 logger: logging.Logger = logging.getLogger(__name__)):
+        self.queue_size = queue_size
+        self.logger = logger
+        self._subscribers: Set[Subscription] = set()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+    def publish(self, event_type: str, data: dict, event_id: Optional[int] = None):
+        """Queues the event for every current subscriber. Safe to call from any thread."""
+        loop = self._loop
+        if loop is None or not self._subscribers or loop.is_closed():
+            return
+        loop.call_soon_threadsafe(self._fan_out, (event_type, data, event_id))
+
+    @contextlib.contextmanager
+    def subscribe(self) -> Iterator[Subscription]:
+        """Registers a subscriber for the lifetime of the block; call from the event loop."""
+        self._loop = asyncio.get_running_loop()
+        subscription = Subscription(self.queue_size)
+        self._subscribers.add(subscription)
+        try:
+            yield subscription
+        finally:
+            self._subscribers.discard(subscription)
+
+    def _fan_out(self, item: tuple):
+        for subscription in list(self._subscribers):
+            try:
+                subscription.queue.put_nowait(item)
+            except asyncio.QueueFull:
+                self.logger.warning("Event stream subscriber lagged behind, disconnecting it")
+                self._subscribers.discard(subscription)
+                while not subscription.queue.empty():
+                    subscription.queue.get_nowait()
+                subscription.queue.put_nowait(LAGGED)
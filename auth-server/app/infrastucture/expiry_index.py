@@ -0,0 +1,65 @@
+"""
+Min-heap of cache keys ordered by the time they stop being valid.
+
+Rescheduling or discarding a key does not search the heap; the stale heap
+entry is skipped when it reaches the top. The heap is rebuilt from the live
+keys when stale entries outnumber them, so it never holds more than about
+twice the live keys.
+"""
+import heapq
+import itertools
+from typing import Dict, Hashable, List, Optional, Tuple
+
+COMPACT_MIN_SIZE = 64
+
+
+class ExpiryIndex:
+    def __init__(self):
+        self._heap: List[Tuple[float, int, Hashable]] = []
+        self._live: Dict[Hashable, Tuple[float, int]] = {}
+        self._sequence = itertools.count()
+
+    def schedule(self, key: Hashable, expires_at: float):
+        """Sets (or moves) the expiry of a key."""
+        entry = (expires_at, next(self._sequence))
+        self._live[key] = entry
+        heapq.heappush(self._heap, (entry[0], entry[1], key))
+        self._compact_if_needed()
+
+    def discard(self, key: Hashable):
+        if self._live.pop(key, None) is not None:
+            self._compact_if_needed()
+
+    def pop_expired(self, now: float) -> List[Hashable]:
+        """Removes and returns every key whose expiry is at or before now."""
+        expired = []
+        heap = self._heap
+        while heap and heap[0][0] <= now:
+            expires_at, sequence, key = heapq.heappop(heap)
+            if self._live.get(key) == (expires_at, sequence):
+                del self._live[key]
+                expired.append(key)
+        return expired
+
+    def next_expiry(self) -> Optional[float]:
+        heap = self._heap
+        while heap and self._live.get(heap[0][2]) != heap[0][:2]:
+            heapq.heappop(heap)
+        return heap[0][0] if heap else None
+
+    def clear(self):
+        self._heap.clear()
+        self._live.clear()
+
+    @property
+    def heap_size(self) -> int:
+        return len(self._heap)
+
+    def __len__(self) -> int:
+        return len(self._live)
+
+    def _compact_if_needed(self):
+        if len(self._heap) > COMPACT_MIN_SIZE and len(self._heap) > 2 * len(self._live):
+            self._heap = [(expires_at, sequence, key)
+                          for key, (expires_at, sequence) in self._live.items()]
+            heapq.heapify(self._heap)
@@ -0,0 +1,32 @@
+from typing import Tuple
+
+from app.domain.entities.certificate import Certificate
+from app.domain.repositories.certificate_repository import (
+    CertificateRepository, CertificateStatus)
+from app.infrastucture.key_fingerprint_index import KeyFingerprintIndex
+
+
+class FingerprintIndexingCertificateRepository(CertificateRepository):
+    """
+    Adds every certificate fetched through the wrapped repository to the key
+    fingerprint index, so a key is found by fingerprint before the next sync.
+    """
+
+    def __init__(self, repository: CertificateRepository, fingerprint_index: KeyFingerprintIndex):
+        self.repository = repository
+        self.fingerprint_index = fingerprint_index
+
+    def is_revoked(self, serial_id: str) -> Tuple[bool, dict]:
+        return self.repository.is_revoked(serial_id)
+
+    def get_certificate(self, serial_id: str) -> Tuple[Certificate, dict]:
+        certificate, err = self.repository.get_certificate(serial_id)
+        if err is None:
+            self.fingerprint_index.add_certificate(certificate)
+        return certificate, err
+
+    def get_certificate_status(self, serial_id: str) -> Tuple[CertificateStatus, dict]:
+        status, err = self.repository.get_certificate_status(serial_id)
+        if err is None and status.certificate is not None:
+            self.fingerprint_index.add_certificate(status.certificate)
+        return status, err
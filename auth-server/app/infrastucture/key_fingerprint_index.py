@@ -0,0 +1,132 @@
+"""
+Index from OpenSSH key fingerprint to certificate serials.
+
+sshd passes AuthorizedKeysCommand the fingerprint of the offered key (%f),
+not a serial. The index maps "SHA256:..." fingerprints to the serials of the
+certificates carrying that key, so a login can be validated from the key
+alone. It is filled by a periodic sync of issued certificates and by every
+certificate fetched from EJBCA in between. A key usually survives renewals,
+so one fingerprint may map to several serials.
+"""
+import logging
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Callable, Dict, Iterable, List, Optional
+
+from app.domain.entities.certificate import Certificate
+from app.infrastucture.decode_pipeline import DecodedCertificate, DecodePipeline
+from app.infrastucture.serial_filter import normalize_serial
+
+CertificateSource = Callable[[Optional[datetime]], Iterable[DecodedCertificate]]
+
+
+class KeyFingerprintIndex:
+    def __init__(self, certificate_source: CertificateSource,
+                 pipeline: Optional[DecodePipeline] = None,
+                 logger: logging.Logger = logging.getLogger(__name__),
+                 clock: Callable[[], float] = time.time):
+        """
+        certificate_source(since) must yield the decoded certificates issued
+        after `since`, or every issued certificate when `since` is None.
+        pipeline, if given, is the one the source decodes with; the index
+        owns it and closes it on close().
+        """
+        self.certificate_source = certificate_source
+        self.pipeline = pipeline
+        self.logger = logger
+        self._clock = clock
+        # fingerprint -> {serial: expires_at}
+        self._serials: Dict[str, Dict[str, int]] = {}
+        self._synced_at: Optional[datetime] = None
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def ready(self) -> bool:
+        return self._synced_at is not None
+
+    def add(self, fingerprint: str, serial_id: str, expires_at: int):
+        serial = normalize_serial(serial_id)
+        if not fingerprint or serial is None:
+            return
+        with self._lock:
+            self._serials.setdefault(fingerprint, {})[serial] = expires_at
+
+    def add_certificate(self, certificate: Certificate):
+        try:
+            fingerprint = certificate.public_key.ssh_fingerprint()
+        except ValueError:
+            # Keys OpenSSH cannot use never show up as an sshd fingerprint
+            return
+        self.add(fingerprint, certificate.serial_id.to_hex_uppercase(),
+                 int(certificate.expiry_date.timestamp()))
+
+    def serials(self, fingerprint: str) -> List[str]:
+        """Serials of unexpired certificates with this key, latest expiry first."""
+        now = self._clock()
+        with self._lock:
+            entries = self._serials.get(fingerprint, {})
+            live = [(expires_at, serial) for serial, expires_at in entries.items()
+                    if expires_at > now]
+        return [serial for _, serial in sorted(live, reverse=True)]
+
+    def sync(self):
+        """Rebuilds the index on the first call; afterwards adds the certificates issued since the last sync."""
+        started_at = datetime.now(timezone.utc)
+        full = self._synced_at is None
+        count = 0
+        rebuilt: Dict[str, Dict[str, int]] = {}
+        for decoded in self.certificate_source(self._synced_at):
+            serial = normalize_serial(decoded.serial)
+            if decoded.error or not decoded.fingerprint or serial is None:
+                continue
+            count += 1
+            if full:
+                rebuilt.setdefault(decoded.fingerprint, {})[serial] = decoded.expires_at
+            else:
+                self.add(decoded.fingerprint, serial, decoded.expires_at)
+        with self._lock:
+            if full:
+                # Keep what get_certificate added while the rebuild ran
+                for fingerprint, entries in self._serials.items():
+                    rebuilt.setdefault(fingerprint, {}).update(entries)
+                self._serials = rebuilt
+            self._prune_expired()
+        self._synced_at = started_at
+        self.logger.info("Key fingerprint index %s: %s certificates, %s keys",
+                         "rebuilt" if full else "synced", count, len(self))
+
+    def start(self, interval_seconds: float):
+        """Syncs in the background every interval_seconds."""
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, args=(interval_seconds,),
+                                        name="key-fingerprint-index", daemon=True)
+        self._thread.start()
+
+    def close(self):
+        self._stop_event.set()
+        if self.pipeline is not None:
+            self.pipeline.close()
+
+    def __len__(self) -> int:
+        return len(self._serials)
+
+    def _run(self, interval_seconds: float):
+        while not self._stop_event.is_set():
+            try:
+                self.sync()
+            except Exception:  # pylint: disable=broad-except
+                self.logger.exception("Key fingerprint index sync failed")
+            self._stop_event.wait(interval_seconds)
+
+    def _prune_expired(self):
+        now = self._clock()
+        for fingerprint in list(self._serials):
+            entries = self._serials[fingerprint]
+            for serial in [serial for serial, expires_at in entries.items() if expires_at <= now]:
+                del entries[serial]
+            if not entries:
+                del self._serials[fingerprint]
@@ -0,0 +1,57 @@
+"""
+Per-serial revocation epochs derived from the shared revocation event log.
+
+The epoch is the log offset: it only grows, and it is the same in every
+worker. Anything issued at epoch E for a serial is stale once the log holds
+an event for that serial after E.
+"""
+import threading
+from typing import Dict
+
+from app.infrastucture.revocation_event_log import RevocationEventLog
+from app.infrastucture.serial_filter import normalize_serial
+
+
+class RevocationEpochs:
+    def __init__(self, event_log: RevocationEventLog):
+        self.event_log = event_log
+        self._latest: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        # The log only dispatches events appended after it was opened; replay the rest
+        events, _ = event_log.read_from(0)
+        for event, offset in events:
+            self.apply(event, offset)
+        event_log.subscribe(self.apply)
+
+    @property
+    def feed_id(self) -> str:
+        """Names the log the epochs are offsets into; they mean nothing against another feed."""
+        return self.event_log.feed_id
+
+    def current(self) -> int:
+        """Epoch up to which this worker has applied revocation events."""
+        return self.event_log.offset
+
+    def apply(self, event: dict, offset: int):
+        serial = _serial_key(event.get("serial_id"))
+        if serial is None:
+            return
+        with self._lock:
+            if offset > self._latest.get(serial, -1):
+                self._latest[serial] = offset
+
+    def changed_since(self, serial_id: str, epoch: int) -> bool:
+        """
+        True if the serial had a revocation event after epoch, or if that cannot
+        be told because this worker has not reached epoch (lagging, or the log was
+        truncated since).
+        """
+        if epoch > self.current():
+            return True
+        serial = _serial_key(serial_id)
+        with self._lock:
+            return self._latest.get(serial, -1) > epoch
+
+
+def _serial_key(serial_id) -> str:
+    return normalize_serial(serial_id) or str(serial_id).upper()
@@ -0,0 +1,126 @@
+"""
+Revocation events shared by every worker through an append-only file.
+
+Each uvicorn worker is a separate process with its own caches. The worker
+that receives an event appends it as one JSON line to the log and polls at
+once; every other worker tails the log and applies the lines it has not seen,
+so all caches are updated within one poll interval. The byte offset after a line
+identifies the event.
+
+The log is local to one host, so each replica has its own feed and its
+offsets mean nothing on another replica. feed_id names this feed: it is the
+same for every worker tailing the file and changes with the host or when the
+file is replaced, so a stream client can tell that an offset is not ours.
+"""
+import fcntl
+import hashlib
+import json
+import logging
+import os
+import socket
+import threading
+from typing import Callable, List, Optional, Tuple
+
+RevocationListener = Callable[[dict, int], None]
+
+
+class RevocationEventLog:
+    def __init__(self, path: str, poll_interval: float = 1.0,
+                 logger: logging.Logger = logging.getLogger(__name__)):
+        self.path = path
+        self.poll_interval = poll_interval
+        self.logger = logger
+        self._listeners: List[RevocationListener] = []
+        self.feed_id = self._feed_id()
+        self._offset = self._size()
+        self._read_lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def offset(self) -> int:
+        """Offset up to which this worker has applied the log."""
+        return self._offset
+
+    def subscribe(self, listener: RevocationListener):
+        """Registers a callback invoked with (event, offset) for every event."""
+        self._listeners.append(listener)
+
+    def append(self, event: dict) -> int:
+        """Appends the event, applies the log up to it in this worker and returns its offset."""
+        line = json.dumps(event, sort_keys=True, separators=(",", ":")).encode("utf-8") + b"\n"
+        fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o640)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            os.write(fd, line)
+            offset = os.fstat(fd).st_size
+        finally:
+            os.close(fd)
+        # Polling rather than dispatching directly keeps events in log order
+        self.poll()
+        return offset
+
+    def read_from(self, offset: int) -> Tuple[List[Tuple[dict, int]], int]:
+        """Returns the complete events after offset and the offset to continue from."""
+        try:
+            with open(self.path, "rb") as file:
+                if os.fstat(file.fileno()).st_size < offset:
+                    # The log was truncated or rotated; start over
+                    offset = 0
+                file.seek(offset)
+                data = file.read()
+        except FileNotFoundError:
+            return [], 0
+        events = []
+        for line in data.splitlines(keepends=True):
+            if not line.endswith(b"\n"):
+                break
+            offset += len(line)
+            try:
+                events.append((json.loads(line), offset))
+            except ValueError:
+                self.logger.warning("Skipping malformed revocation event at offset %s", offset)
+        return events, offset
+
+    def poll(self):
+        """Applies the events appended since the last poll."""
+        with self._read_lock:
+            events, self._offset = self.read_from(self._offset)
+        for event, offset in events:
+            self._dispatch(event, offset)
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name="revocation-events", daemon=True)
+        self._thread.start()
+
+    def close(self):
+        self._stop_event.set()
+
+    def _run(self):
+        while not self._stop_event.wait(self.poll_interval):
+            try:
+                self.poll()
+            except Exception:  # pylint: disable=broad-except
+                self.logger.exception("Revocation event poll failed")
+
+    def _dispatch(self, event: dict, offset: int):
+        for listener in list(self._listeners):
+            try:
+                listener(event, offset)
+            except Exception:  # pylint: disable=broad-except
+                self.logger.exception("Revocation event listener failed")
+
+    def _feed_id(self) -> str:
+        # Created here so every worker hashes the same inode, whoever appends first
+        os.close(os.open(self.path, os.O_WRONLY | os.O_CREAT, 0o640))
+        stat = os.stat(self.path)
+        identity = f"{socket.gethostname()}:{stat.st_dev}:{stat.st_ino}"
+        return hashlib.sha256(identity.encode("utf-8")).hexdigest()[:16]
+
+    def _size(self) -> int:
+        try:
+            return os.stat(self.path).st_size
+        except FileNotFoundError:
+            return 0
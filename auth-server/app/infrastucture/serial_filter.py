@@ -0,0 +1,215 @@
+"""
+Local fast reject for malformed or never-issued certificate serials.
+
+A serial first has to be a hex string of at most 20 octets (RFC 5280). It is
+then checked against a Bloom filter of every serial issued by the CA, rebuilt
+periodically from EJBCA. A Bloom filter has no false negatives, only false
+positives, so a "not present" answer can be trusted and costs microseconds.
+
+Size at one million issued serials (m = -n ln p / ln(2)^2, k = m/n ln 2):
+
+    false positive rate 1%   -> 9.6 bits/serial, 1.14 MiB, k = 7
+    false positive rate 0.1% -> 14.4 bits/serial, 1.71 MiB, k = 10
+
+A false positive only means the request goes on to EJBCA as before.
+Certificates issued after the last rebuild are covered by a rate-limited
+delta refresh on the first miss.
+
+A rebuild streams serials straight into the filter without knowing how many
+will come, so the index uses a ScalableBloomFilter sized from the previous
+rebuild; a larger population only adds stages instead of raising the false
+positive rate.
+"""
+import hashlib
+import logging
+import math
+import re
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Callable, Iterable, Optional
+
+SERIAL_PATTERN = re.compile(r"^[0-9A-Fa-f]{1,40}$")
+
+
+def normalize_serial(serial_id: str) -> Optional[str]:
+    """Returns the serial as uppercase hex without leading zeros, or None if malformed."""
+    if not isinstance(serial_id, str) or not SERIAL_PATTERN.match(serial_id):
+        return None
+    return format(int(serial_id, 16), "X")
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter sized for a capacity and a target false positive rate."""
+
+    def __init__(self, capacity: int, false_positive_rate: float):
+        if capacity <= 0:
+            raise ValueError("capacity must be positive")
+        if not 0 < false_positive_rate < 1:
+            raise ValueError("false_positive_rate must be between 0 and 1")
+        self.capacity = capacity
+        self.false_positive_rate = false_positive_rate
+        self.num_bits = math.ceil(-capacity * math.log(false_positive_rate) / math.log(2) ** 2)
+        self.num_hashes = max(1, round(self.num_bits / capacity * math.log(2)))
+        self._bits = bytearray((self.num_bits + 7) // 8)
+        self.count = 0
+
+    def add(self, item: str):
+        for index in self._indexes(item):
+            self._bits[index >> 3] |= 1 << (index & 7)
+        self.count += 1
+
+    def __contains__(self, item: str) -> bool:
+        bits = self._bits
+        return all(bits[index >> 3] & (1 << (index & 7)) for index in self._indexes(item))
+
+    @property
+    def size_bytes(self) -> int:
+        return len(self._bits)
+
+    def _indexes(self, item: str):
+        # Double hashing (Kirsch-Mitzenmacher) from one 128-bit digest
+        digest = hashlib.blake2b(item.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return ((h1 + i * h2) % self.num_bits for i in range(self.num_hashes))
+
+
+class ScalableBloomFilter:
+    """
+    Bloom filter that grows in stages when more items arrive than expected
+    (Almeida et al., 2007). Each stage doubles the capacity and halves the false
+    positive rate of the one before, so the overall rate stays under the target.
+    """
+
+    def __init__(self, initial_capacity: int, false_positive_rate: float):
+        self.false_positive_rate = false_positive_rate
+        self._stages = [BloomFilter(initial_capacity, false_positive_rate / 2)]
+
+    def add(self, item: str):
+        stage = self._stages[-1]
+        if stage.count >= stage.capacity:
+            stage = BloomFilter(stage.capacity * 2, stage.false_positive_rate / 2)
+            self._stages.append(stage)
+        stage.add(item)
+
+    def __contains__(self, item: str) -> bool:
+        return any(item in stage for stage in self._stages)
+
+    @property
+    def count(self) -> int:
+        return sum(stage.count for stage in self._stages)
+
+    @property
+    def size_bytes(self) -> int:
+        return sum(stage.size_bytes for stage in self._stages)
+
+    @property
+    def stages(self) -> int:
+        return len(self._stages)
+
+
+class IssuedSerialIndex:
+    """
+    Bloom filter of issued serials, rebuilt periodically from a serial source.
+
+    serial_source(since) must yield every serial issued after `since`, or every
+    issued serial when `since` is None.
+    """
+
+    def __init__(self,
+                 serial_source: Callable[[Optional[datetime]], Iterable[str]],
+                 false_positive_rate: float = 0.001,
+                 min_capacity: int = 10000,
+                 miss_refresh_interval: float = 5.0,
+                 logger: logging.Logger = logging.getLogger(__name__),
+                 clock: Callable[[], float] = time.monotonic):
+        self.serial_source = serial_source
+        self.false_positive_rate = false_positive_rate
+        self.min_capacity = min_capacity
+        self.miss_refresh_interval = miss_refresh_interval
+        self.logger = logger
+        self._clock = clock
+        self._filter: Optional[ScalableBloomFilter] = None
+        self._built_at: Optional[datetime] = None
+        self._last_refresh = float("-inf")
+        self._refresh_lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def ready(self) -> bool:
+        return self._filter is not None
+
+    def rebuild(self):
+        """Builds a new filter from every issued serial and swaps it in."""
+        started_at = datetime.now(timezone.utc)
+        previous = self._filter
+        # Headroom over the last population, so one stage usually holds every serial
+        capacity = max(self.min_capacity, previous.count * 2 if previous is not None else 0)
+        bloom = ScalableBloomFilter(capacity, self.false_positive_rate)
+        for serial in map(normalize_serial, self.serial_source(None)):
+            if serial:
+                bloom.add(serial)
+        if bloom.count == 0:
+            # An empty CA is far likelier a broken source than real; rejecting every login is worse
+            self.logger.warning("Serial filter rebuild found no serials; not filtering")
+            self._filter = None
+            return
+        self._filter = bloom
+        self._built_at = started_at
+        self._last_refresh = self._clock()
+        self.logger.info("Serial filter rebuilt with %s serials (%s bytes, %s stages)",
+                         bloom.count, bloom.size_bytes, bloom.stages)
+
+    def add(self, serial_id: str):
+        serial = normalize_serial(serial_id)
+        bloom = self._filter
+        if serial and bloom is not None:
+            bloom.add(serial)
+
+    def might_exist(self, serial_id: str) -> bool:
+        """False only when the serial is certainly unknown; True while the filter is not built."""
+        serial = normalize_serial(serial_id)
+        if serial is None:
+            return False
+        bloom = self._filter
+        if bloom is None or serial in bloom:
+            return True
+        return self._refresh_on_miss(serial)
+
+    def start(self, interval_seconds: float):
+        """Builds the filter in the background and rebuilds it every interval_seconds."""
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, args=(interval_seconds,),
+                                        name="serial-filter", daemon=True)
+        self._thread.start()
+
+    def close(self):
+        self._stop_event.set()
+
+    def _run(self, interval_seconds: float):
+        while not self._stop_event.is_set():
+            try:
+                self.rebuild()
+            except Exception:  # pylint: disable=broad-except
+                self.logger.exception("Serial filter rebuild failed")
+            self._stop_event.wait(interval_seconds)
+
+    def _refresh_on_miss(self, serial: str) -> bool:
+        # At most one delta refresh per interval, shared by every miss in the meantime
+        if self._clock() - self._last_refresh < self.miss_refresh_interval:
+            return False
+        with self._refresh_lock:
+            if self._clock() - self._last_refresh >= self.miss_refresh_interval:
+                self._last_refresh = self._clock()
+                try:
+                    for issued in self.serial_source(self._built_at):
+                        self.add(issued)
+                except Exception:  # pylint: disable=broad-except
+                    self.logger.exception("Serial filter delta refresh failed")
+                    # Without fresh data, do not reject a serial that might be new
+                    return True
+        bloom = self._filter
+        return bloom is None or serial in bloom
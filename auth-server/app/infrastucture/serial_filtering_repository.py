@@ -0,0 +1,48 @@
+from typing import Tuple
+
+from app.domain.entities.certificate import Certificate
+from app.domain.repositories.certificate_repository import (
+    CertificateRepository, CertificateStatus)
+from app.infrastucture.serial_filter import IssuedSerialIndex, normalize_serial
+
+
+class SerialFilteringCertificateRepository(CertificateRepository):
+    """
+    Rejects malformed and never-issued serials locally before delegating to
+    the wrapped repository, so they cost no EJBCA calls.
+    """
+
+    def __init__(self, repository: CertificateRepository, serial_index: IssuedSerialIndex):
+        self.repository = repository
+        self.serial_index = serial_index
+
+    def is_revoked(self, serial_id: str) -> Tuple[bool, dict]:
+        err = self._reject(serial_id)
+        if err:
+            return None, err
+        return self.repository.is_revoked(serial_id)
+
+    def get_certificate(self, serial_id: str) -> Tuple[Certificate, dict]:
+        err = self._reject(serial_id)
+        if err:
+            return None, err
+        certificate, err = self.repository.get_certificate(serial_id)
+        if err is None:
+            self.serial_index.add(serial_id)
+        return certificate, err
+
+    def get_certificate_status(self, serial_id: str) -> Tuple[CertificateStatus, dict]:
+        err = self._reject(serial_id)
+        if err:
+            return None, err
+        status, err = self.repository.get_certificate_status(serial_id)
+        if err is None:
+            self.serial_index.add(serial_id)
+        return status, err
+
+    def _reject(self, serial_id: str) -> dict:
+        if normalize_serial(serial_id) is None:
+            return {"error": "Serial con formato invalido", "serial": serial_id}
+        if not self.serial_index.might_exist(serial_id):
+            return {"error": "Serial desconocido", "serial": serial_id}
+        return None
@@ -0,0 +1,134 @@
+"""
+Shadow comparison of an alternate CertificateRepository against the live one.
+
+The primary repository answers every call. The same call is then handed to
+the secondary on a small thread pool, off the request path, and the two
+answers and latencies are compared. When the pool already has max_pending
+calls queued or running, the comparison is dropped rather than waited for, so
+a slow or stuck secondary never adds latency to a login.
+"""
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Tuple
+
+from app.domain.entities.certificate import Certificate
+from app.domain.repositories.certificate_repository import (
+    CertificateRepository, CertificateStatus)
+
+OPERATIONS = ("is_revoked", "get_certificate", "get_certificate_status")
+
+
+class ShadowCertificateRepository(CertificateRepository):
+    def __init__(self, primary: CertificateRepository, secondary: CertificateRepository,
+                 workers: int = 1, max_pending: int = 100, log_every: int = 1000,
+                 logger: logging.Logger = logging.getLogger(__name__),
+                 clock: Callable[[], float] = time.perf_counter):
+        self.primary = primary
+        self.secondary = secondary
+        self.log_every = log_every
+        self.logger = logger
+        self._clock = clock
+        self._executor = ThreadPoolExecutor(max_workers=workers,
+                                            thread_name_prefix="shadow-repository")
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._lock = threading.Lock()
+        self._counters = {operation: _new_counters() for operation in OPERATIONS}
+
+    def is_revoked(self, serial_id: str) -> Tuple[bool, dict]:
+        return self._call("is_revoked", serial_id)
+
+    def get_certificate(self, serial_id: str) -> Tuple[Certificate, dict]:
+        return self._call("get_certificate", serial_id)
+
+    def get_certificate_status(self, serial_id: str) -> Tuple[CertificateStatus, dict]:
+        return self._call("get_certificate_status", serial_id)
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        """Per operation: compared, mismatches, dropped, failed and mean latencies in ms."""
+        with self._lock:
+            counters = {operation: dict(values) for operation, values in self._counters.items()}
+        stats = {}
+        for operation, values in counters.items():
+            compared = values["compared"]
+            stats[operation] = {
+                "compared": compared,
+                "mismatches": values["mismatches"],
+                "dropped": values["dropped"],
+                "failed": values["failed"],
+                "primary_mean_ms": values["primary_ms"] / compared if compared else 0.0,
+                "secondary_mean_ms": values["secondary_ms"] / compared if compared else 0.0,
+                # Positive when the secondary is slower
+                "max_delta_ms": values["max_delta_ms"] if compared else 0.0,
+            }
+        return stats
+
+    def close(self):
+        self._executor.shutdown(wait=False)
+
+    def _call(self, operation: str, serial_id: str):
+        started = self._clock()
+        result = getattr(self.primary, operation)(serial_id)
+        primary_ms = (self._clock() - started) * 1000
+        if not self._slots.acquire(blocking=False):
+            self._count(operation, dropped=1)
+            return result
+        try:
+            self._executor.submit(self._compare, operation, serial_id, result, primary_ms)
+        except RuntimeError:
+            # Shut down by a config reload
+            self._slots.release()
+            self._count(operation, dropped=1)
+        return result
+
+    def _compare(self, operation: str, serial_id: str, primary_result: tuple, primary_ms: float):
+        try:
+            started = self._clock()
+            try:
+                secondary_result = getattr(self.secondary, operation)(serial_id)
+            except Exception:  # pylint: disable=broad-except
+                self.logger.exception("Shadow %s failed for serial %s", operation, serial_id)
+                self._count(operation, failed=1)
+                return
+            secondary_ms = (self._clock() - started) * 1000
+            expected, actual = _comparable(primary_result), _comparable(secondary_result)
+            mismatch = expected != actual
+            if mismatch:
+                self.logger.warning("Shadow %s mismatch for serial %s: primary %s, secondary %s",
+                                    operation, serial_id, expected, actual,
+                                    extra={"serial_id": serial_id, "operation": operation})
+            compared = self._count(operation, compared=1, mismatches=int(mismatch),
+                                   primary_ms=primary_ms, secondary_ms=secondary_ms,
+                                   delta_ms=secondary_ms - primary_ms)
+            if self.log_every and compared % self.log_every == 0:
+                self.logger.info("Shadow repository: %s", self.stats())
+        finally:
+            self._slots.release()
+
+    def _count(self, operation: str, delta_ms: float = None, **increments) -> int:
+        with self._lock:
+            counters = self._counters[operation]
+            for name, value in increments.items():
+                counters[name] += value
+            if delta_ms is not None and delta_ms > counters["max_delta_ms"]:
+                counters["max_delta_ms"] = delta_ms
+            return counters["compared"]
+
+
+def _new_counters() -> Dict[str, float]:
+    return {"compared": 0, "mismatches": 0, "dropped": 0, "failed": 0,
+            "primary_ms": 0.0, "secondary_ms": 0.0, "max_delta_ms": float("-inf")}
+
+
+def _comparable(result: tuple):
+    """What must agree: the value, or only that there was an error (messages differ by backend)."""
+    value, err = result
+    if err is not None:
+        return "error"
+    if isinstance(value, CertificateStatus):
+        return (value.revoked, _comparable((value.certificate, None)))
+    if isinstance(value, Certificate):
+        return (value.serial_id.to_hex_uppercase(), value.expiry_date.timestamp(),
+                value.public_key.pem_key, dict(value.subject_components))
+    return value
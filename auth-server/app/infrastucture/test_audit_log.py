@@ -0,0 +1,206 @@
+import json
+import os
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from unittest.mock import MagicMock
+
+import pytest
+
+from app.application.authenticate_service import AuthenticateService
+from app.domain.entities.certificate import Certificate, SerialNumber
+from app.domain.entities.x509_public_key import X509PublicKey
+from app.domain.repositories.certificate_repository import CertificateStatus
+from app.infrastucture import audit_log as audit_log_module
+from app.infrastucture.audit_log import AuditLog
+
+
+def _read(path):
+    with open(path, "rb") as file:
+        return [json.loads(line) for line in file]
+
+
+@pytest.fixture
+def stalled_fsync(monkeypatch):
+    """fsync que no vuelve hasta que el test lo libera: el writer queda bloqueado."""
+    release = threading.Event()
+    started = threading.Event()
+
+    def fsync(fd):
+        started.set()
+        release.wait()
+
+    monkeypatch.setattr(audit_log_module.os, "fsync", fsync)
+    yield started, release
+    release.set()
+
+
+def test_events_written_as_json_lines(tmp_path):
+    path = str(tmp_path / "audit.jsonl")
+    audit = AuditLog(path, clock=lambda: 1700000000.0)
+
+    for index in range(3):
+        assert audit.submit({"serial": str(index), "outcome": "allow"})
+    assert audit.flush(5)
+    audit.close()
+
+    assert _read(path) == [{"serial": str(index), "outcome": "allow", "ts": 1700000000.0}
+                           for index in range(3)]
+    assert audit.written == 3
+
+
+def test_queued_events_share_one_write_and_fsync(tmp_path, stalled_fsync):
+    started, release = stalled_fsync
+    audit = AuditLog(str(tmp_path / "audit.jsonl"))
+    audit.submit({"serial": "first"})
+    started.wait(5)
+
+    for index in range(100):
+        audit.submit({"serial": str(index)})
+    release.set()
+    audit.flush(5)
+    audit.close()
+
+    assert audit.written == 101
+    assert audit.batches == 2
+
+
+def test_drop_policy_never_waits(tmp_path, stalled_fsync):
+    started, _ = stalled_fsync
+    audit = AuditLog(str(tmp_path / "audit.jsonl"), queue_size=10, policy="drop")
+    audit.submit({"serial": "first"})
+    started.wait(5)
+
+    begin = time.perf_counter()
+    accepted = sum(audit.submit({"serial": str(index)}) for index in range(50))
+    elapsed = time.perf_counter() - begin
+
+    assert accepted == 10
+    assert audit.dropped == 40
+    assert elapsed < 0.5
+
+
+def test_block_policy_waits_for_room(tmp_path, stalled_fsync):
+    started, release = stalled_fsync
+    audit = AuditLog(str(tmp_path / "audit.jsonl"), queue_size=1, policy="block", block_timeout=5)
+    audit.submit({"serial": "first"})
+    started.wait(5)
+    audit.submit({"serial": "queued"})
+    threading.Timer(0.05, release.set).start()
+
+    assert audit.submit({"serial": "waited"})
+    audit.flush(5)
+    audit.close()
+
+    assert audit.dropped == 0
+    assert audit.written == 3
+
+
+def test_block_policy_drops_after_timeout(tmp_path, stalled_fsync):
+    started, _ = stalled_fsync
+    audit = AuditLog(str(tmp_path / "audit.jsonl"), queue_size=1, policy="block", block_timeout=0.01)
+    audit.submit({"serial": "first"})
+    started.wait(5)
+    audit.submit({"serial": "queued"})
+
+    assert not audit.submit({"serial": "late"})
+    assert audit.dropped == 1
+
+
+def test_rotation_keeps_backup_count_files(tmp_path):
+    path = str(tmp_path / "audit.jsonl")
+    audit = AuditLog(path, max_bytes=200, backup_count=2, batch_size=1, fsync=False)
+
+    for index in range(30):
+        audit.submit({"serial": "%04d" % index})
+    audit.flush(5)
+    audit.close()
+
+    files = sorted(os.listdir(tmp_path))
+    assert files == ["audit.jsonl", "audit.jsonl.1", "audit.jsonl.2"]
+    assert all(os.path.getsize(tmp_path / name) <= 200 for name in files)
+    # Newest events in the live file, the oldest surviving ones in the last backup
+    assert _read(path)[-1]["serial"] == "0029"
+    assert _read(path + ".2")[0]["serial"] < _read(path + ".1")[0]["serial"] < _read(path)[0]["serial"]
+
+
+def test_close_writes_pending_events(tmp_path):
+    path = str(tmp_path / "audit.jsonl")
+    audit = AuditLog(path)
+
+    for index in range(500):
+        audit.submit({"serial": str(index)})
+    audit.close()
+
+    assert len(_read(path)) == 500
+
+
+def test_close_gives_up_on_a_stalled_writer(tmp_path, stalled_fsync):
+    started, _ = stalled_fsync
+    audit = AuditLog(str(tmp_path / "audit.jsonl"), queue_size=1)
+    audit.submit({"serial": "first"})
+    started.wait(5)
+    audit.submit({"serial": "queued"})
+
+    start = time.monotonic()
+    audit.close(timeout=0.05)
+
+    assert time.monotonic() - start < 1
+
+
+def test_invalid_policy():
+    with pytest.raises(ValueError):
+        AuditLog("/dev/null", policy="retry")
+
+
+def _service(audit):
+    key = MagicMock(spec=X509PublicKey)
+    key.pem_key = "test-public"
+    certificate = Certificate(SerialNumber(0x1EB97F), key,
+                              datetime.now(timezone.utc) + timedelta(days=1),
+                              {"emailAddress": "ops@example.com", "CN": "ops", "role": "admin,backup"})
+    repository = MagicMock()
+    repository.get_certificate_status.return_value = (CertificateStatus(False, certificate), None)
+    builder = MagicMock()
+    builder.build.return_value = "ssh-rsa AAAA"
+    return AuthenticateService(repository, builder, audit_log=audit)
+
+
+@pytest.mark.skipif(not os.environ.get("RUN_BENCHMARKS"),
+                    reason="timing depends on the machine and disk; set RUN_BENCHMARKS=1")
+def test_benchmark_audit_overhead_per_request(tmp_path):
+    """
+    Costo por request de authenticate: sin auditoría, con AuditLog (fsync por
+    lote) y escribiendo con fsync de forma sincrónica en cada request.
+    """
+    requests_count = 5000
+    plain = _service(None)
+    audit = AuditLog(str(tmp_path / "batched.jsonl"), queue_size=requests_count)
+    batched = _service(audit)
+
+    def per_request(service):
+        start = time.perf_counter()
+        for _ in range(requests_count):
+            service.authenticate("1EB97F", "admin")
+        return (time.perf_counter() - start) / requests_count
+
+    class SyncAudit:
+        def __init__(self, path):
+            self.fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT)
+
+        def submit(self, event):
+            os.write(self.fd, json.dumps(event).encode("utf-8") + b"\n")
+            os.fsync(self.fd)
+
+    sync_audit = SyncAudit(str(tmp_path / "sync.jsonl"))
+    base = per_request(plain)
+    with_batched = per_request(batched)
+    with_sync = per_request(_service(sync_audit))
+    audit.close()
+    os.close(sync_audit.fd)
+
+    assert audit.written == requests_count
+    assert audit.dropped == 0
+    assert audit.batches < requests_count
+    assert with_batched - base < 100e-6
+    assert with_batched < with_sync
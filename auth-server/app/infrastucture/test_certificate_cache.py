@@ -0,0 +1,173 @@
+import time
+from datetime import datetime, timezone
+from unittest.mock import MagicMock
+
+import pytest
+
+from app.domain.entities.certificate import Certificate
+from app.domain.repositories.certificate_repository import (CertificateRepository,
+                                                            CertificateStatus)
+from app.infrastucture.certificate_cache import (CachingCertificateRepository,
+                                                CertificateCache)
+
+ISSUER_DN = "CN=PSI-CA"
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def certificate_expiring_at(timestamp: float):
+    certificate = MagicMock(spec=Certificate)
+    certificate.expiry_date = datetime.fromtimestamp(timestamp, timezone.utc)
+    return certificate
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture
+def inner():
+    """Mock del repositorio envuelto."""
+    inner = MagicMock(spec=CertificateRepository)
+    inner.is_revoked.return_value = (False, None)
+    inner.get_certificate.return_value = (certificate_expiring_at(10_000), None)
+    return inner
+
+
+@pytest.fixture
+def cache(clock):
+    return CertificateCache(ISSUER_DN, revocation_ttl_seconds=60,
+                            certificate_ttl_seconds=60, max_entries=2, clock=clock)
+
+
+@pytest.fixture
+def repository(inner, cache):
+    return CachingCertificateRepository(inner, cache)
+
+
+def test_revocation_status_is_cached_until_ttl(repository, inner, clock):
+    assert repository.is_revoked("1eb97f") == (False, None)
+    assert repository.is_revoked("1EB97F") == (False, None)
+    assert inner.is_revoked.call_count == 1
+
+    clock.now = 1061
+    repository.is_revoked("1EB97F")
+    assert inner.is_revoked.call_count == 2
+
+
+def test_errors_are_not_cached(repository, inner):
+    inner.get_certificate.return_value = (None, {"error": "fallo"})
+
+    repository.get_certificate("1EB97F")
+    repository.get_certificate("1EB97F")
+
+    assert inner.get_certificate.call_count == 2
+
+
+def test_revocation_event_overrides_cached_status(repository, inner, cache):
+    repository.is_revoked("1EB97F")
+    repository.get_certificate("1EB97F")
+
+    assert cache.apply_revocation_event(ISSUER_DN, "1EB97F", True) is True
+
+    assert repository.is_revoked("1EB97F") == (True, None)
+    assert inner.is_revoked.call_count == 1
+    repository.get_certificate("1EB97F")
+    assert inner.get_certificate.call_count == 2
+
+
+def test_event_issuer_is_compared_as_a_dn(repository, inner, cache):
+    repository.is_revoked("1EB97F")
+
+    assert cache.apply_revocation_event("cn = psi-ca", "1EB97F", True) is True
+    assert repository.is_revoked("1EB97F") == (True, None)
+
+
+def test_event_for_other_issuer_is_ignored(repository, cache):
+    repository.is_revoked("1EB97F")
+
+    assert cache.apply_revocation_event("CN=Other", "1EB97F", True) is False
+    assert repository.is_revoked("1EB97F") == (False, None)
+
+
+def test_certificate_status_is_cached_as_one_lookup(repository, inner):
+    certificate = certificate_expiring_at(10_000)
+    inner.get_certificate_status.return_value = (CertificateStatus(False, certificate), None)
+
+    assert repository.get_certificate_status("1EB97F") == (CertificateStatus(False, certificate), None)
+    assert repository.get_certificate_status("1eb97f") == (CertificateStatus(False, certificate), None)
+    assert repository.get_certificate("1EB97F") == (certificate, None)
+
+    inner.get_certificate_status.assert_called_once_with("1EB97F")
+    inner.is_revoked.assert_not_called()
+    inner.get_certificate.assert_not_called()
+
+
+def test_lookup_racing_an_event_does_not_store_stale_status(inner, cache):
+    repository = CachingCertificateRepository(inner, cache)
+
+    def revoke_during_lookup(serial_id):
+        cache.invalidate(serial_id)
+        return False, None
+    inner.is_revoked.side_effect = revoke_during_lookup
+
+    repository.is_revoked("1EB97F")
+
+    assert len(cache.revocations) == 0
+
+
+def test_least_recently_used_entry_is_evicted(repository, inner):
+    for serial in ("01", "02", "01", "03"):
+        repository.is_revoked(serial)
+
+    repository.is_revoked("01")
+    repository.is_revoked("02")
+
+    assert inner.is_revoked.call_count == 4
+
+
+def test_certificate_is_not_served_past_not_after(repository, inner, clock):
+    inner.get_certificate.return_value = (certificate_expiring_at(1030), None)
+    repository.get_certificate("1EB97F")
+
+    clock.now = 1030
+    repository.get_certificate("1EB97F")
+
+    assert inner.get_certificate.call_count == 2
+
+
+def test_evict_expired_drops_dead_entries(cache, clock):
+    cache.certificates.put("01", "cert", expires_at=1010)
+    cache.certificates.put("02", "cert")
+    cache.revocations.put("01", False)
+
+    clock.now = 1010
+    assert cache.evict_expired() == 1
+    assert len(cache.certificates) == 1
+
+    clock.now = 1060
+    assert cache.evict_expired() == 2
+    assert len(cache.certificates) == len(cache.revocations) == 0
+
+
+def test_sweeper_evicts_at_expiry_without_requests():
+    cache = CertificateCache("CN=PSI-CA", max_entries=10)
+    cache.start_sweeper(max_interval=5)
+    try:
+        # The sweeper is sleeping up to 5 s; an earlier expiry must wake it
+        time.sleep(0.05)
+        cache.certificates.put("01", "cert", expires_at=time.time() + 0.1)
+        deadline = time.time() + 2
+        while len(cache.certificates) and time.time() < deadline:
+            time.sleep(0.01)
+    finally:
+        cache.close()
+
+    assert len(cache.certificates) == 0
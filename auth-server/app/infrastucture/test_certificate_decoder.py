@@ -1,8 +1,11 @@
 from datetime import timezone, datetime
 
 import pytest
+from cryptography.hazmat.primitives.asymmetric import ec, ed25519
 
+from app.domain.entities.authorized_keys import AuthorizedKeysBuilder
 from app.domain.entities.certificate import Certificate
+from app.domain.entities.public_key_pool import PublicKeyPool
 from app.infrastucture.certificate_decoder import CertificateDecoder
 
 
@@ -49,3 +52,18 @@ def test_map_raw_to_entity_with_invalid_format_certificate():
 
     # Assert
     assert certificate_exception is not None, "Exception should be raised"
+
+
+@pytest.mark.parametrize("private_key, ssh_type", [
+    (ed25519.Ed25519PrivateKey.generate(), "ssh-ed25519"),
+    (ec.generate_private_key(ec.SECP384R1()), "ecdsa-sha2-nistp384"),
+])
+def test_authorized_keys_entry_for_ec_and_ed25519_certificates(raw_certificate, private_key,
+                                                               ssh_type):
+    """Un certificado Ed25519/ECDSA llega hasta la entrada de authorized_keys."""
+    certificate = CertificateDecoder(PublicKeyPool()).from_raw(raw_certificate(7, private_key))
+    entry = AuthorizedKeysBuilder().build("jane@example.com", "Jane Doe", "admin",
+                                          certificate.public_key)
+
+    assert entry.startswith(f'environment="REMOTEUSER=Jane Doe|admin" {ssh_type} ')
+    assert entry.endswith(" jane@example.com")
@@ -0,0 +1,120 @@
+import os
+import random
+import time
+from unittest.mock import MagicMock
+
+import pytest
+
+from app.infrastucture.certificate_population import (CertificatePopulation,
+                                                      PopulationSnapshots)
+from app.infrastucture.decode_pipeline import DecodedCertificate
+
+NOW = 1_700_000_000
+DAY = 86400
+
+
+def record(serial: str, expires_in_days: float, role: str, revoked: bool = False):
+    decoded = DecodedCertificate(serial, int(NOW + expires_in_days * DAY), role,
+                                 "SHA256:" + serial, "ssh-ed25519 AAAA")
+    return decoded, revoked
+
+
+@pytest.fixture
+def population():
+    return CertificatePopulation.from_records([
+        record("A", 5, "admin,deploy"),
+        record("B", 10, "deploy"),
+        record("C", 3, "admin", revoked=True),
+        record("D", -1, "admin"),
+        record("E", 30, "admin"),
+        (DecodedCertificate(None, None, None, None, None, "Invalid certificate format"), False),
+    ], built_at=NOW)
+
+
+def test_expiring_within_window_by_role(population):
+    assert population.expiring(NOW, 14 * DAY) == [("A", NOW + 5 * DAY), ("B", NOW + 10 * DAY)]
+    assert population.expiring(NOW, 14 * DAY, role="admin") == [("A", NOW + 5 * DAY)]
+    assert population.expiring(NOW, 14 * DAY, role="unknown") == []
+
+
+def test_active_per_role(population):
+    """Los revocados y vencidos no cuentan como principals activos."""
+    assert population.active_per_role(NOW) == {"admin": 2, "deploy": 2}
+
+
+def test_summary(population):
+    assert population.summary(NOW) == {"total": 5, "active": 3, "revoked": 1, "expired": 1}
+
+
+def test_more_than_64_roles_use_several_words():
+    records = [record(format(i, "X"), 10, "role%d,common" % i) for i in range(100)]
+
+    population = CertificatePopulation.from_records(records)
+
+    assert population.role_masks.shape == (100, 2)
+    counts = population.active_per_role(NOW)
+    assert counts["common"] == 100
+    assert counts["role99"] == 1
+    assert population.expiring(NOW, 14 * DAY, role="role70") == [("46", NOW + 10 * DAY)]
+
+
+def test_empty_population():
+    population = CertificatePopulation.from_records([])
+
+    assert population.summary(NOW)["total"] == 0
+    assert population.active_per_role(NOW) == {}
+    assert population.expiring(NOW, DAY) == []
+
+
+def test_snapshots_rebuild_from_source():
+    snapshots = PopulationSnapshots(lambda: iter([record("A", 5, "admin")]))
+
+    snapshots.rebuild()
+
+    assert len(snapshots.current) == 1
+
+
+def test_close_shuts_down_the_decode_pipeline():
+    pipeline = MagicMock()
+    snapshots = PopulationSnapshots(lambda: iter([]), pipeline)
+
+    snapshots.close()
+
+    pipeline.close.assert_called_once()
+
+
+@pytest.mark.skipif(not os.environ.get("RUN_BENCHMARKS"),
+                    reason="timing ratio depends on the machine; set RUN_BENCHMARKS=1")
+def test_benchmark_vectorized_queries_against_per_certificate_loop():
+    """
+    200.000 certificados con 40 roles: consulta de vencimientos por rol y conteo
+    de principals por rol, contra el recorrido por certificado con parseo de roles.
+    """
+    rng = random.Random(7)
+    roles = ["role%d" % i for i in range(40)]
+    records = [record(format(i, "X"), rng.uniform(-30, 365),
+                      ",".join(rng.sample(roles, 3)), revoked=rng.random() < 0.05)
+               for i in range(200_000)]
+    population = CertificatePopulation.from_records(records, built_at=NOW)
+
+    start = time.perf_counter()
+    expiring = population.expiring(NOW, 14 * DAY, role="role7")
+    per_role = population.active_per_role(NOW)
+    vectorized = time.perf_counter() - start
+
+    start = time.perf_counter()
+    loop_expiring = []
+    loop_per_role = dict.fromkeys(roles, 0)
+    for decoded, revoked in records:
+        if revoked or decoded.expires_at <= NOW:
+            continue
+        certificate_roles = [role.strip() for role in decoded.role.split(",")]
+        for role in certificate_roles:
+            loop_per_role[role] += 1
+        if "role7" in certificate_roles and decoded.expires_at <= NOW + 14 * DAY:
+            loop_expiring.append((decoded.serial, decoded.expires_at))
+    loop = time.perf_counter() - start
+
+    assert sorted(expiring) == sorted(loop_expiring)
+    assert per_role == loop_per_role
+    assert vectorized * 5 < loop
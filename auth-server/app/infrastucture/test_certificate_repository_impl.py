@@ -1,9 +1,10 @@
+from datetime import datetime, timezone
 import pytest
 from unittest.mock import MagicMock
 from app.domain.entities.certificate import Certificate
-from app.domain.repositories.certificate_repository import CertificateRepository
+from app.domain.repositories.certificate_repository import CertificateRepository, CertificateStatus
 from app.infrastucture.certificate_decoder import CertificateDecoder
-from app.clients.ejbca_client import EJBCAClient
+from app.clients.ejbca_client import EJBCAClient, SearchCursor
 from app.infrastucture.certificate_repository_impl import CertificateRespositoryImpl
 
 
@@ -132,3 +133,172 @@ def test_get_certificate_decode_failure(repository, ejbca_client, certificate_de
     assert err.get("error") == "Error al decodificar certificado"
     ejbca_client.search.assert_called_once()
     certificate_decoder.from_raw.assert_called_once_with("raw_cert")
+
+
+# --- PRUEBAS PARA iter_issued_serials e iter_certificates ---
+
+def test_iter_issued_serials_yields_serials(repository, ejbca_client):
+    ejbca_client.iter_search_v2.return_value = iter([
+        ({"serialNumber": "1EB97F"}, SearchCursor(1, 1)),
+        ({"serialNumber": "0A"}, SearchCursor(1, 2)),
+    ])
+
+    assert list(repository.iter_issued_serials()) == ["1EB97F", "0A"]
+    criteria = ejbca_client.iter_search_v2.call_args.args[0]
+    assert {c["value"] for c in criteria} == {
+        "CERT_ACTIVE", "CERT_NOTIFIEDABOUTEXPIRATION", "CERT_REVOKED"}
+
+
+def test_iter_issued_serials_since_adds_issued_date(repository, ejbca_client):
+    ejbca_client.iter_search_v2.return_value = iter([])
+
+    list(repository.iter_issued_serials(datetime(2024, 1, 1, tzinfo=timezone.utc)))
+
+    criteria = ejbca_client.iter_search_v2.call_args.args[0]
+    assert {"property": "ISSUED_DATE", "value": "2024-01-01T00:00:00+00:00",
+            "operation": "AFTER"} in criteria
+
+
+def test_iter_certificates_decodes_and_skips_invalid(repository, ejbca_client,
+                                                     certificate_decoder, mock_certificate):
+    ejbca_client.iter_search_v2.return_value = iter([
+        ({"serialNumber": "01", "base64Cert": "raw_cert"}, SearchCursor(1, 1)),
+        ({"serialNumber": "02", "base64Cert": "corrupto"}, SearchCursor(1, 2)),
+    ])
+    certificate_decoder.from_raw.side_effect = [mock_certificate, ValueError("corrupto")]
+
+    assert list(repository.iter_certificates(cursor=SearchCursor(1, 0))) == [
+        (mock_certificate, SearchCursor(1, 1))]
+    assert ejbca_client.iter_search_v2.call_args.kwargs["cursor"] == SearchCursor(1, 0)
+
+
+def test_iter_decoded_certificates_pairs_results_with_cursors(repository, ejbca_client):
+    ejbca_client.iter_search_v2.return_value = iter([
+        ({"serialNumber": "01", "base64Cert": "raw_1"}, SearchCursor(1, 1)),
+        ({"serialNumber": "02", "base64Cert": "raw_2"}, SearchCursor(2, 0)),
+    ])
+    pipeline = MagicMock()
+    pipeline.decode.side_effect = lambda raws, ordered: (f"decoded_{raw}" for raw in raws)
+
+    assert list(repository.iter_decoded_certificates(pipeline)) == [
+        ("decoded_raw_1", SearchCursor(1, 1)), ("decoded_raw_2", SearchCursor(2, 0))]
+
+
+def test_iter_certificate_population_flags_revoked_certificates(repository, ejbca_client):
+    ejbca_client.iter_search_v2.return_value = iter([
+        ({"serialNumber": "01", "status": 20, "base64Cert": "raw_1"}, SearchCursor(1, 1)),
+        ({"serialNumber": "02", "status": 40, "base64Cert": "raw_2"}, SearchCursor(2, 0)),
+    ])
+    pipeline = MagicMock()
+    pipeline.decode.side_effect = lambda raws, ordered: (f"decoded_{raw}" for raw in raws)
+
+    assert list(repository.iter_certificate_population(pipeline)) == [
+        ("decoded_raw_1", False), ("decoded_raw_2", True)]
+
+
+# --- PRUEBAS PARA el modo single_search ---
+
+@pytest.fixture
+def single_search_repository(ejbca_client, certificate_decoder, mock_issuer_dn):
+    """Repositorio que resuelve revocación y certificado con una sola búsqueda v2."""
+    return CertificateRespositoryImpl(ejbca_client, certificate_decoder, mock_issuer_dn,
+                                      ca_name="ManagementCA", lookup_mode="single_search")
+
+
+def v2_result(serial_number="123ABC", status=20,
+              issuer_dn="UID=c-CEJHfOUpRPS3Ms3gWyMJqCax3aoXmCwu,CN=ManagementCA,O=Example CA,C=SE"):
+    result = {"serialNumber": serial_number, "status": status, "base64Cert": "raw_cert"}
+    if issuer_dn is not None:
+        result["issuerDN"] = issuer_dn
+    return result
+
+
+def test_single_search_makes_one_ejbca_call(single_search_repository, ejbca_client,
+                                            certificate_decoder, mock_certificate):
+    """get_certificate_status debe costar una sola llamada a EJBCA."""
+    ejbca_client.search_v2.return_value = ({"certificates": [v2_result()]}, None)
+    certificate_decoder.from_raw.return_value = mock_certificate
+
+    status, err = single_search_repository.get_certificate_status("123ABC")
+
+    assert err is None
+    assert status == CertificateStatus(False, mock_certificate)
+    ejbca_client.search_v2.assert_called_once()
+    ejbca_client.get_revocation_status.assert_not_called()
+    ejbca_client.search.assert_not_called()
+    criteria = ejbca_client.search_v2.call_args.kwargs["criteria"]
+    assert {"property": "CA", "value": "ManagementCA", "operation": "EQUAL"} in criteria
+
+
+def test_single_search_status_of_revoked_certificate_skips_decoding(
+        single_search_repository, ejbca_client, certificate_decoder):
+    ejbca_client.search_v2.return_value = ({"certificates": [v2_result(status="CERT_REVOKED")]},
+                                           None)
+
+    assert single_search_repository.get_certificate_status("123ABC") == (
+        CertificateStatus(True, None), None)
+    certificate_decoder.from_raw.assert_not_called()
+
+
+@pytest.mark.parametrize("status", ["CERT_REVOKED", "CERT_TEMP_REVOKED", 40,
+                                    "CERT_ARCHIVED", 60, "CERT_ALGO_NUEVO", None])
+def test_single_search_derives_revocation_from_status(single_search_repository,
+                                                       ejbca_client, status):
+    """Solo un estado activo conocido cuenta como no revocado."""
+    ejbca_client.search_v2.return_value = ({"certificates": [v2_result(status=status)]}, None)
+
+    assert single_search_repository.is_revoked("123ABC") == (True, None)
+
+
+@pytest.mark.parametrize("status", ["CERT_ACTIVE", "CERT_NOTIFIEDABOUTEXPIRATION", 20, 21, "20"])
+def test_single_search_active_statuses_are_not_revoked(single_search_repository,
+                                                       ejbca_client, status):
+    ejbca_client.search_v2.return_value = ({"certificates": [v2_result(status=status)]}, None)
+
+    assert single_search_repository.is_revoked("123ABC") == (False, None)
+
+
+def test_single_search_ignores_query_matches_on_other_fields(single_search_repository,
+                                                             ejbca_client):
+    """QUERY también busca en subject y username; solo vale un serial y emisor exactos."""
+    ejbca_client.search_v2.return_value = ({"certificates": [
+        v2_result(serial_number="999999"),
+        v2_result(issuer_dn="CN=Otra CA"),
+    ]}, None)
+
+    revoked, err = single_search_repository.is_revoked("123ABC")
+
+    assert revoked is None
+    assert err["error"] == "No se encontraron certificados"
+
+
+def test_single_search_rejects_results_without_issuer(single_search_repository, ejbca_client):
+    """Un resultado sin issuerDN no prueba que lo haya emitido nuestra CA."""
+    ejbca_client.search_v2.return_value = ({"certificates": [v2_result(issuer_dn=None)]}, None)
+
+    revoked, err = single_search_repository.is_revoked("123ABC")
+
+    assert revoked is None
+    assert err["error"] == "No se encontraron certificados"
+
+
+def test_single_search_get_certificate_without_prior_lookup(single_search_repository,
+                                                            ejbca_client, certificate_decoder,
+                                                            mock_certificate):
+    ejbca_client.search_v2.return_value = ({"certificates": [v2_result()]}, None)
+    certificate_decoder.from_raw.return_value = mock_certificate
+
+    assert single_search_repository.get_certificate("123ABC") == (mock_certificate, None)
+    ejbca_client.search_v2.assert_called_once()
+
+
+def test_unknown_lookup_mode_is_rejected(ejbca_client, certificate_decoder, mock_issuer_dn):
+    with pytest.raises(ValueError):
+        CertificateRespositoryImpl(ejbca_client, certificate_decoder, mock_issuer_dn,
+                                   lookup_mode="otro")
+
+
+def test_single_search_requires_ca_name(ejbca_client, certificate_decoder, mock_issuer_dn):
+    with pytest.raises(ValueError):
+        CertificateRespositoryImpl(ejbca_client, certificate_decoder, mock_issuer_dn,
+                                   lookup_mode="single_search")
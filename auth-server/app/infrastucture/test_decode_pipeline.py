@@ -0,0 +1,86 @@
+import os
+import pickle
+import time
+from datetime import datetime, timezone
+
+import pytest
+from cryptography.hazmat.primitives.asymmetric import rsa
+
+from app.infrastucture.decode_pipeline import DecodedCertificate, DecodePipeline
+
+NOT_AFTER = datetime(2030, 1, 1, tzinfo=timezone.utc)
+
+
+@pytest.fixture(scope="module")
+def key():
+    return rsa.generate_private_key(public_exponent=65537, key_size=2048)
+
+
+@pytest.fixture(scope="module")
+def raws(raw_certificate, key):
+    return [raw_certificate(serial, key, role="admin,deploy") for serial in range(1, 41)]
+
+
+def test_decode_returns_compact_results(raws):
+    with DecodePipeline(workers=1) as pipeline:
+        decoded = list(pipeline.decode(raws[:1]))
+
+    assert decoded[0].serial == "1"
+    assert decoded[0].expires_at == int(NOT_AFTER.timestamp())
+    assert decoded[0].role == "admin,deploy"
+    assert decoded[0].ssh_key.startswith("ssh-rsa ")
+    assert decoded[0].fingerprint.startswith("SHA256:")
+    assert decoded[0].error is None
+
+
+def test_invalid_certificate_is_reported_in_place(raws):
+    with DecodePipeline(workers=1) as pipeline:
+        decoded = list(pipeline.decode([raws[0], "no es un certificado", raws[1]]))
+
+    assert [result.serial for result in decoded] == ["1", None, "2"]
+    assert decoded[1].error
+
+
+@pytest.mark.parametrize("ordered", [True, False])
+def test_process_pool_decodes_every_certificate(raws, ordered):
+    with DecodePipeline(workers=2, chunk_size=4, max_pending_chunks=3) as pipeline:
+        decoded = list(pipeline.decode(iter(raws), ordered=ordered))
+
+    serials = [int(result.serial, 16) for result in decoded]
+    assert sorted(serials) == list(range(1, 41))
+    if ordered:
+        assert serials == list(range(1, 41))
+
+
+def test_closed_pipeline_does_not_start_another_pool(raws):
+    pipeline = DecodePipeline(workers=2)
+    pipeline.close()
+
+    with pytest.raises(RuntimeError):
+        list(pipeline.decode(raws[:1]))
+
+
+def test_decoded_certificate_pickles_compactly(raws):
+    with DecodePipeline(workers=1) as pipeline:
+        decoded = next(pipeline.decode(raws[:1]))
+
+    assert isinstance(decoded, DecodedCertificate)
+    # The SSH key dominates; no key objects or dicts travel between processes
+    assert len(pickle.dumps(decoded)) < len(decoded.ssh_key) + 300
+
+
+@pytest.mark.skipif(not os.environ.get("RUN_BENCHMARKS"),
+                    reason="timing ratio depends on the machine; set RUN_BENCHMARKS=1")
+@pytest.mark.skipif((os.cpu_count() or 1) < 2, reason="scaling needs at least two cores")
+def test_throughput_scales_with_workers(raws):
+    """Benchmark: two workers decode close to twice as fast as one."""
+    workload = raws * 50
+
+    def throughput(workers):
+        with DecodePipeline(workers=workers, chunk_size=100) as pipeline:
+            list(pipeline.decode(raws[:workers * 2]))  # start the pool outside the timing
+            start = time.perf_counter()
+            count = sum(1 for _ in pipeline.decode(workload))
+            return count / (time.perf_counter() - start)
+
+    assert throughput(2) > 1.6 * throughput(1)
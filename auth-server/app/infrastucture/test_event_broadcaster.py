@@ -0,0 +1,70 @@
+import asyncio
+import threading
+
+from app.infrastucture.event_broadcaster import LAGGED, EventBroadcaster
+
+
+def test_events_reach_every_subscriber():
+    async def scenario():
+        broadcaster = EventBroadcaster()
+        with broadcaster.subscribe() as first, broadcaster.subscribe() as second:
+            broadcaster.publish("revocation", {"serial_id": "1EB97F"}, 10)
+            return (await asyncio.wait_for(first.queue.get(), 1),
+                    await asyncio.wait_for(second.queue.get(), 1))
+
+    first, second = asyncio.run(scenario())
+
+    assert first == second == ("revocation", {"serial_id": "1EB97F"}, 10)
+
+
+def test_publish_from_another_thread():
+    async def scenario():
+        broadcaster = EventBroadcaster()
+        with broadcaster.subscribe() as subscription:
+            thread = threading.Thread(
+                target=broadcaster.publish, args=("policy", {"version": "abc"}))
+            thread.start()
+            thread.join()
+            return await asyncio.wait_for(subscription.queue.get(), 1)
+
+    assert asyncio.run(scenario()) == ("policy", {"version": "abc"}, None)
+
+
+def test_lagging_subscriber_is_disconnected():
+    async def scenario():
+        broadcaster = EventBroadcaster(queue_size=2)
+        with broadcaster.subscribe() as subscription:
+            for offset in range(3):
+                broadcaster.publish("revocation", {}, offset)
+            await asyncio.sleep(0)
+            return subscription.queue.get_nowait(), broadcaster.subscriber_count
+
+    item, subscriber_count = asyncio.run(scenario())
+
+    assert item is LAGGED
+    assert subscriber_count == 0
+
+
+def test_idle_subscribers_are_cheap():
+    async def scenario():
+        broadcaster = EventBroadcaster()
+        stop = asyncio.Event()
+        ready = []
+
+        async def idle_subscriber():
+            with broadcaster.subscribe():
+                ready.append(True)
+                await stop.wait()
+
+        tasks = [asyncio.create_task(idle_subscriber()) for _ in range(5000)]
+        while len(ready) < 5000:
+            await asyncio.sleep(0)
+        count = broadcaster.subscriber_count
+        stop.set()
+        await asyncio.gather(*tasks)
+        return count, threading.active_count()
+
+    count, threads = asyncio.run(scenario())
+
+    assert count == 5000
+    assert threads < 10
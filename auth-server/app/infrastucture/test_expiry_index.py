@@ -0,0 +1,40 @@
+from app.infrastucture.expiry_index import ExpiryIndex
+
+
+def test_pop_expired_in_expiry_order():
+    index = ExpiryIndex()
+    index.schedule("b", 20)
+    index.schedule("a", 10)
+    index.schedule("c", 30)
+
+    assert index.pop_expired(20) == ["a", "b"]
+    assert index.next_expiry() == 30
+    assert len(index) == 1
+
+
+def test_rescheduled_key_expires_only_at_new_time():
+    index = ExpiryIndex()
+    index.schedule("a", 10)
+    index.schedule("a", 50)
+
+    assert index.pop_expired(20) == []
+    assert index.next_expiry() == 50
+
+
+def test_discarded_key_never_expires():
+    index = ExpiryIndex()
+    index.schedule("a", 10)
+    index.discard("a")
+
+    assert index.pop_expired(100) == []
+    assert index.next_expiry() is None
+
+
+def test_heap_does_not_grow_with_dead_entries():
+    index = ExpiryIndex()
+    for round_ in range(100):
+        for key in range(50):
+            index.schedule(key, round_ * 100 + key)
+
+    assert len(index) == 50
+    assert index.heap_size <= 2 * 50 + 1
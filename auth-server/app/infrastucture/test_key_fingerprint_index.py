@@ -0,0 +1,90 @@
+from datetime import datetime, timezone
+from unittest.mock import MagicMock
+
+from app.domain.entities.certificate import Certificate, SerialNumber
+from app.domain.entities.x509_public_key import X509PublicKey
+from app.infrastucture.decode_pipeline import DecodedCertificate
+from app.infrastucture.fingerprint_indexing_repository import \
+    FingerprintIndexingCertificateRepository
+from app.infrastucture.key_fingerprint_index import KeyFingerprintIndex
+
+NOW = 1_700_000_000
+KEY = "SHA256:key"
+
+
+def decoded(serial: str, fingerprint: str = KEY, expires_at: int = NOW + 3600) -> DecodedCertificate:
+    return DecodedCertificate(serial, expires_at, "admin", fingerprint, "ssh-ed25519 AAAA")
+
+
+class FakeSource:
+    def __init__(self, *certificates):
+        self.certificates = list(certificates)
+        self.calls = []
+
+    def __call__(self, since):
+        self.calls.append(since)
+        certificates, self.certificates = self.certificates, []
+        return iter(certificates)
+
+
+def test_renewed_certificates_share_a_fingerprint():
+    source = FakeSource(decoded("0A", expires_at=NOW + 100), decoded("0B", expires_at=NOW + 200),
+                        decoded("0C", fingerprint="SHA256:other"))
+    index = KeyFingerprintIndex(source, clock=lambda: NOW)
+
+    index.sync()
+
+    assert index.ready
+    assert index.serials(KEY) == ["B", "A"]
+    assert index.serials("SHA256:unknown") == []
+    assert len(index) == 2
+
+
+def test_sync_after_the_first_only_fetches_new_certificates():
+    source = FakeSource(decoded("A"))
+    index = KeyFingerprintIndex(source, clock=lambda: NOW)
+    index.sync()
+    source.certificates = [decoded("B")]
+
+    index.sync()
+
+    assert source.calls[0] is None
+    assert source.calls[1] is not None
+    assert sorted(index.serials(KEY)) == ["A", "B"]
+
+
+def test_expired_and_failed_certificates_are_skipped():
+    failed = DecodedCertificate(None, None, None, None, None, "Invalid certificate format")
+    index = KeyFingerprintIndex(FakeSource(decoded("A", expires_at=NOW - 1), failed),
+                                clock=lambda: NOW)
+
+    index.sync()
+
+    assert index.serials(KEY) == []
+    assert len(index) == 0
+
+
+def test_fetched_certificates_are_indexed_before_the_next_sync():
+    """Un certificado leído de EJBCA entre syncs ya se encuentra por su huella."""
+    index = KeyFingerprintIndex(FakeSource(), clock=lambda: NOW)
+    public_key = MagicMock(spec=X509PublicKey)
+    public_key.ssh_fingerprint.return_value = KEY
+    certificate = Certificate(SerialNumber(0xABC), public_key,
+                              datetime.fromtimestamp(NOW + 60, timezone.utc), {})
+    inner = MagicMock()
+    inner.get_certificate.return_value = (certificate, None)
+    repository = FingerprintIndexingCertificateRepository(inner, index)
+
+    assert repository.get_certificate("0abc") == (certificate, None)
+    index.sync()
+
+    assert index.serials(KEY) == ["ABC"]
+
+
+def test_close_shuts_down_the_decode_pipeline():
+    pipeline = MagicMock()
+    index = KeyFingerprintIndex(FakeSource(), pipeline, clock=lambda: NOW)
+
+    index.close()
+
+    pipeline.close.assert_called_once()
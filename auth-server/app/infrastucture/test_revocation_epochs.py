@@ -0,0 +1,37 @@
+from app.infrastucture.revocation_epochs import RevocationEpochs
+from app.infrastucture.revocation_event_log import RevocationEventLog
+
+ISSUER_DN = "CN=ManagementCA"
+
+
+def revocation(serial_id: str) -> dict:
+    return {"issuer_dn": ISSUER_DN, "serial_id": serial_id, "revoked": True}
+
+
+def test_events_before_and_after_start_are_tracked(tmp_path):
+    path = str(tmp_path / "revocations.log")
+    RevocationEventLog(path).append(revocation("0ABC"))
+    event_log = RevocationEventLog(path)
+    epochs = RevocationEpochs(event_log)
+    issued_at = epochs.current()
+
+    assert epochs.changed_since("ABC", 0) is True
+    assert epochs.changed_since("ABC", issued_at) is False
+
+    event_log.append(revocation("DEF"))
+
+    assert epochs.changed_since("abc", issued_at) is False
+    assert epochs.changed_since("DEF", issued_at) is True
+
+
+def test_epoch_ahead_of_this_worker_counts_as_changed(tmp_path):
+    """Un epoch que este worker no alcanzó (atraso o log truncado) no se puede comprobar."""
+    epochs = RevocationEpochs(RevocationEventLog(str(tmp_path / "revocations.log")))
+
+    assert epochs.changed_since("ABC", epochs.current() + 1) is True
+
+
+def test_epochs_name_the_feed_of_their_log(tmp_path):
+    event_log = RevocationEventLog(str(tmp_path / "revocations.log"))
+
+    assert RevocationEpochs(event_log).feed_id == event_log.feed_id
@@ -0,0 +1,76 @@
+import os
+
+import pytest
+
+from app.infrastucture.revocation_event_log import RevocationEventLog
+
+EVENT = {"issuer_dn": "CN=PSI-CA", "serial_id": "1EB97F", "revoked": True}
+
+
+@pytest.fixture
+def log_path(tmp_path):
+    return str(tmp_path / "revocation_events.log")
+
+
+def test_append_applies_event_locally(log_path):
+    event_log = RevocationEventLog(log_path)
+    received = []
+    event_log.subscribe(lambda event, offset: received.append((event, offset)))
+
+    offset = event_log.append(EVENT)
+
+    assert received == [(EVENT, offset)]
+
+
+def test_other_worker_receives_event_on_poll(log_path):
+    publisher = RevocationEventLog(log_path)
+    worker = RevocationEventLog(log_path)
+    received = []
+    worker.subscribe(lambda event, offset: received.append(event))
+
+    publisher.append(EVENT)
+    worker.poll()
+    worker.poll()
+
+    assert received == [EVENT]
+
+
+def test_worker_starts_at_end_of_existing_log(log_path):
+    RevocationEventLog(log_path).append(EVENT)
+    worker = RevocationEventLog(log_path)
+    received = []
+    worker.subscribe(lambda event, offset: received.append(event))
+
+    worker.poll()
+
+    assert received == []
+
+
+def test_read_from_returns_resumable_offsets(log_path):
+    event_log = RevocationEventLog(log_path)
+    first = event_log.append(EVENT)
+    second = event_log.append(dict(EVENT, revoked=False))
+
+    events, offset = event_log.read_from(first)
+
+    assert events == [(dict(EVENT, revoked=False), second)]
+    assert offset == second
+
+
+def test_partial_line_is_left_for_next_poll(log_path):
+    event_log = RevocationEventLog(log_path)
+    with open(log_path, "ab") as file:
+        file.write(b'{"serial_id": "1EB')
+
+    events, offset = event_log.read_from(0)
+
+    assert events == []
+    assert offset == 0
+
+
+def test_feed_id_is_shared_by_workers_and_changes_with_the_file(log_path):
+    first_worker, second_worker = RevocationEventLog(log_path), RevocationEventLog(log_path)
+    os.replace(log_path, log_path + ".1")
+
+    assert first_worker.feed_id == second_worker.feed_id
+    assert RevocationEventLog(log_path).feed_id != first_worker.feed_id
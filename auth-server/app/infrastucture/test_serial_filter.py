@@ -0,0 +1,151 @@
+import pytest
+
+from app.infrastucture.serial_filter import (BloomFilter, IssuedSerialIndex,
+                                             ScalableBloomFilter, normalize_serial)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class FakeSerialSource:
+    def __init__(self, serials):
+        self.serials = list(serials)
+        self.delta = []
+        self.calls = []
+        self.fail = False
+
+    def __call__(self, since):
+        self.calls.append(since)
+        if self.fail:
+            raise ValueError("EJBCA no disponible")
+        return list(self.serials) if since is None else list(self.delta)
+
+
+@pytest.mark.parametrize("serial_id, expected", [
+    ("1eb97f", "1EB97F"),
+    ("001EB97F", "1EB97F"),
+    ("0", "0"),
+    ("", None),
+    ("1EB97G", None),
+    ("1" * 41, None),
+    ("../etc", None),
+])
+def test_normalize_serial(serial_id, expected):
+    assert normalize_serial(serial_id) == expected
+
+
+def test_bloom_filter_has_no_false_negatives():
+    bloom = BloomFilter(1000, 0.01)
+    serials = [format(i, "X") for i in range(1000)]
+    for serial in serials:
+        bloom.add(serial)
+
+    assert all(serial in bloom for serial in serials)
+
+
+def test_bloom_filter_false_positive_rate_is_near_target():
+    bloom = BloomFilter(10000, 0.01)
+    for i in range(10000):
+        bloom.add(format(i, "X"))
+
+    false_positives = sum(format(i, "X") in bloom for i in range(10000, 30000))
+
+    assert false_positives / 20000 < 0.02
+
+
+def test_bloom_filter_size_matches_documented_figures():
+    assert BloomFilter(1_000_000, 0.01).num_hashes == 7
+    assert round(BloomFilter(1_000_000, 0.001).size_bytes / 2**20, 2) == 1.71
+
+
+def test_scalable_filter_grows_instead_of_saturating():
+    bloom = ScalableBloomFilter(1000, 0.01)
+    for i in range(10000):
+        bloom.add(format(i, "X"))
+
+    false_positives = sum(format(i, "X") in bloom for i in range(10000, 30000))
+
+    assert bloom.stages == 4
+    assert all(format(i, "X") in bloom for i in range(10000))
+    assert false_positives / 20000 < 0.02
+
+
+def test_rebuild_streams_serials_from_the_source():
+    consumed = []
+
+    def serial_source(since):
+        for serial in range(50):
+            consumed.append(serial)
+            yield format(serial, "X")
+
+    index = IssuedSerialIndex(serial_source, min_capacity=10)
+    index.rebuild()
+
+    assert len(consumed) == 50
+    assert all(index.might_exist(format(serial, "X")) for serial in range(50))
+
+
+def test_index_accepts_everything_before_first_build():
+    index = IssuedSerialIndex(FakeSerialSource([]))
+
+    assert index.might_exist("1EB97F") is True
+    assert index.might_exist("not-hex") is False
+
+
+def test_index_rejects_unknown_serial():
+    source = FakeSerialSource(["1EB97F", "0A"])
+    index = IssuedSerialIndex(source, clock=FakeClock())
+    index.rebuild()
+
+    assert index.might_exist("1eb97f") is True
+    assert index.might_exist("000A") is True
+    assert index.might_exist("DEADBEEF") is False
+
+
+def test_index_miss_triggers_rate_limited_delta_refresh():
+    source = FakeSerialSource(["1EB97F"])
+    clock = FakeClock()
+    index = IssuedSerialIndex(source, miss_refresh_interval=5, clock=clock)
+    index.rebuild()
+    source.delta = ["ABC123"]
+
+    # Within the refresh interval the miss is answered from the filter alone
+    assert index.might_exist("ABC123") is False
+    clock.now = 6
+    assert index.might_exist("ABC123") is True
+    assert index.might_exist("DEADBEEF") is False
+    assert len(source.calls) == 2
+    assert source.calls[1] is not None
+
+
+def test_index_does_not_reject_when_delta_refresh_fails():
+    source = FakeSerialSource(["1EB97F"])
+    clock = FakeClock()
+    index = IssuedSerialIndex(source, miss_refresh_interval=5, clock=clock)
+    index.rebuild()
+    source.fail = True
+    clock.now = 6
+
+    assert index.might_exist("ABC123") is True
+
+
+def test_empty_rebuild_leaves_index_passing_through():
+    index = IssuedSerialIndex(FakeSerialSource([]), clock=FakeClock())
+    index.rebuild()
+
+    assert index.ready is False
+    assert index.might_exist("1EB97F") is True
+
+
+def test_index_add_registers_new_serial():
+    index = IssuedSerialIndex(FakeSerialSource(["1EB97F"]), clock=FakeClock())
+    index.rebuild()
+
+    index.add("ABC123")
+
+    assert index.might_exist("ABC123") is True
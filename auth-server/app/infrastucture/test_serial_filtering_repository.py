@@ -0,0 +1,69 @@
+from unittest.mock import MagicMock
+
+import pytest
+
+from app.domain.repositories.certificate_repository import CertificateRepository
+from app.infrastucture.serial_filter import IssuedSerialIndex
+from app.infrastucture.serial_filtering_repository import \
+    SerialFilteringCertificateRepository
+
+
+@pytest.fixture
+def inner():
+    """Mock del repositorio envuelto."""
+    return MagicMock(spec=CertificateRepository)
+
+
+@pytest.fixture
+def index():
+    """Índice con un único serial emitido."""
+    index = IssuedSerialIndex(lambda since: ["1EB97F"] if since is None else [],
+                              clock=lambda: 0.0)
+    index.rebuild()
+    return index
+
+
+@pytest.fixture
+def repository(inner, index):
+    return SerialFilteringCertificateRepository(inner, index)
+
+
+def test_malformed_serial_never_reaches_ejbca(repository, inner):
+    revoked, err = repository.is_revoked("1EB97F; DROP")
+
+    assert revoked is None
+    assert err["error"] == "Serial con formato invalido"
+    inner.is_revoked.assert_not_called()
+
+
+def test_unknown_serial_never_reaches_ejbca(repository, inner):
+    certificate, err = repository.get_certificate("DEADBEEF")
+
+    assert certificate is None
+    assert err["error"] == "Serial desconocido"
+    inner.get_certificate.assert_not_called()
+
+
+def test_unknown_serial_status_never_reaches_ejbca(repository, inner):
+    status, err = repository.get_certificate_status("DEADBEEF")
+
+    assert status is None
+    assert err["error"] == "Serial desconocido"
+    inner.get_certificate_status.assert_not_called()
+
+
+def test_known_serial_is_delegated(repository, inner):
+    inner.is_revoked.return_value = (False, None)
+
+    assert repository.is_revoked("1EB97F") == (False, None)
+    inner.is_revoked.assert_called_once_with("1EB97F")
+
+
+def test_found_certificate_is_added_to_index(inner):
+    index = MagicMock(spec=IssuedSerialIndex)
+    index.might_exist.return_value = True
+    inner.get_certificate.return_value = ("cert", None)
+    repository = SerialFilteringCertificateRepository(inner, index)
+
+    assert repository.get_certificate("ABC123") == ("cert", None)
+    index.add.assert_called_once_with("ABC123")
@@ -0,0 +1,117 @@
+import threading
+import time
+from unittest.mock import MagicMock
+
+import pytest
+
+from app.domain.repositories.certificate_repository import CertificateRepository
+from app.infrastucture.shadow_repository import ShadowCertificateRepository
+
+
+@pytest.fixture
+def primary():
+    """Repositorio en vivo: el serial no está revocado."""
+    primary = MagicMock(spec=CertificateRepository)
+    primary.is_revoked.return_value = (False, None)
+    return primary
+
+
+@pytest.fixture
+def secondary():
+    secondary = MagicMock(spec=CertificateRepository)
+    secondary.is_revoked.return_value = (False, None)
+    return secondary
+
+
+def _drain(repository):
+    repository._executor.shutdown(wait=True)
+
+
+def test_returns_primary_answer_and_counts_agreement(primary, secondary):
+    repository = ShadowCertificateRepository(primary, secondary)
+
+    assert repository.is_revoked("1EB97F") == (False, None)
+    _drain(repository)
+
+    stats = repository.stats()["is_revoked"]
+    assert stats["compared"] == 1
+    assert stats["mismatches"] == 0
+    secondary.is_revoked.assert_called_once_with("1EB97F")
+
+
+def test_counts_and_logs_mismatch(primary, secondary):
+    secondary.is_revoked.return_value = (True, None)
+    logger = MagicMock()
+    repository = ShadowCertificateRepository(primary, secondary, logger=logger)
+
+    assert repository.is_revoked("1EB97F") == (False, None)
+    _drain(repository)
+
+    assert repository.stats()["is_revoked"]["mismatches"] == 1
+    logger.warning.assert_called_once()
+
+
+def test_errors_agree_regardless_of_message(primary, secondary):
+    primary.get_certificate.return_value = (None, {"error": "Certificate not found"})
+    secondary.get_certificate.return_value = (None, {"detail": "no results"})
+    repository = ShadowCertificateRepository(primary, secondary)
+
+    repository.get_certificate("1EB97F")
+    _drain(repository)
+
+    assert repository.stats()["get_certificate"]["mismatches"] == 0
+
+
+def test_slow_secondary_adds_no_latency_and_excess_is_dropped(primary, secondary):
+    release = threading.Event()
+
+    def blocked(serial_id):
+        release.wait()
+        return False, None
+
+    secondary.is_revoked.side_effect = blocked
+    repository = ShadowCertificateRepository(primary, secondary, max_pending=2)
+
+    started = time.perf_counter()
+    for _ in range(10):
+        assert repository.is_revoked("1EB97F") == (False, None)
+    elapsed = time.perf_counter() - started
+    release.set()
+    _drain(repository)
+
+    stats = repository.stats()["is_revoked"]
+    assert elapsed < 0.5
+    assert stats["dropped"] == 8
+    assert stats["compared"] == 2
+
+
+def test_secondary_exception_is_counted_not_raised(primary, secondary):
+    secondary.is_revoked.side_effect = RuntimeError("boom")
+    repository = ShadowCertificateRepository(primary, secondary, logger=MagicMock())
+
+    assert repository.is_revoked("1EB97F") == (False, None)
+    _drain(repository)
+
+    assert repository.stats()["is_revoked"]["failed"] == 1
+
+
+def test_after_close_primary_still_answers(primary, secondary):
+    repository = ShadowCertificateRepository(primary, secondary)
+    repository.close()
+
+    assert repository.is_revoked("1EB97F") == (False, None)
+    assert repository.stats()["is_revoked"]["dropped"] == 1
+    secondary.is_revoked.assert_not_called()
+
+
+def test_latency_delta(primary, secondary):
+    ticks = iter([0.0, 0.001, 0.0, 0.005])
+    repository = ShadowCertificateRepository(primary, secondary, clock=lambda: next(ticks))
+
+    repository.is_revoked("1EB97F")
+    _drain(repository)
+
+    stats = repository.stats()["is_revoked"]
+    assert stats["primary_mean_ms"] == pytest.approx(1.0)
+    assert stats["secondary_mean_ms"] == pytest.approx(5.0)
+    assert stats["max_delta_ms"] == pytest.approx(4.0)
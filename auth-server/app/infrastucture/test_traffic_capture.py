@@ -0,0 +1,102 @@
+import json
+
+import pytest
+import requests
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.infrastucture.traffic_capture import (TrafficCaptureMiddleware,
+                                               TrafficRecorder,
+                                               capture_ejbca_response)
+from tools.replay_traffic import FakeEJBCA, RecordedResponses
+
+EJBCA_BODY = '{"revoked":false,"serial_number":"ABC"}'
+
+
+@pytest.fixture
+def ejbca():
+    """Stands in for EJBCA: answers the revocation status path."""
+    fake = FakeEJBCA(RecordedResponses([{"e": [{
+        "m": "GET", "u": "/ejbca/v1/certificate/CN=CA/ABC/revocationstatus", "rb": None,
+        "s": 200, "ms": 0, "b": EJBCA_BODY}]}]))
+    fake.start()
+    yield fake
+    fake.close()
+
+
+def _app(ejbca, recorder):
+    session = requests.Session()
+    session.hooks["response"].append(capture_ejbca_response)
+    base_url = f"http://127.0.0.1:{ejbca.port}/ejbca"
+    app = FastAPI()
+    app.add_middleware(TrafficCaptureMiddleware, recorder=lambda: recorder)
+
+    @app.get("/api/v1/certificate/{serial_id}/validate")
+    def validate(serial_id: str, username: str):
+        response = session.get(f"{base_url}/v1/certificate/CN=CA/{serial_id}/revocationstatus")
+        return {"revoked": response.json()["revoked"], "username": username}
+
+    @app.get("/healthcheck")
+    def healthcheck():
+        session.get(f"{base_url}/v1/certificate/CN=CA/ABC/revocationstatus")
+        return {"status": "ok"}
+
+    return app
+
+
+def _read(path):
+    with open(path, "rb") as file:
+        return [json.loads(line) for line in file]
+
+
+def test_records_validate_request_with_ejbca_exchange(tmp_path, ejbca):
+    recorder = TrafficRecorder(str(tmp_path / "traffic.jsonl"))
+    client = TestClient(_app(ejbca, recorder))
+
+    response = client.get("/api/v1/certificate/ABC/validate", params={"username": "admin"})
+    recorder.close()
+
+    assert response.status_code == 200
+    [record] = _read(tmp_path / "traffic.jsonl")
+    assert record["m"] == "GET"
+    assert record["p"] == "/api/v1/certificate/ABC/validate"
+    assert record["q"] == "username=admin"
+    assert record["s"] == 200
+    assert record["ms"] > 0
+    [exchange] = record["e"]
+    assert exchange["m"] == "GET"
+    assert exchange["u"] == "/ejbca/v1/certificate/CN=CA/ABC/revocationstatus"
+    assert exchange["rb"] is None
+    assert exchange["s"] == 200
+    assert exchange["b"] == EJBCA_BODY
+
+
+def test_other_paths_and_disabled_capture_are_not_recorded(tmp_path, ejbca):
+    recorder = TrafficRecorder(str(tmp_path / "traffic.jsonl"))
+    TestClient(_app(ejbca, recorder)).get("/healthcheck")
+    TestClient(_app(ejbca, None)).get("/api/v1/certificate/ABC/validate", params={"username": "admin"})
+    recorder.close()
+
+    assert _read(tmp_path / "traffic.jsonl") == []
+
+
+def test_hook_outside_capture_does_nothing(ejbca):
+    session = requests.Session()
+    session.hooks["response"].append(capture_ejbca_response)
+
+    response = session.get(f"http://127.0.0.1:{ejbca.port}/ejbca/v1/certificate/CN=CA/ABC/revocationstatus")
+
+    assert response.text == EJBCA_BODY
+
+
+def test_recorder_stops_at_max_bytes(tmp_path):
+    recorder = TrafficRecorder(str(tmp_path / "traffic.jsonl"), max_bytes=100)
+
+    for index in range(10):
+        recorder.record({"ts": index, "p": "/api/v1/certificate/ABC/validate"})
+    recorder.close()
+    recorder.record({"ts": 99})
+
+    records = _read(tmp_path / "traffic.jsonl")
+    assert 0 < len(records) < 10
+    assert (tmp_path / "traffic.jsonl").stat().st_size <= 100
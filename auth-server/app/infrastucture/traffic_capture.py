@@ -0,0 +1,128 @@
+"""
+Opt-in capture of /validate traffic for replay.
+
+Every captured /validate request becomes one JSON line in an append-only
+file: when it arrived, its path and query, the status and latency the server
+answered with, and every EJBCA exchange made while serving it (method, path,
+request body, status, latency and response body). tools/replay_traffic.py
+serves those EJBCA responses back at the recorded latencies and drives a
+server with the same requests, so builds can be compared on real traffic.
+
+Captures hold serials and usernames; keep them with the same care as logs.
+"""
+import contextvars
+import json
+import logging
+import os
+import re
+import threading
+import time
+from typing import Callable, List, Optional
+from urllib.parse import urlsplit
+
+import requests
+
+VALIDATE_PATH = re.compile(r"^/api/v1/certificate/[^/]+/validate$")
+
+# EJBCA exchanges of the request being captured in this context, if any
+_exchanges: contextvars.ContextVar[Optional[List[dict]]] = contextvars.ContextVar(
+    "traffic_capture_exchanges", default=None)
+
+
+class TrafficRecorder:
+    def __init__(self, path: str, max_bytes: int = 256 * 1024 * 1024,
+                 logger: logging.Logger = logging.getLogger(__name__)):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.logger = logger
+        self._fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o640)
+        self._lock = threading.Lock()
+        self._full = False
+
+    def record(self, entry: dict):
+        """Appends one entry; stops recording once the file reaches max_bytes."""
+        line = json.dumps(entry, separators=(",", ":")).encode("utf-8") + b"\n"
+        with self._lock:
+            if self._fd is None or self._full:
+                return
+            if os.fstat(self._fd).st_size + len(line) > self.max_bytes:
+                self._full = True
+                self.logger.warning("Traffic capture %s reached %s bytes, recording stopped",
+                                    self.path, self.max_bytes)
+                return
+            # One write per line: O_APPEND keeps lines from several workers whole
+            os.write(self._fd, line)
+
+    def close(self):
+        with self._lock:
+            if self._fd is not None:
+                os.close(self._fd)
+                self._fd = None
+
+
+def capture_ejbca_response(response: requests.Response, *args, **kwargs):
+    """
+    requests response hook: adds the exchange to the request being captured.
+    Installed on the EJBCA session; does nothing outside a captured request.
+    """
+    exchanges = _exchanges.get()
+    if exchanges is None:
+        return
+    url = urlsplit(response.request.url)
+    body = response.request.body
+    if isinstance(body, bytes):
+        body = body.decode("utf-8", "replace")
+    exchanges.append({
+        "m": response.request.method,
+        "u": url.path + ("?" + url.query if url.query else ""),
+        "rb": body,
+        "s": response.status_code,
+        "ms": round(response.elapsed.total_seconds() * 1000, 3),
+        "b": response.text,
+    })
+
+
+class TrafficCaptureMiddleware:
+    """
+    ASGI middleware recording /validate requests while recorder() returns a
+    TrafficRecorder; with None (capture not configured) it only matches the path.
+    """
+
+    def __init__(self, app, recorder: Callable[[], Optional[TrafficRecorder]]):
+        self.app = app
+        self.recorder = recorder
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not VALIDATE_PATH.match(scope["path"]):
+            await self.app(scope, receive, send)
+            return
+        recorder = self.recorder()
+        if recorder is None:
+            await self.app(scope, receive, send)
+            return
+
+        exchanges: List[dict] = []
+        response_status = [500]
+
+        async def capture_status(message):
+            if message["type"] == "http.response.start":
+                response_status[0] = message["status"]
+            await send(message)
+
+        arrived_at = time.time()
+        started = time.perf_counter()
+        # The endpoint runs in a worker thread with a copy of this context; the list is shared
+        token = _exchanges.set(exchanges)
+        try:
+            await self.app(scope, receive, capture_status)
+        finally:
+            _exchanges.reset(token)
+            recorder.record({
+                "ts": round(arrived_at, 6),
+                "m": scope["method"],
+                "p": scope["path"],
+                "q": scope["query_string"].decode("latin-1"),
+                "s": response_status[0],
+                "ms": round((time.perf_counter() - started) * 1000, 3),
+                "e": exchanges,
+            })
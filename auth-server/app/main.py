@@ -1,10 +1,18 @@
 from functools import lru_cache
+import atexit
 import logging
 import os
 
 from fastapi import FastAPI
-from app.core.config.get_config import get_config
+from app.core import components
+from app.core.admission_control import ArrivalTimeMiddleware
+from app.core.config.get_config import get_config, get_config_store
+from app.core.logging_setup import setup_logging
+from app.infrastucture.traffic_capture import TrafficCaptureMiddleware
+from app.routes.admin_route import router as admin_router
 from app.routes.certificate_route import router as certificate_router
+from app.routes.key_route import router as key_router
+from app.routes.revocation_route import router as revocation_router
 
 app = FastAPI(
     title="Certificate Validation API",
@@ -12,13 +20,31 @@ app = FastAPI(
     version="1.0.0",
     debug=True,
 )
+# Graba /validate y las respuestas de EJBCA solo con la sección traffic_capture
+app.add_middleware(TrafficCaptureMiddleware, recorder=components.traffic_recorder.get)
+# Marca la llegada de cada request para medir la espera en el threadpool (admission_control)
+app.add_middleware(ArrivalTimeMiddleware)
 app.include_router(certificate_router, prefix="/api/v1")
+app.include_router(revocation_router, prefix="/api/v1")
+app.include_router(key_router, prefix="/api/v1")
+app.include_router(admin_router, prefix="/api/v1")
 try:
-    get_config()
+    config = get_config()
 except Exception as e:
     logging.error("Error loading config: %s", e)
     raise e
 
+# Los handlers escriben desde un hilo propio; el request solo encola el registro
+if config.get("logging"):
+    atexit.register(setup_logging(config["logging"]).stop)
+
+# Recarga en caliente: un snapshot nuevo solo reconstruye los componentes afectados
+if config.get("config_reload", {}).get("interval_seconds"):
+    get_config_store().start_watcher(config["config_reload"]["interval_seconds"])
+
+# Cada worker sigue el log de eventos de revocación desde el arranque
+components.revocation_event_log.get()
+
 
 @app.get("/healthcheck")
 def healthcheck():
@@ -0,0 +1,79 @@
+import hmac
+import time
+from typing import Dict, List, Optional
+
+from app.core import components
+from app.infrastucture.certificate_population import CertificatePopulation
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, status
+from pydantic import BaseModel
+
+router = APIRouter()
+
+
+class PopulationSummary(BaseModel):
+    built_at: int
+    total: int
+    active: int
+    revoked: int
+    expired: int
+
+
+class ExpiringCertificate(BaseModel):
+    serial_id: str
+    expires_at: int
+
+
+def verify_admin_token(authorization: Optional[str] = Header(None)):
+    """Checks the Bearer token of the admin endpoints."""
+    token = components.admin_token.get()
+    scheme, _, presented = (authorization or "").partition(" ")
+    if token is None or scheme.lower() != "bearer" or not hmac.compare_digest(
+            presented.encode("utf-8"), token):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED,
+                            detail="Token inválido.",
+                            headers={"WWW-Authenticate": "Bearer"})
+
+
+def get_population() -> CertificatePopulation:
+    """Dependency function for injecting the latest population snapshot."""
+    snapshots = components.population_snapshots.get()
+    if snapshots is None or snapshots.current is None:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                            detail="Snapshot de certificados no disponible.")
+    return snapshots.current
+
+
+@router.get(
+    "/admin/population",
+    tags=["admin"],
+    summary="Counts of active, revoked and expired certificates",
+    response_model=PopulationSummary,
+    dependencies=[Depends(verify_admin_token)],
+)
+def population_summary(population: CertificatePopulation = Depends(get_population)):
+    return PopulationSummary(built_at=int(population.built_at), **population.summary(time.time()))
+
+
+@router.get(
+    "/admin/population/expiring",
+    tags=["admin"],
+    summary="Active certificates expiring within a number of days",
+    response_model=List[ExpiringCertificate],
+    dependencies=[Depends(verify_admin_token)],
+)
+def expiring_certificates(days: float = Query(14, gt=0, le=3650),
+                          role: Optional[str] = None,
+                          population: CertificatePopulation = Depends(get_population)):
+    return [ExpiringCertificate(serial_id=serial, expires_at=expires_at)
+            for serial, expires_at in population.expiring(time.time(), days * 86400, role)]
+
+
+@router.get(
+    "/admin/population/roles",
+    tags=["admin"],
+    summary="Active certificates (principals) per role",
+    response_model=Dict[str, int],
+    dependencies=[Depends(verify_admin_token)],
+)
+def active_per_role(population: CertificatePopulation = Depends(get_population)):
+    return population.active_per_role(time.time())
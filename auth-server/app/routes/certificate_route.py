@@ -2,32 +2,65 @@ import logging
 
 from app.application.authenticate_service import (AuthenticateService,
                                                   AuthResponse)
-from app.clients.ejbca_client import EJBCAClient
-from app.core.config.get_config import get_config
-from app.domain.entities.authorized_keys import AuthorizedKeysBuilder
-from app.infrastucture.certificate_decoder import CertificateDecoder
-from app.infrastucture.certificate_repository_impl import \
-    CertificateRespositoryImpl
-from fastapi import APIRouter, Depends, HTTPException, status
+from app.application.session_ticket import SessionTicketService
+from app.core import components
+from app.core.admission_control import arrival_time
+from app.core.http_cache import NO_STORE, etag_for, etag_matches
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
+from pydantic import BaseModel
 
 router = APIRouter()
 
+# Signed or expiring material minted per response; a shared cache must never
+# replay it, nor revalidate it with a 304 once it has gone stale
+PER_RESPONSE_FIELDS = ("signature", "expires_at", "session_ticket", "ssh_certificate")
 
-def get_authenticate_service(config: dict = Depends(get_config)) -> AuthenticateService:
+
+def get_authenticate_service() -> AuthenticateService:
     """Dependency function for injecting AuthenticateService."""
-    ejbca_client = EJBCAClient(
-        base_url=config["ejbca"]["base_url"],
-        certificate_path=config["ejbca"]["certificate_path"],
-        cert_password=config["ejbca"]["cert_password"],
-    )
-    certificate_decoder = CertificateDecoder()
-    certificate_repository = CertificateRespositoryImpl(
-        ejbca_client,
-        certificate_decoder,
-        config["ejbca"]["issuer_dn"],
-    )
-    authorized_keys_builder = AuthorizedKeysBuilder()
-    return AuthenticateService(certificate_repository, authorized_keys_builder)
+    return AuthenticateService(components.certificate_repository.get(),
+                               components.authorized_keys_builder,
+                               decision_signer=components.decision_signer.get(),
+                               ssh_certificate_issuer=components.ssh_certificate_issuer.get(),
+                               session_ticket_service=components.session_ticket_service.get(),
+                               fingerprint_index=components.key_fingerprint_index.get(),
+                               audit_log=components.audit_log.get())
+
+
+def check_admission(request: Request):
+    """
+    Runs when a worker thread picks the request up: sheds it with 503 and
+    Retry-After if it already queued longer than the admission_control limit.
+    """
+    arrived_at = arrival_time(request.scope)
+    if arrived_at is None:
+        # ArrivalTimeMiddleware not installed: nothing to measure
+        return
+    admission = components.admission_control.get()
+    if admission is None:
+        return
+    decision = admission.admit(arrived_at)
+    if not decision.admitted:
+        logging.warning("Request shed after %.3fs in queue", decision.queue_delay_seconds,
+                        extra={"queue_delay_seconds": decision.queue_delay_seconds})
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                            detail="Servidor saturado. Reintentar más tarde.",
+                            headers=admission.retry_after_headers())
+
+
+def get_session_ticket_service() -> SessionTicketService:
+    """Dependency function for injecting the SessionTicketService."""
+    ticket_service = components.session_ticket_service.get()
+    if ticket_service is None:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                            detail="Tickets de sesión no configurados.")
+    return ticket_service
+
+
+class TicketVerification(BaseModel):
+    username: str
+    fingerprint: str
+    ticket: str
 
 
 @router.get(
@@ -35,18 +68,31 @@ def get_authenticate_service(config: dict = Depends(get_config)) -> Authenticate
     tags=["certificate"],
     summary="Validate that certificate is not revoked",
     response_model=AuthResponse,
+    dependencies=[Depends(check_admission)],
     responses={
+        304: {"description": "La decisión no cambió (If-None-Match)."},
         400: {"description": "Error al buscar el certificado."},
         403: {"description": "El certificado está revocado."},
         500: {"description": "Error interno. Contactar al administrador."},
+        503: {"description": "Servidor saturado; reintentar después de Retry-After."},
     },
 )
 def validate(
     serial_id: str,
     username: str,
+    request: Request,
+    response: Response,
     service: AuthenticateService = Depends(get_authenticate_service),
 ):
-    """Validates if the given certificate is revoked and returns authentication details."""
+    """
+    Validates if the given certificate is revoked and returns authentication details.
+
+    With the http_cache config section, allow and deny decisions carry short
+    Cache-Control lifetimes and allow decisions an ETag, so the proxy can
+    micro-cache them. Errors, and allow decisions carrying signed or expiring
+    fields, are never cacheable.
+    """
+    cache_policy = components.http_cache_policy.get()
     try:
         auth_response, err = service.authenticate(serial_id, username)
         if err:
@@ -55,7 +101,7 @@ def validate(
                 serial_id, err, extra={"serial_id": serial_id, "error": err}
             )
             raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST, detail=err)
+                status_code=status.HTTP_400_BAD_REQUEST, detail=err, headers=NO_STORE)
 
         if auth_response is None:
             logging.error(
@@ -64,22 +110,34 @@ def validate(
             )
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail="Error interno. Contactar al administrador."
+                detail="Error interno. Contactar al administrador.",
+                headers=NO_STORE
             )
 
         if auth_response.allowed:
+            if cache_policy is None or any(
+                    getattr(auth_response, field) is not None for field in PER_RESPONSE_FIELDS):
+                response.headers.update(NO_STORE)
+                return auth_response
+            headers = cache_policy.allow_headers(
+                etag_for(auth_response.model_dump_json().encode("utf-8")))
+            if etag_matches(request.headers.get("if-none-match"), headers["ETag"]):
+                return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+            response.headers.update(headers)
             return auth_response
 
         logging.info("Certificate revoked for serial_id %s",
                      serial_id, extra={"serial_id": serial_id})
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN,
-                            detail="El certificado está revocado.")
+                            detail="El certificado está revocado.",
+                            headers=cache_policy.deny_headers() if cache_policy else NO_STORE)
 
     except KeyError as e:
         logging.exception("KeyError while processing serial_id %s", serial_id)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="Error interno. Contactar al administrador."
+            detail="Error interno. Contactar al administrador.",
+            headers=NO_STORE
         ) from e
 
     except ValueError as e:
@@ -87,7 +145,8 @@ def validate(
             "ValueError while processing serial_id %s", serial_id)
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail=str(e)
+            detail=str(e),
+            headers=NO_STORE
         ) from e
 
     except HTTPException as e:
@@ -97,5 +156,32 @@ def validate(
             "Unexpected error while processing serial_id %s", serial_id)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="Error interno. Contactar al administrador."
+            detail="Error interno. Contactar al administrador.",
+            headers=NO_STORE
         ) from e
+
+
+@router.post(
+    "/certificate/{serial_id}/ticket/verify",
+    tags=["certificate"],
+    summary="Verify a session ticket issued by a previous validation",
+    response_model=AuthResponse,
+    responses={
+        401: {"description": "Ticket inválido o vencido; validar de nuevo."},
+        503: {"description": "Tickets de sesión no configurados."},
+    },
+)
+def verify_ticket(
+    serial_id: str,
+    verification: TicketVerification,
+    ticket_service: SessionTicketService = Depends(get_session_ticket_service),
+):
+    """Accepts a repeat login from its ticket alone, without calling EJBCA."""
+    valid, reason = ticket_service.verify(verification.ticket, serial_id,
+                                         verification.username, verification.fingerprint)
+    if not valid:
+        logging.info("Session ticket rejected for serial_id %s: %s", serial_id, reason,
+                     extra={"serial_id": serial_id})
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED,
+                            detail="Ticket inválido o vencido; validar de nuevo.")
+    return AuthResponse(allowed=True)
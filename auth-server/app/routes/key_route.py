@@ -0,0 +1,50 @@
+import logging
+
+from app.application.authenticate_service import (AuthenticateService,
+                                                  AuthResponse)
+from app.core import components
+from app.routes.certificate_route import get_authenticate_service
+from fastapi import APIRouter, Depends, HTTPException, status
+
+router = APIRouter()
+
+
+def require_key_index():
+    """Fails with 503 while the key fingerprint index is not configured."""
+    if components.key_fingerprint_index.get() is None:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                            detail="Índice de claves no configurado.")
+
+
+@router.get(
+    "/key/validate",
+    tags=["key"],
+    summary="Validate a login from the SSH key fingerprint",
+    response_model=AuthResponse,
+    dependencies=[Depends(require_key_index)],
+    responses={
+        400: {"description": "Error al buscar el certificado."},
+        403: {"description": "Clave desconocida, revocada o sin acceso."},
+        503: {"description": "Índice de claves no configurado."},
+    },
+)
+def validate_key(
+    fingerprint: str,
+    username: str,
+    service: AuthenticateService = Depends(get_authenticate_service),
+):
+    """
+    Validates the certificates carrying the key with the given OpenSSH
+    fingerprint (as passed by sshd's %f) and returns the first one allowed.
+    """
+    auth_response, err = service.authenticate_key(fingerprint, username)
+    if err:
+        logging.warning("Key validation failed for fingerprint %s, error: %s",
+                        fingerprint, err, extra={"fingerprint": fingerprint, "error": err})
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=err)
+    if not auth_response.allowed:
+        logging.info("Key %s not allowed for user %s", fingerprint, username,
+                     extra={"fingerprint": fingerprint})
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN,
+                            detail="Clave desconocida, revocada o sin acceso.")
+    return auth_response
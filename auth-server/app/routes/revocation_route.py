@@ -0,0 +1,175 @@
+import asyncio
+import hmac
+import json
+import logging
+from typing import AsyncIterator, Optional
+
+from app.core import components
+from app.infrastucture.certificate_repository_impl import same_dn
+from app.infrastucture.event_broadcaster import LAGGED, EventBroadcaster
+from app.infrastucture.revocation_event_log import RevocationEventLog
+from fastapi import APIRouter, Depends, Header, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+
+router = APIRouter()
+
+# Comment lines keep idle streams open through proxies; agents time out after a few missed ones
+STREAM_HEARTBEAT_SECONDS = 15.0
+STREAM_RETRY_MILLISECONDS = 3000
+
+
+class RevocationEvent(BaseModel):
+    issuer_dn: str
+    serial_id: str
+    revoked: bool = True
+
+
+class RevocationEventAccepted(BaseModel):
+    offset: int
+
+
+def get_revocation_event_log() -> RevocationEventLog:
+    """Dependency function for injecting the RevocationEventLog."""
+    event_log = components.revocation_event_log.get()
+    if event_log is None:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                            detail="Eventos de revocación no configurados.")
+    return event_log
+
+
+def verify_event_token(authorization: Optional[str] = Header(None)):
+    """Checks the Bearer token shared with the EJBCA publisher."""
+    _verify_bearer(authorization, components.revocation_event_token.get())
+
+
+def verify_stream_token(authorization: Optional[str] = Header(None)):
+    """Checks the Bearer token shared with the pam-client agents."""
+    _verify_bearer(authorization, components.event_stream_token.get())
+
+
+def _verify_bearer(authorization: Optional[str], token: Optional[bytes]):
+    scheme, _, presented = (authorization or "").partition(" ")
+    if token is None or scheme.lower() != "bearer" or not hmac.compare_digest(
+            presented.encode("utf-8"), token):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED,
+                            detail="Token inválido.",
+                            headers={"WWW-Authenticate": "Bearer"})
+
+
+@router.post(
+    "/revocation/events",
+    tags=["revocation"],
+    summary="Push a revocation or unrevocation event",
+    status_code=status.HTTP_202_ACCEPTED,
+    response_model=RevocationEventAccepted,
+    dependencies=[Depends(verify_event_token)],
+    responses={
+        401: {"description": "Token inválido."},
+        422: {"description": "Emisor desconocido."},
+        503: {"description": "Eventos de revocación no configurados."},
+    },
+)
+def post_revocation_event(
+    event: RevocationEvent,
+    event_log: RevocationEventLog = Depends(get_revocation_event_log),
+):
+    """Updates the revocation status cached by every worker for (issuer_dn, serial_id)."""
+    if not same_dn(event.issuer_dn, components.issuer_dn()):
+        # Accepting it would log an event that no worker applies
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                            detail="Emisor desconocido.")
+    offset = event_log.append(event.model_dump())
+    logging.info("Revocation event for serial_id %s (revoked=%s) at offset %s",
+                 event.serial_id, event.revoked, offset,
+                 extra={"serial_id": event.serial_id})
+    return RevocationEventAccepted(offset=offset)
+
+
+@router.get(
+    "/revocation/stream",
+    tags=["revocation"],
+    summary="Stream revocation and policy events (Server-Sent Events)",
+    response_class=StreamingResponse,
+    dependencies=[Depends(verify_stream_token)],
+    responses={401: {"description": "Token inválido."}},
+)
+async def stream_revocation_events(last_event_id: Optional[str] = Header(None)):
+    """
+    Streams "revocation" events from the shared log and "policy" events on
+    config changes. Every frame carries the feed id and log offset as its id,
+    so a reconnecting agent sends Last-Event-ID and receives what it missed.
+    Each replica has its own feed: an id from another replica, from a replaced
+    log or unparseable is answered with a "resync" event first, and the agent
+    drops everything it cached.
+    """
+    event_log = components.revocation_event_log.get()
+    resume_from = None
+    if last_event_id:
+        resume_from = parse_event_id(last_event_id, event_log)
+    return StreamingResponse(
+        event_stream(components.event_broadcaster, event_log,
+                     resume_from, components.policy_version(),
+                     resync=bool(last_event_id) and resume_from is None),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+def parse_event_id(last_event_id: str, event_log: Optional[RevocationEventLog]) -> Optional[int]:
+    """The offset of an event id of this replica's feed, or None if the id is not ours."""
+    if event_log is None:
+        return None
+    feed_id, _, offset = last_event_id.partition(":")
+    if feed_id != event_log.feed_id or not offset.isdigit():
+        return None
+    return int(offset)
+
+
+async def event_stream(broadcaster: EventBroadcaster,
+                       event_log: Optional[RevocationEventLog],
+                       resume_from: Optional[int],
+                       policy_version: str,
+                       heartbeat_seconds: float = STREAM_HEARTBEAT_SECONDS,
+                       resync: bool = False) -> AsyncIterator[str]:
+    feed_id = event_log.feed_id if event_log is not None else None
+    with broadcaster.subscribe() as subscription:
+        # Subscribed before reading the log, so nothing falls between backlog and live events
+        last_offset = event_log.offset if event_log is not None else 0
+        backlog = []
+        if event_log is not None and resume_from is not None:
+            backlog, _ = await run_in_threadpool(event_log.read_from, resume_from)
+            last_offset = resume_from
+        yield f"retry: {STREAM_RETRY_MILLISECONDS}\n"
+        current_id = stream_event_id(feed_id, last_offset)
+        if resync:
+            yield format_event("resync", {}, current_id)
+        yield format_event("policy", {"version": policy_version}, current_id)
+        for event, offset in backlog:
+            last_offset = offset
+            yield format_event("revocation", event, stream_event_id(feed_id, offset))
+        while True:
+            try:
+                item = await asyncio.wait_for(subscription.queue.get(), heartbeat_seconds)
+            except asyncio.TimeoutError:
+                yield ": keepalive\n\n"
+                continue
+            if item is LAGGED:
+                return
+            event_type, data, offset = item
+            if offset is not None:
+                if offset <= last_offset:
+                    continue
+                last_offset = offset
+            yield format_event(event_type, data, stream_event_id(feed_id, last_offset))
+
+
+def stream_event_id(feed_id: Optional[str], offset: int) -> str:
+    # Without a log there is nothing to replay, so the id is never resumable
+    return f"{feed_id}:{offset}" if feed_id is not None else str(offset)
+
+
+def format_event(event_type: str, data: dict, event_id: str) -> str:
+    payload = json.dumps(data, sort_keys=True, separators=(",", ":"))
+    return f"id: {event_id}\nevent: {event_type}\ndata: {payload}\n\n"
@@ -0,0 +1,58 @@
+from unittest.mock import MagicMock
+
+import pytest
+from fastapi import HTTPException, status
+
+from app.core import components
+from app.infrastucture.certificate_population import CertificatePopulation
+from app.infrastucture.decode_pipeline import DecodedCertificate
+from app.routes import admin_route
+
+
+@pytest.fixture
+def population():
+    far = 4_000_000_000
+    return CertificatePopulation.from_records([
+        (DecodedCertificate("A", far, "admin", None, None), False),
+        (DecodedCertificate("B", far, "admin,deploy", None, None), True),
+    ], built_at=1_700_000_000)
+
+
+def test_summary(population):
+    summary = admin_route.population_summary(population)
+
+    assert summary.total == 2
+    assert summary.revoked == 1
+    assert summary.built_at == 1_700_000_000
+
+
+def test_active_per_role(population):
+    assert admin_route.active_per_role(population) == {"admin": 1, "deploy": 0}
+
+
+def test_expiring_certificates(population):
+    assert admin_route.expiring_certificates(days=14, role=None, population=population) == []
+
+
+def test_population_unavailable_until_first_snapshot(monkeypatch):
+    snapshots = MagicMock()
+    snapshots.get.return_value = MagicMock(current=None)
+    monkeypatch.setattr(components, "population_snapshots", snapshots)
+
+    with pytest.raises(HTTPException) as exc_info:
+        admin_route.get_population()
+
+    assert exc_info.value.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+
+
+@pytest.mark.parametrize("authorization", [None, "Bearer wrong", "Basic admin-token"])
+def test_admin_token_is_required(monkeypatch, authorization):
+    token = MagicMock()
+    token.get.return_value = b"admin-token"
+    monkeypatch.setattr(components, "admin_token", token)
+
+    admin_route.verify_admin_token("Bearer admin-token")
+    with pytest.raises(HTTPException) as exc_info:
+        admin_route.verify_admin_token(authorization)
+
+    assert exc_info.value.status_code == status.HTTP_401_UNAUTHORIZED
@@ -1,8 +1,15 @@
+import time
+
 import pytest
 from unittest.mock import AsyncMock, MagicMock
-from fastapi import HTTPException, status
+from fastapi import FastAPI, HTTPException, Request, Response, status
+from fastapi.testclient import TestClient
 from app.application.authenticate_service import AuthResponse
-from app.routes.certificate_route import validate
+from app.core import components
+from app.core.admission_control import AdmissionControl, ArrivalTimeMiddleware
+from app.core.http_cache import HttpCachePolicy
+from app.routes.certificate_route import (TicketVerification, get_authenticate_service,
+                                          router, validate, verify_ticket)
 
 
 @pytest.fixture
@@ -13,21 +20,29 @@ def mock_authenticate_service():
     return service_mock
 
 
-def test_validate_certificate_valid(mock_authenticate_service):
+@pytest.fixture
+def http_exchange(monkeypatch):
+    """Request y Response para llamar a validate directamente, sin sección http_cache."""
+    monkeypatch.setattr(components, "http_cache_policy",
+                        MagicMock(get=MagicMock(return_value=None)))
+    return Request({"type": "http", "method": "GET", "headers": []}), Response()
+
+
+def test_validate_certificate_valid(mock_authenticate_service, http_exchange):
     """Should return AuthResponse(allowed=True) when authentication is successful."""
     mock_authenticate_service.authenticate.return_value = (
         AuthResponse(allowed=True, authorized_keys_entry="mocked-ssh-key"),
         None
     )
 
-    response = validate("123ABC", "admin", mock_authenticate_service)
+    response = validate("123ABC", "admin", *http_exchange, mock_authenticate_service)
 
     assert response.allowed is True
     assert response.authorized_keys_entry == "mocked-ssh-key"
     mock_authenticate_service.authenticate.assert_called_once_with("123ABC", "admin")
 
 
-def test_validate_certificate_not_found(mock_authenticate_service):
+def test_validate_certificate_not_found(mock_authenticate_service, http_exchange):
     """Should raise 400 Bad Request if the certificate is not found."""
     mock_authenticate_service.authenticate.return_value = (
         None,
@@ -35,14 +50,14 @@ def test_validate_certificate_not_found(mock_authenticate_service):
     )
 
     with pytest.raises(HTTPException) as exc_info:
-        validate("123ABC", "admin", mock_authenticate_service)
+        validate("123ABC", "admin", *http_exchange, mock_authenticate_service)
 
     assert exc_info.value.status_code == status.HTTP_400_BAD_REQUEST
     assert exc_info.value.detail == {"error": "Certificate not found"}
     mock_authenticate_service.authenticate.assert_called_once_with("123ABC", "admin")
 
 
-def test_validate_certificate_revoked(mock_authenticate_service):
+def test_validate_certificate_revoked(mock_authenticate_service, http_exchange):
     """Should raise 403 Forbidden if the certificate is revoked."""
     mock_authenticate_service.authenticate.return_value = (
         AuthResponse(allowed=False),
@@ -50,14 +65,14 @@ def test_validate_certificate_revoked(mock_authenticate_service):
     )
 
     with pytest.raises(HTTPException) as exc_info:
-        validate("123ABC", "admin", mock_authenticate_service)
+        validate("123ABC", "admin", *http_exchange, mock_authenticate_service)
 
     assert exc_info.value.status_code == status.HTTP_403_FORBIDDEN
     assert exc_info.value.detail == "El certificado está revocado."
     mock_authenticate_service.authenticate.assert_called_once_with("123ABC", "admin")
 
 
-def test_validate_revocation_check_fails(mock_authenticate_service):
+def test_validate_revocation_check_fails(mock_authenticate_service, http_exchange):
     """Should raise 400 Bad Request if revocation check fails."""
     mock_authenticate_service.authenticate.return_value = (
         None,
@@ -65,20 +80,228 @@ def test_validate_revocation_check_fails(mock_authenticate_service):
     )
 
     with pytest.raises(HTTPException) as exc_info:
-        validate("123ABC", "admin", mock_authenticate_service)
+        validate("123ABC", "admin", *http_exchange, mock_authenticate_service)
 
     assert exc_info.value.status_code == status.HTTP_400_BAD_REQUEST
     assert exc_info.value.detail == {"error": "Revocation check failed"}
     mock_authenticate_service.authenticate.assert_called_once_with("123ABC", "admin")
 
 
-def test_validate_internal_server_error(mock_authenticate_service):
+def test_validate_internal_server_error(mock_authenticate_service, http_exchange):
     """Should raise 500 Internal Server Error if an unexpected exception occurs."""
     mock_authenticate_service.authenticate.side_effect = Exception("Unexpected error")
 
     with pytest.raises(HTTPException) as exc_info:
-        validate("123ABC", "admin", mock_authenticate_service)
+        validate("123ABC", "admin", *http_exchange, mock_authenticate_service)
 
     assert exc_info.value.status_code == status.HTTP_500_INTERNAL_SERVER_ERROR
     assert exc_info.value.detail == "Error interno. Contactar al administrador."
     mock_authenticate_service.authenticate.assert_called_once_with("123ABC", "admin")
+
+
+def test_verify_ticket_accepts_valid_ticket():
+    """Un ticket válido autoriza el login sin pasar por AuthenticateService."""
+    ticket_service = MagicMock()
+    ticket_service.verify.return_value = (True, None)
+
+    response = verify_ticket("123ABC", TicketVerification(
+        username="admin", fingerprint="SHA256:abc", ticket="payload.mac"), ticket_service)
+
+    assert response.allowed is True
+    ticket_service.verify.assert_called_once_with("payload.mac", "123ABC", "admin", "SHA256:abc")
+
+
+def test_verify_ticket_rejects_invalid_ticket():
+    ticket_service = MagicMock()
+    ticket_service.verify.return_value = (False, "ticket expired")
+
+    with pytest.raises(HTTPException) as exc_info:
+        verify_ticket("123ABC", TicketVerification(
+            username="admin", fingerprint="SHA256:abc", ticket="payload.mac"), ticket_service)
+
+    assert exc_info.value.status_code == status.HTTP_401_UNAUTHORIZED
+
+
+@pytest.fixture
+def cached_client(monkeypatch, mock_authenticate_service):
+    """App with the certificate router, a mocked service and the http_cache section configured."""
+    app = FastAPI()
+    app.include_router(router, prefix="/api/v1")
+    app.dependency_overrides[get_authenticate_service] = lambda: mock_authenticate_service
+    monkeypatch.setattr(components, "http_cache_policy",
+                        MagicMock(get=MagicMock(return_value=HttpCachePolicy(5, 2))))
+    return TestClient(app)
+
+
+def test_validate_allow_is_cacheable_with_etag(cached_client, mock_authenticate_service):
+    mock_authenticate_service.authenticate.return_value = (
+        AuthResponse(allowed=True, authorized_keys_entry="mocked-ssh-key"), None)
+
+    response = cached_client.get("/api/v1/certificate/123ABC/validate", params={"username": "admin"})
+
+    assert response.status_code == 200
+    assert response.headers["cache-control"] == "public, max-age=5"
+    assert response.headers["etag"]
+
+
+def test_validate_if_none_match_returns_304(cached_client, mock_authenticate_service):
+    mock_authenticate_service.authenticate.return_value = (
+        AuthResponse(allowed=True, authorized_keys_entry="mocked-ssh-key"), None)
+    url = "/api/v1/certificate/123ABC/validate?username=admin"
+    etag = cached_client.get(url).headers["etag"]
+
+    response = cached_client.get(url, headers={"If-None-Match": etag})
+
+    assert response.status_code == 304
+    assert response.content == b""
+    assert response.headers["etag"] == etag
+    assert response.headers["cache-control"] == "public, max-age=5"
+
+
+@pytest.mark.parametrize("fields", [
+    {"signature": "mac", "expires_at": 1},
+    {"session_ticket": "payload.mac"},
+    {"ssh_certificate": "ssh-rsa-cert-v01@openssh.com AAAA"},
+])
+def test_validate_allow_with_signed_or_expiring_fields_is_no_store(
+        cached_client, mock_authenticate_service, fields):
+    """Un 304 mantendría vivos una firma o un ticket ya vencidos en la caché del proxy."""
+    mock_authenticate_service.authenticate.return_value = (
+        AuthResponse(allowed=True, authorized_keys_entry="mocked-ssh-key", **fields), None)
+
+    response = cached_client.get("/api/v1/certificate/123ABC/validate", params={"username": "admin"})
+
+    assert response.status_code == 200
+    assert response.headers["cache-control"] == "no-store"
+    assert "etag" not in response.headers
+
+
+def test_validate_deny_is_cacheable_briefly(cached_client, mock_authenticate_service):
+    mock_authenticate_service.authenticate.return_value = (AuthResponse(allowed=False), None)
+
+    response = cached_client.get("/api/v1/certificate/123ABC/validate", params={"username": "admin"})
+
+    assert response.status_code == 403
+    assert response.headers["cache-control"] == "public, max-age=2"
+
+
+def test_validate_errors_are_never_cached(cached_client, mock_authenticate_service):
+    mock_authenticate_service.authenticate.return_value = (None, {"error": "Certificate not found"})
+
+    response = cached_client.get("/api/v1/certificate/123ABC/validate", params={"username": "admin"})
+
+    assert response.status_code == 400
+    assert response.headers["cache-control"] == "no-store"
+
+
+def test_validate_without_cache_section_is_no_store(monkeypatch, mock_authenticate_service):
+    app = FastAPI()
+    app.include_router(router, prefix="/api/v1")
+    app.dependency_overrides[get_authenticate_service] = lambda: mock_authenticate_service
+    monkeypatch.setattr(components, "http_cache_policy",
+                        MagicMock(get=MagicMock(return_value=None)))
+    mock_authenticate_service.authenticate.return_value = (
+        AuthResponse(allowed=True, authorized_keys_entry="mocked-ssh-key"), None)
+
+    response = TestClient(app).get("/api/v1/certificate/123ABC/validate", params={"username": "admin"})
+
+    assert response.status_code == 200
+    assert response.headers["cache-control"] == "no-store"
+    assert "etag" not in response.headers
+
+
+class _MicroCache:
+    """
+    Behaves like the sample nginx config: keyed on the request URI, honours
+    max-age, revalidates expired entries with If-None-Match, never stores
+    no-store responses.
+    """
+
+    def __init__(self, client, clock):
+        self.client = client
+        self.clock = clock
+        self.entries = {}
+
+    def get(self, url):
+        entry = self.entries.get(url)
+        if entry and entry["expires_at"] > self.clock():
+            return entry["status"], entry["content"]
+        headers = {"If-None-Match": entry["etag"]} if entry and entry["etag"] else {}
+        response = self.client.get(url, headers=headers)
+        cache_control = response.headers.get("cache-control", "no-store")
+        if response.status_code == 304:
+            entry["expires_at"] = self.clock() + _max_age(cache_control)
+            return entry["status"], entry["content"]
+        if cache_control != "no-store":
+            self.entries[url] = {
+                "status": response.status_code,
+                "content": response.content,
+                "etag": response.headers.get("etag"),
+                "expires_at": self.clock() + _max_age(cache_control),
+            }
+        return response.status_code, response.content
+
+
+def _max_age(cache_control):
+    return int(cache_control.rsplit("max-age=", 1)[1])
+
+
+def test_micro_cache_drops_upstream_hits_under_repeated_load(cached_client, mock_authenticate_service):
+    """Repeated logins of a few users over 20 seconds reach the service a handful of times."""
+    allowed = AuthResponse(allowed=True, authorized_keys_entry="mocked-ssh-key")
+    mock_authenticate_service.authenticate.side_effect = (
+        lambda serial_id, username: (allowed if serial_id != "DEAD" else AuthResponse(allowed=False), None))
+    now = [0.0]
+    cache = _MicroCache(cached_client, lambda: now[0])
+    urls = ["/api/v1/certificate/%s/validate?username=admin" % serial
+            for serial in ("123ABC", "456DEF", "DEAD")]
+    statuses = []
+
+    requests = 0
+    for tick in range(200):
+        now[0] = tick * 0.1
+        for url in urls:
+            statuses.append(cache.get(url)[0])
+            requests += 1
+
+    upstream = mock_authenticate_service.authenticate.call_count
+    # Every 5s per allowed URL and every 2s for the denied one, instead of once per request
+    assert upstream <= 2 * (20 // 5 + 1) + (20 // 2 + 1)
+    assert upstream < requests / 20
+    assert statuses.count(403) == 200
+
+
+def _admission_client(monkeypatch, mock_authenticate_service, admission):
+    app = FastAPI()
+    app.add_middleware(ArrivalTimeMiddleware)
+    app.include_router(router, prefix="/api/v1")
+    app.dependency_overrides[get_authenticate_service] = lambda: mock_authenticate_service
+    monkeypatch.setattr(components, "http_cache_policy", MagicMock(get=MagicMock(return_value=None)))
+    monkeypatch.setattr(components, "admission_control",
+                        MagicMock(get=MagicMock(return_value=admission)))
+    return TestClient(app)
+
+
+def test_validate_sheds_request_queued_too_long(monkeypatch, mock_authenticate_service):
+    # A clock far ahead of the arrival stamp: the request waited "forever" for a thread
+    admission = AdmissionControl(0.25, retry_after_seconds=2, clock=lambda: time.monotonic() + 60)
+    client = _admission_client(monkeypatch, mock_authenticate_service, admission)
+
+    response = client.get("/api/v1/certificate/123ABC/validate", params={"username": "admin"})
+
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == "2"
+    assert response.headers["cache-control"] == "no-store"
+    mock_authenticate_service.authenticate.assert_not_called()
+
+
+def test_validate_admits_request_within_queue_delay(monkeypatch, mock_authenticate_service):
+    mock_authenticate_service.authenticate.return_value = (
+        AuthResponse(allowed=True, authorized_keys_entry="mocked-ssh-key"), None)
+    admission = AdmissionControl(5.0)
+    client = _admission_client(monkeypatch, mock_authenticate_service, admission)
+
+    response = client.get("/api/v1/certificate/123ABC/validate", params={"username": "admin"})
+
+    assert response.status_code == 200
+    assert admission.admitted == 1
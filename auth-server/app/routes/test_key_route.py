@@ -0,0 +1,39 @@
+from unittest.mock import MagicMock
+
+import pytest
+from fastapi import HTTPException, status
+
+from app.application.authenticate_service import AuthResponse
+from app.routes.key_route import validate_key
+
+
+def test_validate_key_allowed():
+    service = MagicMock()
+    service.authenticate_key.return_value = (
+        AuthResponse(allowed=True, authorized_keys_entry="ssh-ed25519 AAAA", serial_id="ABC"), None)
+
+    response = validate_key("SHA256:abc", "admin", service)
+
+    assert response.serial_id == "ABC"
+    service.authenticate_key.assert_called_once_with("SHA256:abc", "admin")
+
+
+def test_validate_key_denied():
+    """Una huella desconocida o sin acceso devuelve 403."""
+    service = MagicMock()
+    service.authenticate_key.return_value = (AuthResponse(allowed=False), None)
+
+    with pytest.raises(HTTPException) as exc_info:
+        validate_key("SHA256:abc", "admin", service)
+
+    assert exc_info.value.status_code == status.HTTP_403_FORBIDDEN
+
+
+def test_validate_key_lookup_error():
+    service = MagicMock()
+    service.authenticate_key.return_value = (None, {"error": "is_revoked call failed"})
+
+    with pytest.raises(HTTPException) as exc_info:
+        validate_key("SHA256:abc", "admin", service)
+
+    assert exc_info.value.status_code == status.HTTP_400_BAD_REQUEST
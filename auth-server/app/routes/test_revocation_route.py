@@ -0,0 +1,151 @@
+import asyncio
+from unittest.mock import MagicMock
+
+import pytest
+from fastapi import HTTPException, status
+
+from app.core import components
+from app.infrastucture.event_broadcaster import EventBroadcaster
+from app.infrastucture.revocation_event_log import RevocationEventLog
+from app.routes.revocation_route import (RevocationEvent, event_stream,
+                                         parse_event_id, post_revocation_event,
+                                         verify_event_token, verify_stream_token)
+
+
+@pytest.fixture
+def event_token(monkeypatch):
+    token = MagicMock()
+    token.get.return_value = b"s3cret"
+    monkeypatch.setattr(components, "revocation_event_token", token)
+
+
+def test_valid_token_is_accepted(event_token):
+    verify_event_token("Bearer s3cret")
+
+
+@pytest.mark.parametrize("authorization", [None, "Bearer wrong", "Basic s3cret", "s3cret"])
+def test_invalid_token_is_rejected(event_token, authorization):
+    with pytest.raises(HTTPException) as exc_info:
+        verify_event_token(authorization)
+
+    assert exc_info.value.status_code == status.HTTP_401_UNAUTHORIZED
+
+
+def test_unconfigured_token_rejects_everything(monkeypatch):
+    token = MagicMock()
+    token.get.return_value = None
+    monkeypatch.setattr(components, "revocation_event_token", token)
+
+    with pytest.raises(HTTPException):
+        verify_event_token("Bearer ")
+
+
+def test_stream_requires_its_own_token(event_token, monkeypatch):
+    stream_token = MagicMock()
+    stream_token.get.return_value = b"agentes"
+    monkeypatch.setattr(components, "event_stream_token", stream_token)
+
+    verify_stream_token("Bearer agentes")
+    with pytest.raises(HTTPException) as exc_info:
+        verify_stream_token("Bearer s3cret")
+
+    assert exc_info.value.status_code == status.HTTP_401_UNAUTHORIZED
+
+
+@pytest.fixture
+def issuer_dn(monkeypatch):
+    monkeypatch.setattr(components, "issuer_dn", lambda: "CN%3DPSI-CA%2CO%3DPSI")
+
+
+def test_event_is_appended_to_log(issuer_dn):
+    event_log = MagicMock()
+    event_log.append.return_value = 42
+    event = RevocationEvent(issuer_dn="cn=PSI-CA, O=PSI", serial_id="1EB97F")
+
+    response = post_revocation_event(event, event_log)
+
+    assert response.offset == 42
+    event_log.append.assert_called_once_with(
+        {"issuer_dn": "cn=PSI-CA, O=PSI", "serial_id": "1EB97F", "revoked": True})
+
+
+def test_event_for_unknown_issuer_is_rejected(issuer_dn):
+    event_log = MagicMock()
+
+    with pytest.raises(HTTPException) as exc_info:
+        post_revocation_event(RevocationEvent(issuer_dn="CN=Otra CA", serial_id="1EB97F"),
+                              event_log)
+
+    assert exc_info.value.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+    event_log.append.assert_not_called()
+
+
+def _collect(stream, frames):
+    async def scenario():
+        collected = []
+        async for frame in stream:
+            collected.append(frame)
+            if len(collected) == frames:
+                break
+        await stream.aclose()
+        return collected
+    return asyncio.run(scenario())
+
+
+def test_stream_resumes_from_last_event_id(tmp_path):
+    event_log = RevocationEventLog(str(tmp_path / "events.log"))
+    first = event_log.append({"serial_id": "01", "issuer_dn": "CN=PSI-CA", "revoked": True})
+    second = event_log.append({"serial_id": "02", "issuer_dn": "CN=PSI-CA", "revoked": True})
+
+    resume_from = parse_event_id(f"{event_log.feed_id}:{first}", event_log)
+
+    frames = _collect(event_stream(EventBroadcaster(), event_log, resume_from, "v1"), 3)
+
+    assert resume_from == first
+    assert frames[1] == f'id: {event_log.feed_id}:{first}\nevent: policy\ndata: {{"version":"v1"}}\n\n'
+    assert frames[2].startswith(f"id: {event_log.feed_id}:{second}\nevent: revocation\n")
+    assert '"serial_id":"02"' in frames[2]
+
+
+@pytest.mark.parametrize("last_event_id", ["otra-replica:10", "10", "basura", ":"])
+def test_event_id_of_another_feed_is_not_resumed(tmp_path, last_event_id):
+    event_log = RevocationEventLog(str(tmp_path / "events.log"))
+
+    assert parse_event_id(last_event_id, event_log) is None
+
+
+def test_stream_starts_with_resync_when_id_is_unknown(tmp_path):
+    event_log = RevocationEventLog(str(tmp_path / "events.log"))
+    offset = event_log.append({"serial_id": "01", "issuer_dn": "CN=PSI-CA", "revoked": True})
+
+    frames = _collect(event_stream(EventBroadcaster(), event_log, None, "v1", resync=True), 3)
+
+    assert frames[1] == f"id: {event_log.feed_id}:{offset}\nevent: resync\ndata: {{}}\n\n"
+    assert "event: policy" in frames[2]
+
+
+def test_stream_delivers_live_events_once():
+    broadcaster = EventBroadcaster()
+
+    async def scenario():
+        stream = event_stream(broadcaster, None, None, "v1")
+        frames = [await stream.__anext__(), await stream.__anext__()]
+        broadcaster.publish("revocation", {"serial_id": "01"}, 7)
+        broadcaster.publish("revocation", {"serial_id": "01"}, 7)
+        broadcaster.publish("policy", {"version": "v2"})
+        frames.append(await stream.__anext__())
+        frames.append(await stream.__anext__())
+        await stream.aclose()
+        return frames
+
+    frames = asyncio.run(scenario())
+
+    assert frames[2] == 'id: 7\nevent: revocation\ndata: {"serial_id":"01"}\n\n'
+    assert frames[3] == 'id: 7\nevent: policy\ndata: {"version":"v2"}\n\n'
+
+
+def test_stream_sends_heartbeat_when_idle():
+    frames = _collect(event_stream(EventBroadcaster(), None, None, "v1",
+                                   heartbeat_seconds=0.01), 3)
+
+    assert frames[2] == ": keepalive\n\n"
@@ -0,0 +1,271 @@
+"""
+Replays a /validate traffic capture against an auth server build.
+
+The capture is the file written by the traffic_capture config section
+(app/infrastucture/traffic_capture.py). The tool starts a fake EJBCA that
+answers every recorded EJBCA request with the recorded response after the
+recorded latency, then sends the captured /validate requests to the server
+under test and reports throughput and latency percentiles.
+
+The server under test must point at the fake EJBCA, e.g.:
+
+    ejbca:
+      base_url: "http://127.0.0.1:9443/ejbca/ejbca-rest-api"
+
+    python -m tools.replay_traffic traffic.jsonl --target http://127.0.0.1:8888 --ejbca-port 9443
+
+--speed 1 keeps the recorded arrival times (2 halves the gaps); the default,
+0, sends as fast as --concurrency allows.
+"""
+import argparse
+import json
+import math
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+import requests
+
+
+def load_capture(path: str) -> List[dict]:
+    """Reads a capture, skipping a truncated last line."""
+    records = []
+    with open(path, "rb") as file:
+        for line in file:
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                continue
+    records.sort(key=lambda record: record["ts"])
+    return records
+
+
+class RecordedResponses:
+    """
+    Recorded EJBCA responses by (method, path, body). Repeats of the same
+    request are answered in recorded order, wrapping around. A request whose
+    body differs from every recording (a build changed the query) falls back
+    to the recordings of its method and path.
+    """
+
+    def __init__(self, records: Iterable[dict]):
+        self._exact: Dict[Tuple[str, str, Optional[str]], List[dict]] = {}
+        self._by_path: Dict[Tuple[str, str], List[dict]] = {}
+        self._next: Dict[tuple, int] = {}
+        self._lock = threading.Lock()
+        for record in records:
+            for exchange in record.get("e", []):
+                self._exact.setdefault((exchange["m"], exchange["u"], exchange["rb"]), []).append(exchange)
+                self._by_path.setdefault((exchange["m"], exchange["u"]), []).append(exchange)
+
+    def lookup(self, method: str, path: str, body: Optional[str]) -> Optional[dict]:
+        key = (method, path, body)
+        exchanges = self._exact.get(key)
+        if exchanges is None:
+            key = (method, path)
+            exchanges = self._by_path.get(key)
+        if not exchanges:
+            return None
+        with self._lock:
+            index = self._next.get(key, 0)
+            self._next[key] = index + 1
+        return exchanges[index % len(exchanges)]
+
+
+class FakeEJBCA:
+    """HTTP server answering with RecordedResponses at the recorded latencies."""
+
+    def __init__(self, responses: RecordedResponses, host: str = "127.0.0.1", port: int = 0):
+        self.responses = responses
+        self.hits = 0
+        self.misses = 0
+        self._counter_lock = threading.Lock()
+        self.server = ThreadingHTTPServer((host, port), self._handler())
+        self.server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def port(self) -> int:
+        return self.server.server_address[1]
+
+    def start(self):
+        self._thread = threading.Thread(target=self.server.serve_forever,
+                                        name="fake-ejbca", daemon=True)
+        self._thread.start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def _count(self, hit: bool):
+        with self._counter_lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def _handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                self._answer()
+
+            def do_POST(self):
+                self._answer()
+
+            def _answer(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                body = self.rfile.read(length).decode("utf-8", "replace") if length else None
+                exchange = fake.responses.lookup(self.command, self.path, body)
+                fake._count(exchange is not None)
+                if exchange is None:
+                    status, content = 404, b'{"error_message":"not recorded"}'
+                else:
+                    time.sleep(exchange["ms"] / 1000)
+                    status, content = exchange["s"], (exchange["b"] or "").encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(content)))
+                self.end_headers()
+                self.wfile.write(content)
+
+            def log_message(self, format, *args):  # pylint: disable=redefined-builtin
+                pass
+
+        return Handler
+
+
+class ReplayReport(NamedTuple):
+    requests: int
+    duration_seconds: float
+    throughput: float
+    p50_ms: float
+    p90_ms: float
+    p99_ms: float
+    max_ms: float
+    statuses: Dict[int, int]
+    # Requests answered with another status than in the capture
+    mismatches: int
+
+    def format(self) -> str:
+        statuses = ", ".join(f"{status}: {count}" for status, count in sorted(self.statuses.items()))
+        return (f"requests: {self.requests} in {self.duration_seconds:.2f}s "
+                f"({self.throughput:.1f} req/s)\n"
+                f"latency ms: p50 {self.p50_ms:.1f}  p90 {self.p90_ms:.1f}  "
+                f"p99 {self.p99_ms:.1f}  max {self.max_ms:.1f}\n"
+                f"statuses: {statuses}  mismatches: {self.mismatches}")
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of an ascending list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(fraction * len(sorted_values)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def replay(records: List[dict], send: Callable[[str], int], concurrency: int = 8,
+           speed: float = 0.0, clock: Callable[[], float] = time.perf_counter) -> ReplayReport:
+    """
+    Sends every record's path and query through send(url) -> status.
+
+    With speed > 0 request i is due at its recorded offset / speed, and its
+    latency counts from that moment, so queueing behind a slow build is
+    measured rather than hidden by fewer requests in flight.
+    """
+    first_ts = records[0]["ts"] if records else 0.0
+    latencies: List[float] = [0.0] * len(records)
+    statuses: List[int] = [0] * len(records)
+    started = clock()
+
+    def run(index: int):
+        record = records[index]
+        due = started + (record["ts"] - first_ts) / speed if speed > 0 else None
+        if due is not None:
+            time.sleep(max(0.0, due - clock()))
+        sent = due if due is not None else clock()
+        url = record["p"] + ("?" + record["q"] if record["q"] else "")
+        try:
+            statuses[index] = send(url)
+        except requests.RequestException:
+            statuses[index] = 0
+        latencies[index] = (clock() - sent) * 1000
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(run, range(len(records))))
+    duration = clock() - started
+
+    ordered = sorted(latencies)
+    counts: Dict[int, int] = {}
+    for status in statuses:
+        counts[status] = counts.get(status, 0) + 1
+    return ReplayReport(
+        requests=len(records),
+        duration_seconds=duration,
+        throughput=len(records) / duration if duration > 0 else 0.0,
+        p50_ms=percentile(ordered, 0.50),
+        p90_ms=percentile(ordered, 0.90),
+        p99_ms=percentile(ordered, 0.99),
+        max_ms=ordered[-1] if ordered else 0.0,
+        statuses=counts,
+        mismatches=sum(1 for record, status in zip(records, statuses) if record["s"] != status),
+    )
+
+
+def http_sender(target: str, timeout: float = 10.0) -> Callable[[str], int]:
+    """send(url) over one keep-alive session per thread, verify disabled like the EJBCA client."""
+    local = threading.local()
+
+    def send(url: str) -> int:
+        session = getattr(local, "session", None)
+        if session is None:
+            session = local.session = requests.Session()
+            session.verify = False
+        return session.get(target.rstrip("/") + url, timeout=timeout).status_code
+
+    return send
+
+
+def main(argv: List[str]) -> int:
+    parser = argparse.ArgumentParser(description="Replays a /validate traffic capture.")
+    parser.add_argument("capture", help="file written by the traffic_capture section")
+    parser.add_argument("--target", help="auth server base URL, e.g. http://127.0.0.1:8888")
+    parser.add_argument("--ejbca-port", type=int, default=9443, help="port of the fake EJBCA")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--speed", type=float, default=0.0,
+                        help="1 keeps the recorded arrival times; 0 sends as fast as possible")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    parser.add_argument("--serve-only", action="store_true",
+                        help="only run the fake EJBCA (e.g. while warming the server up)")
+    args = parser.parse_args(argv)
+    if not args.serve_only and not args.target:
+        parser.error("--target is required unless --serve-only is given")
+
+    records = load_capture(args.capture)
+    fake = FakeEJBCA(RecordedResponses(records), port=args.ejbca_port)
+    fake.start()
+    try:
+        if args.serve_only:
+            sys.stderr.write(f"fake EJBCA on port {fake.port} with {len(records)} requests\n")
+            threading.Event().wait()
+        report = replay(records, http_sender(args.target), args.concurrency, args.speed)
+    except KeyboardInterrupt:
+        return 130
+    finally:
+        fake.close()
+    if args.json:
+        print(json.dumps({**report._asdict(), "ejbca_hits": fake.hits, "ejbca_misses": fake.misses}))
+    else:
+        print(report.format())
+        print(f"fake EJBCA: {fake.hits} recorded answers, {fake.misses} unrecorded requests")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,108 @@
+import json
+import time
+
+import requests
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse
+from fastapi.testclient import TestClient
+
+from tools.replay_traffic import (FakeEJBCA, RecordedResponses, load_capture,
+                                  percentile, replay)
+
+
+def _exchange(method, url, status, ms, body, request_body=None):
+    return {"m": method, "u": url, "rb": request_body, "s": status, "ms": ms, "b": body}
+
+
+def _record(ts, serial, status, exchanges):
+    return {"ts": ts, "m": "GET", "p": f"/api/v1/certificate/{serial}/validate",
+            "q": "username=admin", "s": status, "ms": 5.0, "e": exchanges}
+
+
+def test_load_capture_sorts_and_skips_truncated_line(tmp_path):
+    path = tmp_path / "traffic.jsonl"
+    path.write_text(json.dumps(_record(2.0, "B", 200, [])) + "\n"
+                    + json.dumps(_record(1.0, "A", 200, [])) + "\n"
+                    + '{"ts": 3.0, "p": "/api/v1/cert')
+
+    records = load_capture(str(path))
+
+    assert [record["p"] for record in records] == ["/api/v1/certificate/A/validate",
+                                                   "/api/v1/certificate/B/validate"]
+
+
+def test_recorded_responses_in_order_with_body_fallback():
+    responses = RecordedResponses([
+        _record(0, "A", 200, [_exchange("POST", "/v2/certificate/search", 200, 1, "first", '{"q":1}')]),
+        _record(1, "A", 200, [_exchange("POST", "/v2/certificate/search", 200, 1, "second", '{"q":1}')]),
+    ])
+
+    assert responses.lookup("POST", "/v2/certificate/search", '{"q":1}')["b"] == "first"
+    assert responses.lookup("POST", "/v2/certificate/search", '{"q":1}')["b"] == "second"
+    assert responses.lookup("POST", "/v2/certificate/search", '{"q":1}')["b"] == "first"
+    assert responses.lookup("POST", "/v2/certificate/search", '{"q":2}') is not None
+    assert responses.lookup("GET", "/v1/unknown", None) is None
+
+
+def test_fake_ejbca_serves_recorded_response_at_recorded_latency():
+    fake = FakeEJBCA(RecordedResponses([_record(0, "A", 200, [
+        _exchange("GET", "/ejbca/v1/certificate/CN=CA/A/revocationstatus", 200, 50, '{"revoked":true}')])]))
+    fake.start()
+    try:
+        base = f"http://127.0.0.1:{fake.port}/ejbca/v1/certificate/CN=CA"
+        started = time.perf_counter()
+        response = requests.get(base + "/A/revocationstatus")
+        elapsed = time.perf_counter() - started
+        missing = requests.get(base + "/B/revocationstatus")
+    finally:
+        fake.close()
+
+    assert response.status_code == 200
+    assert response.json() == {"revoked": True}
+    assert elapsed >= 0.05
+    assert missing.status_code == 404
+    assert (fake.hits, fake.misses) == (1, 1)
+
+
+def test_percentile_nearest_rank():
+    values = [float(value) for value in range(1, 101)]
+
+    assert percentile(values, 0.50) == 50.0
+    assert percentile(values, 0.99) == 99.0
+    assert percentile([7.0], 0.99) == 7.0
+    assert percentile([], 0.5) == 0.0
+
+
+def test_replay_drives_server_through_fake_ejbca():
+    """Capture replayed against a server whose EJBCA is the fake: statuses match the recording."""
+    revoked = {"A": "false", "B": "true"}
+    records = [_record(index * 0.01, serial, 200 if serial == "A" else 403, [
+        _exchange("GET", f"/ejbca/v1/certificate/CN=CA/{serial}/revocationstatus", 200, 2,
+                  '{"revoked":%s}' % revoked[serial])])
+               for index, serial in enumerate("ABAABAAB")]
+    fake = FakeEJBCA(RecordedResponses(records))
+    fake.start()
+    base_url = f"http://127.0.0.1:{fake.port}/ejbca"
+    app = FastAPI()
+
+    @app.get("/api/v1/certificate/{serial_id}/validate")
+    def validate(serial_id: str, username: str):
+        if requests.get(f"{base_url}/v1/certificate/CN=CA/{serial_id}/revocationstatus").json()["revoked"]:
+            return JSONResponse({}, status_code=403)
+        return {"allowed": True}
+
+    client = TestClient(app)
+    try:
+        report = replay(records, lambda url: client.get(url).status_code, concurrency=2, speed=1.0)
+    finally:
+        fake.close()
+
+    assert report.requests == 8
+    assert report.statuses == {200: 5, 403: 3}
+    assert report.mismatches == 0
+    assert fake.hits == 8
+    # Paced at the recorded 10ms gaps
+    assert report.duration_seconds >= 0.07
+    assert report.p50_ms >= 2
+    assert report.throughput > 0
+    assert "req/s" in report.format()
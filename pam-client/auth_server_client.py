@@ -1,88 +1,425 @@
 # auth_server_client.py
+"""
+Client for the auth server used by the PAM module and the validation agent.
+
+The PAM module is loaded on every login, so import time is part of each
+login's latency. Only the standard library is used here: http.client with a
+small pool of keep-alive connections and explicit timeouts.
+
+Several auth server replicas can be given. Requests go to the replica with the
+lowest latency EWMA, fail over immediately on connection errors and can
+optionally be hedged to a second replica after a short delay.
+"""
+import json
 import logging
-from typing import Optional
-import requests
-from requests.adapters import HTTPAdapter
-from urllib3.util.retry import Retry
-from fastapi import HTTPException, status
-from pydantic import BaseModel
-
-class AuthResponse(BaseModel):
+import queue
+import ssl
+import threading
+import time
+from http.client import (HTTPConnection, HTTPException, HTTPResponse,
+                         HTTPSConnection)
+from typing import List, Optional, Sequence, Tuple, Union
+from urllib.parse import quote, urlencode, urlsplit
+
+RETRY_STATUS_CODES = (502, 503, 504)
+
+
+class AuthServerError(Exception):
+    """Raised when the auth server cannot be reached or answers with an error."""
+
+    def __init__(self, status_code: int, detail: str):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+
+
+class AuthResponse:
     """
     A structured representation of the authentication response.
     """
-    allowed: bool
-    public_key: Optional[str] = None
+    __slots__ = ("allowed", "public_key", "authorized_keys_entry", "expires_at", "signature",
+                 "ssh_certificate", "session_ticket")
+
+    def __init__(self, allowed: bool, public_key: Optional[str] = None,
+                 authorized_keys_entry: Optional[str] = None,
+                 expires_at: Optional[int] = None, signature: Optional[str] = None,
+                 ssh_certificate: Optional[str] = None,
+                 session_ticket: Optional[str] = None):
+        self.allowed = allowed
+        self.public_key = public_key
+        self.authorized_keys_entry = authorized_keys_entry
+        self.expires_at = expires_at
+        self.signature = signature
+        self.ssh_certificate = ssh_certificate
+        self.session_ticket = session_ticket
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "AuthResponse":
+        if not isinstance(data, dict) or not isinstance(data.get("allowed"), bool):
+            raise ValueError("Invalid auth response: 'allowed' must be a boolean")
+        return cls(**{name: data.get(name) for name in cls.__slots__})
+
+    def to_dict(self) -> dict:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, AuthResponse) and self.to_dict() == other.to_dict()
+
+    def __repr__(self) -> str:
+        return "AuthResponse(allowed=%r, authorized_keys_entry=%r)" % (
+            self.allowed, self.authorized_keys_entry)
+
+
+class _Replica:
+    """One auth server replica: its keep-alive connection pool and latency estimate."""
+
+    def __init__(self, base_url: str, timeout: float, pool_maxsize: int, ssl_context_factory):
+        self.base_url = base_url.rstrip("/")
+        parts = urlsplit(self.base_url)
+        if parts.scheme not in ("http", "https") or not parts.hostname:
+            raise ValueError("Base URL must start with http(s):// and include a host")
+        self.host = parts.hostname
+        self.port = parts.port
+        self.path_prefix = parts.path
+        self.timeout = timeout
+        self.pool_maxsize = pool_maxsize
+        self.ssl_context = ssl_context_factory() if parts.scheme == "https" else None
+        # Exponentially weighted moving average of request latency, in seconds
+        self.ewma = None
+        self.failed_until = 0.0
+        self._idle = []
+        self._lock = threading.Lock()
+
+    def rank(self, now: float) -> Tuple[bool, float]:
+        # Replicas cooling down after a failure go last; the fastest one goes first
+        return (now < self.failed_until, self.ewma or 0.0)
+
+    def observe(self, latency: float, alpha: float):
+        with self._lock:
+            self.ewma = latency if self.ewma is None else alpha * latency + (1 - alpha) * self.ewma
+
+    def mark_failed(self, cooldown: float):
+        self.failed_until = time.monotonic() + cooldown
+
+    def request(self, method: str, path: str, logger: logging.Logger,
+                body: Optional[bytes] = None) -> Tuple[int, bytes]:
+        path = self.path_prefix + path
+        headers = {"Accept": "application/json"}
+        if body is not None:
+            headers["Content-Type"] = "application/json"
+        connection, reused = self._acquire()
+        try:
+            try:
+                connection.request(method, path, body=body, headers=headers)
+                response = connection.getresponse()
+            except (HTTPException, ConnectionError) as e:
+                if not reused:
+                    raise
+                # The server closed an idle keep-alive connection; retry once on a fresh one
+                logger.debug("Stale keep-alive connection, reconnecting: %s", e)
+                connection.close()
+                connection = self._new_connection()
+                connection.request(method, path, body=body, headers=headers)
+                response = connection.getresponse()
+            response_body = response.read()
+        except (OSError, HTTPException) as e:
+            connection.close()
+            logger.error("Error calling auth server endpoint %s%s: %s", self.base_url, path, e)
+            raise AuthServerError(500, f"Error connecting to auth server: {e}") from e
+        if response.will_close:
+            connection.close()
+        else:
+            self._release(connection)
+        return response.status, response_body
+
+    def open_stream(self, path: str, headers: dict,
+                    read_timeout: float) -> Tuple[HTTPConnection, HTTPResponse]:
+        """Opens a dedicated, unpooled connection for a long-lived streaming response."""
+        connection = self._new_connection()
+        try:
+            connection.request("GET", self.path_prefix + path, headers=headers)
+            # The stream sends heartbeats when idle; a longer silence means it is dead
+            connection.sock.settimeout(read_timeout)
+            response = connection.getresponse()
+        except (OSError, HTTPException) as e:
+            connection.close()
+            raise AuthServerError(500, f"Error connecting to auth server: {e}") from e
+        return connection, response
+
+    def close(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for connection in idle:
+            connection.close()
+
+    def _acquire(self) -> Tuple[HTTPConnection, bool]:
+        with self._lock:
+            if self._idle:
+                return self._idle.pop(), True
+        return self._new_connection(), False
+
+    def _release(self, connection: HTTPConnection):
+        with self._lock:
+            if len(self._idle) < self.pool_maxsize:
+                self._idle.append(connection)
+                return
+        connection.close()
+
+    def _new_connection(self) -> HTTPConnection:
+        if self.ssl_context is not None:
+            return HTTPSConnection(self.host, self.port, timeout=self.timeout,
+                                   context=self.ssl_context)
+        return HTTPConnection(self.host, self.port, timeout=self.timeout)
+
 
 class AuthServerClient:
-    def __init__(self, base_url: str, logger: logging.Logger):
+    def __init__(self, base_url: Union[str, Sequence[str]], logger: logging.Logger,
+                 timeout: float = 5.0,
+                 pool_maxsize: int = 10,
+                 verify: Union[bool, str] = True,
+                 cert: Optional[Tuple[str, str]] = None,
+                 retries: int = 2,
+                 hedge_delay: Optional[float] = None,
+                 ewma_alpha: float = 0.3,
+                 failure_cooldown: float = 5.0):
         """
-        Initialize the AuthServerClient with the provided base URL and logger.
-        
-        :param base_url: The base URL of the auth server (e.g., "https://authserver.example.com/api")
+        Initialize the AuthServerClient with the provided base URL(s) and logger.
+
+        :param base_url: The base URL of the auth server (e.g., "https://authserver.example.com/api"),
+            or a list of replica base URLs.
         :param logger: A logger instance to log messages.
+        :param timeout: Connect/read timeout in seconds for each call.
+        :param pool_maxsize: Number of idle keep-alive connections kept per replica.
+        :param verify: TLS verification flag or path to a CA bundle.
+        :param cert: Optional (certificate, key) pair for mutual TLS.
+        :param retries: Extra passes over the replicas when all answer 502/503/504.
+        :param hedge_delay: If set, seconds to wait for the preferred replica before
+            sending the same request to the next one; the first answer wins.
+        :param ewma_alpha: Weight of the newest sample in each replica's latency EWMA.
+        :param failure_cooldown: Seconds a replica is ranked last after a connection error.
         """
-        # Remove any trailing slash to ensure proper URL concatenation
-        self.base_url = base_url.rstrip("/")
+        base_urls = [base_url] if isinstance(base_url, str) else list(base_url)
+        if not base_urls:
+            raise ValueError("At least one auth server base URL is required")
         self.logger = logger
+        self.timeout = timeout
+        self.retries = retries
+        self.hedge_delay = hedge_delay
+        self.ewma_alpha = ewma_alpha
+        self.failure_cooldown = failure_cooldown
+        ssl_context_factory = lambda: _build_ssl_context(verify, cert)
+        self.replicas = [_Replica(url, timeout, pool_maxsize, ssl_context_factory)
+                         for url in base_urls]
+        self.base_url = self.replicas[0].base_url
+        self.logger.debug("AuthServerClient initialized with base_urls: %s",
+                          [replica.base_url for replica in self.replicas])
 
-        # Set up a requests session with retries
-        self.session = requests.Session()
-        retries = Retry(total=5, backoff_factor=0.1, status_forcelist=[502, 503, 504])
-        self.session.mount("https://", HTTPAdapter(max_retries=retries))
-        self.logger.debug("AuthServerClient initialized with base_url: %s", self.base_url)
-
-    def authenticate(self, serial_id: str) -> AuthResponse:
+    def authenticate(self, serial_id: str, username: Optional[str] = None) -> AuthResponse:
         """
         Call the auth server endpoint to validate a certificate by its serial_id.
-        
+
         :param serial_id: The certificate's serial identifier.
+        :param username: The target user on the bastion, checked against the certificate role.
         :return: An AuthResponse object representing the authentication result.
+        :raises AuthServerError: on connection errors, 5xx or unexpected responses.
         """
-        url = f"{self.base_url}/api/v1/certificate/{serial_id}/validate"
-        self.logger.debug("Calling auth server endpoint: %s", url)
-        try:
-            response = self.session.get(url)
-            self.logger.debug("Received response with status code: %s", response.status_code)
-        except requests.RequestException as e:
-            self.logger.exception("Error calling auth server endpoint for serial: %s", serial_id)
-            raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail=f"Error connecting to auth server: {str(e)}"
-            )
-        
-        if response.status_code == 200:
+        path = f"/api/v1/certificate/{quote(serial_id, safe='')}/validate"
+        if username is not None:
+            path += "?" + urlencode({"username": username})
+        self.logger.debug("Calling auth server endpoint: %s", path)
+        status_code, body = self._send("GET", path)
+        self.logger.debug("Received response with status code: %s", status_code)
+
+        if status_code == 200:
             self.logger.info("Certificate %s validated successfully.", serial_id)
-            data = response.json()
-            return AuthResponse(**data)
-        elif response.status_code in (400, 403):
-            self.logger.error("Certificate %s validation failed with status code: %s", serial_id, response.status_code)
-            data = response.json() if response.content else {"allowed": False, "public_key": None}
-            return AuthResponse(**data)
-        elif response.status_code == 500:
+            try:
+                return AuthResponse.from_dict(json.loads(body))
+            except ValueError as e:
+                raise AuthServerError(502, f"Invalid response from auth server: {e}") from e
+        elif status_code in (400, 403):
+            self.logger.error("Certificate %s validation failed with status code: %s", serial_id, status_code)
+            # The error body only carries a "detail" field, so the decision is built here
+            return AuthResponse(allowed=False)
+        elif status_code == 500:
             self.logger.error("Internal server error from auth server for certificate %s", serial_id)
-            raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail="Internal server error in auth server."
-            )
+            raise AuthServerError(500, "Internal server error in auth server.")
         else:
-            self.logger.error("Unexpected response code %s from auth server for certificate %s", response.status_code, serial_id)
-            raise HTTPException(
-                status_code=response.status_code,
-                detail="Unexpected response from auth server."
-            )
+            self.logger.error("Unexpected response code %s from auth server for certificate %s", status_code, serial_id)
+            raise AuthServerError(status_code, "Unexpected response from auth server.")
+
+    def verify_ticket(self, serial_id: str, username: str, fingerprint: str, ticket: str) -> bool:
+        """
+        Asks the auth server to accept a repeat login from a session ticket, which
+        costs it one signature check instead of an EJBCA lookup.
+
+        :return: True if the ticket is valid; False if the login must be validated again.
+        :raises AuthServerError: on connection errors or 5xx.
+        """
+        path = f"/api/v1/certificate/{quote(serial_id, safe='')}/ticket/verify"
+        body = json.dumps({"username": username, "fingerprint": fingerprint,
+                           "ticket": ticket}).encode("utf-8")
+        status_code, _ = self._send("POST", path, body)
+        if status_code == 200:
+            return True
+        if status_code in (401, 503):
+            # 503: tickets are not enabled on this replica
+            self.logger.info("Session ticket for certificate %s not accepted (%s)",
+                             serial_id, status_code)
+            return False
+        raise AuthServerError(status_code, "Unexpected response from auth server.")
+
+    def open_event_stream(self, last_event_id: Optional[str] = None,
+                          read_timeout: float = 45.0,
+                          token: Optional[str] = None) -> Tuple[HTTPConnection, HTTPResponse]:
+        """
+        Opens the server-sent event stream of revocation and policy events on the
+        best replica. The caller reads the response and closes the connection.
+
+        :param token: Bearer token of the server's event_stream section.
+        :raises AuthServerError: when no replica accepts the stream.
+        """
+        headers = {"Accept": "text/event-stream"}
+        if last_event_id is not None:
+            headers["Last-Event-ID"] = last_event_id
+        if token is not None:
+            headers["Authorization"] = f"Bearer {token}"
+        last_error = None
+        for replica in self._ordered_replicas():
+            try:
+                connection, response = replica.open_stream(
+                    "/api/v1/revocation/stream", headers, read_timeout)
+            except AuthServerError as e:
+                replica.mark_failed(self.failure_cooldown)
+                last_error = e
+                continue
+            if response.status == 200:
+                return connection, response
+            connection.close()
+            last_error = AuthServerError(response.status, "Event stream rejected by auth server.")
+        raise last_error
+
+    def close(self):
+        for replica in self.replicas:
+            replica.close()
+
+    def _send(self, method: str, path: str, body: Optional[bytes] = None) -> Tuple[int, bytes]:
+        attempt = 0
+        while True:
+            if self.hedge_delay is not None and len(self.replicas) > 1:
+                status_code, response_body = self._send_hedged(method, path, body)
+            else:
+                status_code, response_body = self._send_with_failover(method, path, body)
+            if status_code not in RETRY_STATUS_CODES or attempt >= self.retries:
+                return status_code, response_body
+            attempt += 1
+            time.sleep(0.05 * attempt)
+
+    def _ordered_replicas(self) -> List[_Replica]:
+        now = time.monotonic()
+        return sorted(self.replicas, key=lambda replica: replica.rank(now))
+
+    def _attempt(self, replica: _Replica, method: str, path: str,
+                 body: Optional[bytes]) -> Tuple[int, bytes]:
+        start = time.monotonic()
+        try:
+            status_code, response_body = replica.request(method, path, self.logger, body)
+        except AuthServerError:
+            replica.mark_failed(self.failure_cooldown)
+            raise
+        replica.observe(time.monotonic() - start, self.ewma_alpha)
+        if status_code in RETRY_STATUS_CODES:
+            replica.mark_failed(self.failure_cooldown)
+        return status_code, response_body
+
+    def _send_with_failover(self, method: str, path: str,
+                            body: Optional[bytes]) -> Tuple[int, bytes]:
+        """Tries replicas fastest first, moving on immediately on errors and 502/503/504."""
+        outcome = None
+        last_error = None
+        for replica in self._ordered_replicas():
+            try:
+                outcome = self._attempt(replica, method, path, body)
+            except AuthServerError as e:
+                last_error = e
+                continue
+            if outcome[0] not in RETRY_STATUS_CODES:
+                return outcome
+        if outcome is not None:
+            return outcome
+        raise last_error
+
+    def _send_hedged(self, method: str, path: str, body: Optional[bytes]) -> Tuple[int, bytes]:
+        """
+        Sends the request to the preferred replica and, if it has not answered
+        after hedge_delay, to the next one too. At most two requests are in
+        flight; errors fail over to the next replica at once.
+        """
+        replicas = self._ordered_replicas()
+        results = queue.Queue()
+        launched = 0
+
+        def run(replica):
+            try:
+                results.put(self._attempt(replica, method, path, body))
+            except AuthServerError as e:
+                results.put(e)
+
+        def launch():
+            nonlocal launched
+            threading.Thread(target=run, args=(replicas[launched],), daemon=True).start()
+            launched += 1
+
+        launch()
+        in_flight = 1
+        fallback = None
+        last_error = None
+        while in_flight:
+            can_hedge = in_flight < 2 and launched < len(replicas)
+            try:
+                outcome = results.get(timeout=self.hedge_delay if can_hedge else None)
+            except queue.Empty:
+                self.logger.debug("Hedging request to %s", replicas[launched].base_url)
+                launch()
+                in_flight += 1
+                continue
+            in_flight -= 1
+            if isinstance(outcome, AuthServerError):
+                last_error = outcome
+            elif outcome[0] in RETRY_STATUS_CODES:
+                fallback = outcome
+            else:
+                return outcome
+            if launched < len(replicas):
+                launch()
+                in_flight += 1
+        if fallback is not None:
+            return fallback
+        raise last_error
+
+
+def _build_ssl_context(verify: Union[bool, str], cert: Optional[Tuple[str, str]]):
+    if verify is False:
+        context = ssl._create_unverified_context()  # pylint: disable=protected-access
+    elif isinstance(verify, str):
+        context = ssl.create_default_context(cafile=verify)
+    else:
+        context = ssl.create_default_context()
+    if cert:
+        context.load_cert_chain(cert[0], cert[1])
+    return context
+
 
 # Example usage (for testing purposes)
 if __name__ == "__main__":
     logging.basicConfig(level=logging.DEBUG)
     test_logger = logging.getLogger("AuthServerClientTest")
-    
+
     # Instantiate the client with a sample base URL
     client = AuthServerClient(base_url="http://localhost:8888/", logger=test_logger)
-    
+
     # Example call to the authenticate method
     try:
-        auth_result = client.authenticate("1eb97febf0e01bb7f1891cbd837087af3064740b")
+        auth_result = client.authenticate("1eb97febf0e01bb7f1891cbd837087af3064740b", "admin")
         test_logger.info("Authentication result: %s", auth_result)
-    except HTTPException as exc:
+    except AuthServerError as exc:
         test_logger.error("Authentication failed: %s", exc.detail)
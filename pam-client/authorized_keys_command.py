@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+# authorized_keys_command.py
+"""
+sshd AuthorizedKeysCommand backed by the validation agent.
+
+sshd runs this for every public key offered during login and reads
+authorized_keys lines from stdout. The entries come from the agent's
+in-memory cache, filled when the PAM module validated the certificate, so
+~/.ssh/authorized_keys is never written. Only the standard library is used to
+keep start-up cheap.
+
+sshd_config:
+
+    AuthenticationMethods keyboard-interactive,publickey
+    AuthorizedKeysCommand /usr/bin/python3 /opt/rbac/pam-client/authorized_keys_command.py %u %f
+    AuthorizedKeysCommandUser rbac-agent
+"""
+import json
+import socket
+import sys
+
+AGENT_SOCKET_PATH = "/run/rbac-agent/agent.sock"
+AGENT_TIMEOUT_SECONDS = 2.0
+
+
+def fetch_entries(username, fingerprint=None, socket_path=None):
+    """Asks the agent for the cached entries of a user; returns [] when it is unavailable."""
+    socket_path = socket_path or AGENT_SOCKET_PATH
+    request = {"op": "keys", "username": username}
+    if fingerprint:
+        request["fingerprint"] = fingerprint
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(AGENT_TIMEOUT_SECONDS)
+        try:
+            sock.connect(socket_path)
+            sock.sendall(json.dumps(request).encode("utf-8") + b"\n")
+            line = sock.makefile("rb").readline()
+        except OSError:
+            return []
+    try:
+        entries = json.loads(line).get("entries", [])
+    except (ValueError, AttributeError):
+        return []
+    return [entry for entry in entries if isinstance(entry, str) and "\n" not in entry]
+
+
+def main(argv):
+    if len(argv) < 2:
+        sys.stderr.write("usage: authorized_keys_command.py <user> [<fingerprint>]\n")
+        return 1
+    username = argv[1]
+    fingerprint = argv[2] if len(argv) > 2 else None
+    for entry in fetch_entries(username, fingerprint):
+        sys.stdout.write(entry + "\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
@@ -0,0 +1,105 @@
+# event_stream.py
+"""
+Subscriber to the auth server's revocation event stream.
+
+The agent keeps one server-sent events connection open to the auth server.
+"revocation" events drop the cached decisions, authorized_keys entries and
+grace decisions of a serial; "policy" events carry the version of the access
+policy and clear the decision cache when it changes. On reconnect the last
+event id is sent back, so events missed while disconnected are replayed.
+
+Event ids belong to one replica's feed. When the server does not recognize
+the id (another replica, a replaced log) it sends "resync" first, and the
+agent drops everything cached, since it cannot know which events it missed.
+A server that rejects the id outright (400) is treated the same way.
+"""
+import json
+import logging
+import threading
+from typing import Iterable, Iterator, Optional, Tuple
+
+from auth_server_client import AuthServerClient, AuthServerError
+
+
+def parse_events(lines: Iterable[bytes]) -> Iterator[Tuple[str, Optional[dict], Optional[str]]]:
+    """Yields (event_type, data, event_id) for each event of a text/event-stream body."""
+    event_type, data_lines, event_id = "message", [], None
+    for raw_line in lines:
+        line = raw_line.decode("utf-8").rstrip("\r\n")
+        if not line:
+            if data_lines:
+                try:
+                    data = json.loads("\n".join(data_lines))
+                except ValueError:
+                    data = None
+                yield event_type, data, event_id
+            event_type, data_lines = "message", []
+            continue
+        if line.startswith(":"):
+            continue
+        field, _, value = line.partition(":")
+        value = value[1:] if value.startswith(" ") else value
+        if field == "event":
+            event_type = value
+        elif field == "data":
+            data_lines.append(value)
+        elif field == "id":
+            event_id = value
+
+
+class EventStreamSubscriber(threading.Thread):
+    """Keeps the event stream open and applies its events to a ValidationAgent."""
+
+    def __init__(self, client: AuthServerClient, agent,
+                 logger: logging.Logger = logging.getLogger(__name__),
+                 read_timeout: float = 45.0,
+                 max_backoff: float = 30.0,
+                 token: Optional[str] = None):
+        super().__init__(name="event-stream", daemon=True)
+        self.client = client
+        self.agent = agent
+        self.logger = logger
+        self.read_timeout = read_timeout
+        self.max_backoff = max_backoff
+        self.token = token
+        self.last_event_id: Optional[str] = None
+        self._stop_event = threading.Event()
+
+    def run(self):
+        backoff = 1.0
+        while not self._stop_event.is_set():
+            try:
+                self.consume_once()
+                backoff = 1.0
+            except (AuthServerError, OSError, ValueError) as e:
+                self.logger.warning("Event stream interrupted: %s", e)
+            self._stop_event.wait(backoff)
+            backoff = min(backoff * 2, self.max_backoff)
+
+    def consume_once(self):
+        """Reads one stream connection until the server or a read timeout ends it."""
+        try:
+            connection, response = self.client.open_event_stream(self.last_event_id,
+                                                                 self.read_timeout, self.token)
+        except AuthServerError as e:
+            if e.status_code != 400 or self.last_event_id is None:
+                raise
+            self.logger.warning("Event id %s rejected by auth server, resyncing",
+                                self.last_event_id)
+            self.last_event_id = None
+            self.agent.apply_event("resync", {})
+            raise
+        self.logger.info("Subscribed to auth server event stream")
+        try:
+            for event_type, data, event_id in parse_events(response):
+                if self._stop_event.is_set():
+                    return
+                if data is not None:
+                    self.agent.apply_event(event_type, data)
+                if event_id is not None:
+                    self.last_event_id = event_id
+        finally:
+            connection.close()
+
+    def stop(self):
+        self._stop_event.set()
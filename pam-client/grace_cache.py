@@ -0,0 +1,132 @@
+# grace_cache.py
+"""
+On-disk cache of signed positive decisions.
+
+The auth server signs allowed decisions with HMAC-SHA256 and an expiry
+(see auth-server/app/application/decision_signer.py). When the auth server is
+unreachable or too slow, the agent honours a cached decision whose signature
+verifies locally, for no longer than its signed expiry and the configured
+grace window.
+"""
+import hashlib
+import hmac
+import json
+import os
+import tempfile
+import time
+from typing import Callable, Optional
+
+
+def canonical_decision(serial_id: str, username: str, allowed: bool,
+                       authorized_keys_entry: Optional[str], expires_at: int) -> bytes:
+    """Must match canonical_decision() on the auth server."""
+    return json.dumps(
+        [serial_id.upper(), username, allowed, authorized_keys_entry, expires_at],
+        separators=(",", ":"),
+    ).encode("utf-8")
+
+
+def verify_decision(secret: bytes, serial_id: str, username: str, decision: dict) -> bool:
+    if not isinstance(decision, dict):
+        return False
+    signature = decision.get("signature")
+    expires_at = decision.get("expires_at")
+    if not isinstance(signature, str) or not signature or not isinstance(expires_at, int):
+        return False
+    payload = canonical_decision(serial_id, username, bool(decision.get("allowed")),
+                                 decision.get("authorized_keys_entry"), expires_at)
+    expected = hmac.new(secret, payload, hashlib.sha256).hexdigest()
+    return hmac.compare_digest(expected, signature)
+
+
+class GraceCache:
+    """Stores one signed decision per (serial_id, username) in a private directory."""
+
+    def __init__(self, directory: str, secret: bytes, max_grace_seconds: int,
+                 clock: Callable[[], float] = time.time):
+        if not secret:
+            raise ValueError("Grace cache secret must not be empty")
+        self.directory = directory
+        self.secret = secret
+        self.max_grace_seconds = max_grace_seconds
+        self._clock = clock
+        os.makedirs(directory, mode=0o700, exist_ok=True)
+
+    @classmethod
+    def from_config(cls, config: dict) -> "GraceCache":
+        with open(config["secret_path"], "rb") as file:
+            secret = file.read().strip()
+        return cls(config["directory"], secret, config.get("max_grace_seconds", 3600))
+
+    def store(self, serial_id: str, username: str, decision: dict) -> bool:
+        """Persists a signed positive decision; unsigned or invalid ones are ignored."""
+        if not decision.get("allowed") or not verify_decision(
+                self.secret, serial_id, username, decision):
+            return False
+        record = {"stored_at": int(self._clock()), "serial_id": serial_id.upper(),
+                  "decision": decision}
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory)
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as file:
+                json.dump(record, file)
+            # Atomic rename so concurrent readers never see a partial file
+            os.replace(tmp_path, self._path(serial_id, username))
+        except OSError:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            return False
+        return True
+
+    def lookup(self, serial_id: str, username: str) -> Optional[dict]:
+        """Returns the cached decision if its signature and grace window are still valid."""
+        path = self._path(serial_id, username)
+        try:
+            with open(path, "r", encoding="utf-8") as file:
+                record = json.load(file)
+            decision = record["decision"]
+            stored_at = record["stored_at"]
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+        # Verified first: only a signed decision has a well-formed expires_at to compare
+        if not isinstance(stored_at, (int, float)) or not verify_decision(
+                self.secret, serial_id, username, decision):
+            self.discard(serial_id, username)
+            return None
+        now = self._clock()
+        if now >= decision["expires_at"] or now >= stored_at + self.max_grace_seconds:
+            self.discard(serial_id, username)
+            return None
+        return decision
+
+    def discard(self, serial_id: str, username: str):
+        try:
+            os.unlink(self._path(serial_id, username))
+        except FileNotFoundError:
+            pass
+
+    def discard_serial(self, serial_id: str):
+        """Drops the decisions of every user for a serial, e.g. after a revocation event."""
+        serial_id = serial_id.upper().lstrip("0")
+        for name in os.listdir(self.directory):
+            if not name.endswith(".json"):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                with open(path, "r", encoding="utf-8") as file:
+                    stored_serial = json.load(file).get("serial_id", "")
+                if stored_serial.lstrip("0") == serial_id:
+                    os.unlink(path)
+            except (OSError, ValueError, AttributeError):
+                continue
+
+    def clear(self):
+        for name in os.listdir(self.directory):
+            if name.endswith(".json"):
+                try:
+                    os.unlink(os.path.join(self.directory, name))
+                except FileNotFoundError:
+                    pass
+
+    def _path(self, serial_id: str, username: str) -> str:
+        key = hashlib.sha256(f"{serial_id.upper()}|{username}".encode("utf-8")).hexdigest()
+        return os.path.join(self.directory, key + ".json")
@@ -1,35 +1,106 @@
-#!/usr/bin/env python2
+#!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 import json
-import urllib2
+import logging
+import os
+import socket
+import sys
+
+# pam_python no agrega el directorio del módulo al path; se necesita para auth_server_client
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+AUTH_SERVER_URL = "http://localhost:8888"  # ajustar según sea necesario
+AUTH_SERVER_TIMEOUT_SECONDS = 3.0
+
+# Socket del agente de validación local (validation_agent.py)
+AGENT_SOCKET_PATH = "/run/rbac-agent/agent.sock"
+AGENT_TIMEOUT_SECONDS = 3.0
+
+# authorized_keys_mode en config.<ENV>.yaml:
+# "file": escribe ~/.ssh/authorized_keys en cada login (comportamiento original).
+# "command": no toca el archivo; sshd obtiene la entrada del agente mediante
+# AuthorizedKeysCommand (authorized_keys_command.py).
+AUTHORIZED_KEYS_MODES = ("file", "command")
+DEFAULT_AUTHORIZED_KEYS_MODE = "file"
+_authorized_keys_mode = None
+
+
+# Lee config.<ENV>.yaml; ante cualquier error devuelve {} (se llama fuera de todo try).
+def _read_config():
+    try:
+        import yaml
+        from load_config import load_config
+    except ImportError as e:
+        print("No se pudo leer la configuración: %s" % str(e))
+        return {}
+    try:
+        config = load_config(os.path.dirname(os.path.abspath(__file__)))
+    except (ValueError, OSError, yaml.YAMLError) as e:
+        print("No se pudo leer la configuración: %s" % str(e))
+        return {}
+    if not isinstance(config, dict):
+        if config is not None:
+            print("La configuración no es un mapa: %r" % (config,))
+        return {}
+    return config
+
+
+# Se lee una sola vez; sin configuración legible se mantiene el modo "file".
+def get_authorized_keys_mode():
+    global _authorized_keys_mode
+    if _authorized_keys_mode is None:
+        mode = _read_config().get("authorized_keys_mode", DEFAULT_AUTHORIZED_KEYS_MODE)
+        if mode not in AUTHORIZED_KEYS_MODES:
+            print("authorized_keys_mode desconocido: %s" % mode)
+            mode = DEFAULT_AUTHORIZED_KEYS_MODE
+        _authorized_keys_mode = mode
+    return _authorized_keys_mode
+
+
+# Consulta al agente local; devuelve None si el agente no está disponible.
+def authenticate_via_agent(serial_id, username):
+    request = json.dumps({"op": "validate", "serial_id": serial_id, "username": username})
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(AGENT_TIMEOUT_SECONDS)
+        try:
+            sock.connect(AGENT_SOCKET_PATH)
+            sock.sendall(request.encode("utf-8") + b"\n")
+            line = sock.makefile("rb").readline()
+        except OSError as e:
+            print("Agente de validación no disponible: %s" % str(e))
+            return None
+    try:
+        return json.loads(line.decode("utf-8"))
+    except ValueError:
+        return None
+
+
+# Cliente directo al servidor de autenticación, usado si el agente no responde.
+# Se crea de forma perezosa para no pagar su costo cuando el agente contesta.
+_auth_client = None
+
+
+def _get_auth_client():
+    global _auth_client
+    if _auth_client is None:
+        from auth_server_client import AuthServerClient
+        _auth_client = AuthServerClient(
+            base_url=AUTH_SERVER_URL, logger=logging.getLogger(__name__),
+            timeout=AUTH_SERVER_TIMEOUT_SECONDS,
+        )
+    return _auth_client
 
 
 # Función simple para llamar al endpoint del servidor de autenticación.
 def authenticate(serial_id, username):
-    base_url = "http://localhost:8888"  # ajustar según sea necesario
-    url = base_url + "/api/v1/certificate/" + serial_id + "/validate?username=" + username
+    from auth_server_client import AuthServerError
     try:
-        response = urllib2.urlopen(url)
-        code = response.getcode()
-        content = response.read()
-    except urllib2.URLError as e:
+        response = _get_auth_client().authenticate(serial_id, username)
+    except AuthServerError as e:
         print("Error llamando al endpoint para serial: %s" % serial_id)
-        print(str(e))
-        return {"allowed": False, "authorized_keys_entry": None}
-
-    if code == 200:
-        return json.loads(content)
-    elif code in (400, 403):
-        try:
-            return json.loads(content)
-        except Exception:
-            return {"allowed": False, "authorized_keys_entry": None}
-    elif code == 500:
-        print("Error interno en el servidor de autenticación para el certificado %s" % serial_id)
-        return {"allowed": False, "authorized_keys_entry": None}
-    else:
-        print("Código de respuesta inesperado %s para el certificado %s" % (code, serial_id))
+        print(e.detail)
         return {"allowed": False, "authorized_keys_entry": None}
+    return response.to_dict()
 
 
 # Funciones relacionadas con PAM
@@ -43,11 +114,13 @@ def pam_sm_authenticate(pamh, flags, argv):
             print("Usuario es None")
             return pamh.PAM_USER_UNKNOWN
 
-        # Abrir el archivo authorized_keys
-        f = open("/home/" + user + "/.ssh/authorized_keys", "w+")
-        if f is None:
-            print("No se pudo abrir el archivo authorized_keys")
-            return pamh.PAM_USER_UNKNOWN
+        f = None
+        if get_authorized_keys_mode() != "command":
+            # Abrir el archivo authorized_keys
+            f = open("/home/" + user + "/.ssh/authorized_keys", "w+")
+            if f is None:
+                print("No se pudo abrir el archivo authorized_keys")
+                return pamh.PAM_USER_UNKNOWN
 
         msg = pamh.Message(
             pamh.PAM_PROMPT_ECHO_ON, "Ingrese el serial_id de su certificado: "
@@ -63,8 +136,10 @@ def pam_sm_authenticate(pamh, flags, argv):
             )
         )
 
-        # Llamar al servidor de autenticación
-        auth_response = authenticate(serial_id, user)
+        # Llamar al agente local y, si no responde, al servidor de autenticación
+        auth_response = authenticate_via_agent(serial_id, user)
+        if auth_response is None:
+            auth_response = authenticate(serial_id, user)
         if not auth_response.get("allowed"):
             print("El certificado %s no está autorizado." % serial_id)
             return pamh.PAM_AUTH_ERR
@@ -76,15 +151,34 @@ def pam_sm_authenticate(pamh, flags, argv):
             return pamh.PAM_AUTH_ERR
 
 
-        pamh.conversation(
-            pamh.Message(
-                pamh.PAM_TEXT_INFO,
-                "¡Certificado encontrado! Clave autorizada añadida a authorized_keys.",
+        if f is None:
+            # El agente ya registró la entrada; sshd la consulta con AuthorizedKeysCommand
+            pamh.conversation(
+                pamh.Message(pamh.PAM_TEXT_INFO, "¡Certificado encontrado!")
+            )
+        else:
+            pamh.conversation(
+                pamh.Message(
+                    pamh.PAM_TEXT_INFO,
+                    "¡Certificado encontrado! Clave autorizada añadida a authorized_keys.",
+                )
+            )
+            f.write(authorized_keys_entry + "\n")
+            f.close()
+
+        # Con ssh_certificates en el servidor llega también un certificado de usuario OpenSSH
+        # para los hosts destino (TrustedUserCAKeys). La clave privada está en el cliente, así
+        # que se le muestra al usuario para que lo guarde como <clave>-cert.pub. Una decisión
+        # cacheada por el agente puede traer un certificado ya vencido: sshd lo rechaza solo.
+        ssh_certificate = auth_response.get("ssh_certificate")
+        if ssh_certificate:
+            pamh.conversation(
+                pamh.Message(
+                    pamh.PAM_TEXT_INFO,
+                    "Certificado SSH para los hosts destino (guardar como <clave>-cert.pub):\n"
+                    + ssh_certificate,
+                )
             )
-        )
-
-        f.write(authorized_keys_entry + "\n")
-        f.close()
 
         # Para testeo se escribe información en /tmp/enviroment_test
         f2 = open("/tmp/enviroment_test", "w")
@@ -117,6 +211,10 @@ def pam_sm_close_session(pamh, flags, argv):
         print("Usuario es None")
         return pamh.PAM_USER_UNKNOWN
 
+    if get_authorized_keys_mode() == "command":
+        # Las entradas del agente expiran solas; otras sesiones del usuario siguen vigentes
+        return pamh.PAM_SUCCESS
+
     # Abrir el archivo authorized_keys
     f = open("/home/" + user + "/.ssh/authorized_keys", "w+")
     f.write("")
@@ -133,5 +231,5 @@ def pam_sm_chauthtok(pamh, flags, argv):
 
 if __name__ == "__main__":
     # Prueba simple de la llamada al servidor de autenticación
-    result = authenticate("1eb97febf0e01bb7f1891cbd837087af3064740b")
+    result = authenticate("1eb97febf0e01bb7f1891cbd837087af3064740b", "admin")
     print("Resultado de autenticación: %s" % result)
@@ -0,0 +1,225 @@
+import json
+import logging
+import os
+import subprocess
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from auth_server_client import AuthResponse, AuthServerClient, AuthServerError
+
+# Cold import of auth_server_client plus one validate call, measured in a fresh interpreter
+COLD_START_BUDGET_MS = 150
+HEAVY_MODULES = ("fastapi", "pydantic", "requests", "urllib3", "yaml")
+
+
+class StubAuthServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), StubHandler)
+        self.status_code = 200
+        self.body = {"allowed": True, "authorized_keys_entry": "ssh-rsa AAAA test"}
+        self.paths = []
+        self.request_bodies = []
+        self.client_ports = set()
+        self.delay = 0.0
+
+    @property
+    def base_url(self):
+        return "http://127.0.0.1:%d" % self.server_address[1]
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):  # pylint: disable=invalid-name
+        time.sleep(self.server.delay)
+        self.server.paths.append(self.path)
+        self.server.client_ports.add(self.client_address[1])
+        payload = json.dumps(self.server.body).encode()
+        self.send_response(self.server.status_code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_POST(self):  # pylint: disable=invalid-name
+        length = int(self.headers.get("Content-Length", 0))
+        self.server.request_bodies.append(json.loads(self.rfile.read(length)))
+        self.do_GET()
+
+    def log_message(self, *args):  # pylint: disable=arguments-differ
+        pass
+
+
+@pytest.fixture
+def stub_server():
+    server = StubAuthServer()
+    threading.Thread(target=server.serve_forever, args=(0.05,), daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def second_server():
+    server = StubAuthServer()
+    threading.Thread(target=server.serve_forever, args=(0.05,), daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def client(stub_server):
+    client = AuthServerClient(stub_server.base_url, logging.getLogger(__name__), timeout=2)
+    yield client
+    client.close()
+
+
+def test_authenticate_allowed(client, stub_server):
+    response = client.authenticate("1EB97F", "admin")
+
+    assert response == AuthResponse(allowed=True, authorized_keys_entry="ssh-rsa AAAA test")
+    assert stub_server.paths == ["/api/v1/certificate/1EB97F/validate?username=admin"]
+
+
+def test_authenticate_reuses_keep_alive_connection(client, stub_server):
+    for _ in range(5):
+        client.authenticate("1EB97F", "admin")
+
+    assert len(stub_server.paths) == 5
+    assert len(stub_server.client_ports) == 1
+
+
+def test_verify_ticket_posts_the_ticket(client, stub_server):
+    stub_server.body = {"allowed": True}
+
+    assert client.verify_ticket("1EB97F", "admin", "SHA256:abc", "payload.mac") is True
+    assert stub_server.paths == ["/api/v1/certificate/1EB97F/ticket/verify"]
+    assert stub_server.request_bodies == [
+        {"username": "admin", "fingerprint": "SHA256:abc", "ticket": "payload.mac"}]
+
+
+def test_verify_ticket_rejected_means_validate_again(client, stub_server):
+    stub_server.status_code = 401
+    stub_server.body = {"detail": "Ticket inválido o vencido; validar de nuevo."}
+
+    assert client.verify_ticket("1EB97F", "admin", "SHA256:abc", "payload.mac") is False
+
+
+def test_authenticate_forbidden_is_a_denial(client, stub_server):
+    stub_server.status_code = 403
+    stub_server.body = {"detail": "El certificado está revocado."}
+
+    response = client.authenticate("1EB97F", "admin")
+
+    assert response.allowed is False
+
+
+def test_authenticate_server_error_raises(client, stub_server):
+    stub_server.status_code = 500
+
+    with pytest.raises(AuthServerError) as exc_info:
+        client.authenticate("1EB97F", "admin")
+
+    assert exc_info.value.status_code == 500
+
+
+def test_authenticate_connection_error_raises():
+    client = AuthServerClient("http://127.0.0.1:1", logging.getLogger(__name__), timeout=1)
+
+    with pytest.raises(AuthServerError):
+        client.authenticate("1EB97F", "admin")
+
+
+def test_failover_to_next_replica_on_connection_error(stub_server):
+    client = AuthServerClient(["http://127.0.0.1:1", stub_server.base_url],
+                              logging.getLogger(__name__), timeout=1)
+
+    assert client.authenticate("1EB97F", "admin").allowed is True
+    # The failed replica is ranked last on the next call
+    client.authenticate("1EB97F", "admin")
+    assert len(stub_server.paths) == 2
+    assert client.replicas[0].failed_until > 0
+
+
+def test_failover_on_unavailable_status(stub_server, second_server):
+    stub_server.status_code = 503
+    client = AuthServerClient([stub_server.base_url, second_server.base_url],
+                              logging.getLogger(__name__), timeout=1, retries=0)
+
+    assert client.authenticate("1EB97F", "admin").allowed is True
+    assert len(second_server.paths) == 1
+
+
+def test_prefers_replica_with_lowest_latency_ewma(stub_server, second_server):
+    client = AuthServerClient([stub_server.base_url, second_server.base_url],
+                              logging.getLogger(__name__), timeout=2)
+    client.replicas[0].ewma = 0.5
+    client.replicas[1].ewma = 0.01
+
+    client.authenticate("1EB97F", "admin")
+
+    assert len(second_server.paths) == 1
+    assert stub_server.paths == []
+
+
+def test_ewma_tracks_observed_latency(client, stub_server):
+    stub_server.delay = 0.05
+    client.authenticate("1EB97F", "admin")
+    first = client.replicas[0].ewma
+    stub_server.delay = 0.0
+    client.authenticate("1EB97F", "admin")
+
+    assert first >= 0.05
+    assert client.replicas[0].ewma < first
+
+
+def test_hedged_request_answers_from_second_replica(stub_server, second_server):
+    stub_server.delay = 1.0
+    client = AuthServerClient([stub_server.base_url, second_server.base_url],
+                              logging.getLogger(__name__), timeout=2, hedge_delay=0.05)
+
+    start = time.monotonic()
+    response = client.authenticate("1EB97F", "admin")
+
+    assert response.allowed is True
+    assert time.monotonic() - start < 0.5
+    assert len(second_server.paths) == 1
+
+
+def test_all_replicas_down_raises():
+    client = AuthServerClient(["http://127.0.0.1:1", "http://127.0.0.1:2"],
+                              logging.getLogger(__name__), timeout=1, hedge_delay=0.01)
+
+    with pytest.raises(AuthServerError):
+        client.authenticate("1EB97F", "admin")
+
+
+def test_cold_import_and_first_call_within_budget(stub_server):
+    """Benchmark: a fresh interpreter imports the client and validates once within budget."""
+    script = (
+        "import sys, time\n"
+        "start = time.perf_counter()\n"
+        "import logging\n"
+        "from auth_server_client import AuthServerClient\n"
+        "client = AuthServerClient(sys.argv[1], logging.getLogger('bench'), timeout=2)\n"
+        "assert client.authenticate('1EB97F', 'admin').allowed\n"
+        "elapsed_ms = (time.perf_counter() - start) * 1000\n"
+        "heavy = [m for m in %r if m in sys.modules]\n"
+        "print(elapsed_ms, ','.join(heavy))\n" % (HEAVY_MODULES,)
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", script, stub_server.base_url],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        capture_output=True, text=True, check=True, timeout=30,
+    )
+    elapsed_ms, _, heavy = result.stdout.strip().partition(" ")
+
+    assert heavy == "", f"heavy modules imported on the hot path: {heavy}"
+    assert float(elapsed_ms) < COLD_START_BUDGET_MS
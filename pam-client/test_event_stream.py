@@ -0,0 +1,145 @@
+import logging
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import MagicMock
+
+import pytest
+
+from auth_server_client import AuthServerClient, AuthServerError
+from event_stream import EventStreamSubscriber, parse_events
+from validation_agent import AuthorizedKeysCache, DecisionCache, ValidationAgent
+
+STREAM = (
+    b"retry: 3000\n"
+    b'id: 10\nevent: policy\ndata: {"version":"v1"}\n\n'
+    b": keepalive\n\n"
+    b'id: 42\nevent: revocation\ndata: {"issuer_dn":"CN=PSI-CA","revoked":true,"serial_id":"1EB97F"}\n\n'
+)
+
+
+class StubStreamServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), StubStreamHandler)
+        self.last_event_ids = []
+        self.authorizations = []
+        self.status = 200
+
+    @property
+    def base_url(self):
+        return "http://127.0.0.1:%d" % self.server_address[1]
+
+
+class StubStreamHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):  # pylint: disable=invalid-name
+        self.server.last_event_ids.append(self.headers.get("Last-Event-ID"))
+        self.server.authorizations.append(self.headers.get("Authorization"))
+        if self.server.status != 200:
+            self.send_response(self.server.status)
+            self.send_header("Content-Length", "0")
+            self.send_header("Connection", "close")
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.wfile.write(STREAM)
+
+    def log_message(self, *args):  # pylint: disable=arguments-differ
+        pass
+
+
+@pytest.fixture
+def stream_server():
+    server = StubStreamServer()
+    threading.Thread(target=server.serve_forever, args=(0.05,), daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_parse_events_skips_comments_and_keeps_ids():
+    events = list(parse_events(STREAM.splitlines(keepends=True)))
+
+    assert events == [
+        ("policy", {"version": "v1"}, "10"),
+        ("revocation", {"issuer_dn": "CN=PSI-CA", "revoked": True, "serial_id": "1EB97F"}, "42"),
+    ]
+
+
+def test_subscriber_applies_events_and_resumes(stream_server):
+    client = AuthServerClient(stream_server.base_url, logging.getLogger(__name__), timeout=2)
+    agent = MagicMock()
+    subscriber = EventStreamSubscriber(client, agent, read_timeout=2, token="agentes")
+
+    subscriber.consume_once()
+    subscriber.consume_once()
+
+    assert agent.apply_event.call_args_list[1].args == (
+        "revocation", {"issuer_dn": "CN=PSI-CA", "revoked": True, "serial_id": "1EB97F"})
+    assert stream_server.last_event_ids == [None, "42"]
+    assert stream_server.authorizations == ["Bearer agentes", "Bearer agentes"]
+
+
+def test_rejected_event_id_resyncs(stream_server):
+    client = AuthServerClient(stream_server.base_url, logging.getLogger(__name__), timeout=2)
+    agent = MagicMock()
+    subscriber = EventStreamSubscriber(client, agent, read_timeout=2)
+    subscriber.last_event_id = "otra-replica:42"
+    stream_server.status = 400
+
+    with pytest.raises(AuthServerError):
+        subscriber.consume_once()
+
+    agent.apply_event.assert_called_once_with("resync", {})
+    assert subscriber.last_event_id is None
+
+
+def test_revocation_event_drops_decisions_and_keys():
+    cache = DecisionCache(allow_ttl=3600, deny_ttl=5)
+    keys_cache = AuthorizedKeysCache(ttl=3600)
+    entry = "ssh-rsa AAAAB3NzaC1yc2E= jane@example.com"
+    cache.put("01EB97F", "admin", {"allowed": True, "authorized_keys_entry": entry})
+    cache.put("ABC123", "admin", {"allowed": True, "authorized_keys_entry": None})
+    keys_cache.put("admin", entry)
+    grace_cache = MagicMock()
+    agent = ValidationAgent(MagicMock(), cache, grace_cache=grace_cache, keys_cache=keys_cache)
+
+    agent.apply_event("revocation", {"serial_id": "1eb97f", "revoked": True})
+
+    assert cache.get("01EB97F", "admin") is None
+    assert cache.get("ABC123", "admin") is not None
+    assert keys_cache.get("admin") == []
+    grace_cache.discard_serial.assert_called_once_with("1eb97f")
+
+
+def test_resync_event_drops_everything():
+    cache = DecisionCache(allow_ttl=3600, deny_ttl=5)
+    keys_cache = AuthorizedKeysCache(ttl=3600)
+    entry = "ssh-rsa AAAAB3NzaC1yc2E= jane@example.com"
+    cache.put("01EB97F", "admin", {"allowed": True, "authorized_keys_entry": entry})
+    keys_cache.put("admin", entry)
+    grace_cache = MagicMock()
+    agent = ValidationAgent(MagicMock(), cache, grace_cache=grace_cache, keys_cache=keys_cache)
+
+    agent.apply_event("resync", {})
+
+    assert len(cache) == 0
+    assert keys_cache.get("admin") == []
+    grace_cache.clear.assert_called_once_with()
+
+
+def test_policy_change_clears_decision_cache():
+    cache = DecisionCache(allow_ttl=3600, deny_ttl=5)
+    agent = ValidationAgent(MagicMock(), cache)
+    agent.apply_event("policy", {"version": "v1"})
+    cache.put("1EB97F", "admin", {"allowed": True})
+
+    agent.apply_event("policy", {"version": "v1"})
+    assert len(cache) == 1
+    agent.apply_event("policy", {"version": "v2"})
+    assert len(cache) == 0
@@ -0,0 +1,117 @@
+import hashlib
+import hmac
+import json
+import os
+import tempfile
+
+import pytest
+
+from grace_cache import GraceCache, canonical_decision, verify_decision
+
+SECRET = b"secret"
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def signed_decision(serial_id, username, expires_at, entry="ssh-rsa AAAA test"):
+    payload = canonical_decision(serial_id, username, True, entry, expires_at)
+    return {"allowed": True, "authorized_keys_entry": entry, "expires_at": expires_at,
+            "signature": hmac.new(SECRET, payload, hashlib.sha256).hexdigest()}
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture
+def grace_cache(clock):
+    return GraceCache(tempfile.mkdtemp(), SECRET, max_grace_seconds=600, clock=clock)
+
+
+def test_verify_decision_rejects_tampering():
+    decision = signed_decision("abc", "admin", 2000)
+
+    assert verify_decision(SECRET, "ABC", "admin", decision) is True
+    assert verify_decision(SECRET, "abc", "root", decision) is False
+    assert verify_decision(SECRET, "abc", "admin", dict(decision, expires_at=3000)) is False
+
+
+def test_store_and_lookup_signed_decision(grace_cache):
+    decision = signed_decision("abc", "admin", 2000)
+
+    assert grace_cache.store("abc", "admin", decision) is True
+    assert grace_cache.lookup("abc", "admin") == decision
+
+
+def test_unsigned_decision_is_not_stored(grace_cache):
+    assert grace_cache.store("abc", "admin", {"allowed": True, "authorized_keys_entry": "x"}) is False
+    assert grace_cache.lookup("abc", "admin") is None
+
+
+def test_lookup_honours_signed_expiry(grace_cache, clock):
+    grace_cache.store("abc", "admin", signed_decision("abc", "admin", 1100))
+
+    clock.now = 1100
+
+    assert grace_cache.lookup("abc", "admin") is None
+
+
+def test_lookup_honours_grace_window(grace_cache, clock):
+    grace_cache.store("abc", "admin", signed_decision("abc", "admin", 5000))
+
+    clock.now = 1000 + 600
+
+    assert grace_cache.lookup("abc", "admin") is None
+
+
+@pytest.mark.parametrize("record", [
+    {"stored_at": 1000, "decision": {"allowed": True, "expires_at": "2000", "signature": "x"}},
+    {"stored_at": 1000, "decision": {"allowed": True, "expires_at": None, "signature": 7}},
+    {"stored_at": 1000, "decision": ["no", "es", "un", "dict"]},
+    {"stored_at": "ayer", "decision": signed_decision("abc", "admin", 2000)},
+])
+def test_malformed_entry_is_a_miss(grace_cache, record):
+    grace_cache.store("abc", "admin", signed_decision("abc", "admin", 2000))
+    path = grace_cache._path("abc", "admin")  # pylint: disable=protected-access
+    with open(path, "w", encoding="utf-8") as file:
+        json.dump(record, file)
+
+    assert grace_cache.lookup("abc", "admin") is None
+    assert not os.path.exists(path)
+
+
+def test_discard_removes_decision(grace_cache):
+    grace_cache.store("abc", "admin", signed_decision("abc", "admin", 2000))
+
+    grace_cache.discard("abc", "admin")
+
+    assert grace_cache.lookup("abc", "admin") is None
+
+
+def test_discard_serial_removes_every_user(grace_cache):
+    grace_cache.store("1EB97F", "admin", signed_decision("1EB97F", "admin", 2000))
+    grace_cache.store("1EB97F", "deploy", signed_decision("1EB97F", "deploy", 2000))
+    grace_cache.store("ABC123", "admin", signed_decision("ABC123", "admin", 2000))
+
+    grace_cache.discard_serial("01eb97f")
+
+    assert grace_cache.lookup("1EB97F", "admin") is None
+    assert grace_cache.lookup("1EB97F", "deploy") is None
+    assert grace_cache.lookup("ABC123", "admin") is not None
+
+
+def test_clear_removes_every_decision(grace_cache):
+    grace_cache.store("1EB97F", "admin", signed_decision("1EB97F", "admin", 2000))
+    grace_cache.store("ABC123", "deploy", signed_decision("ABC123", "deploy", 2000))
+
+    grace_cache.clear()
+
+    assert grace_cache.lookup("1EB97F", "admin") is None
+    assert grace_cache.lookup("ABC123", "deploy") is None
@@ -0,0 +1,32 @@
+import pytest
+
+import main
+
+
+@pytest.fixture(autouse=True)
+def reset_mode(monkeypatch):
+    monkeypatch.setattr(main, "_authorized_keys_mode", None)
+
+
+def test_authorized_keys_mode_is_read_from_config(monkeypatch, tmp_path):
+    (tmp_path / "config.test.yaml").write_text('authorized_keys_mode: "command"\n')
+    monkeypatch.setenv("ENV", "test")
+    monkeypatch.setattr(main, "__file__", str(tmp_path / "main.py"))
+
+    assert main.get_authorized_keys_mode() == "command"
+
+
+@pytest.mark.parametrize("content", ["authorized_keys_mode: [command\n", "- command\n", "command\n"])
+def test_authorized_keys_mode_defaults_to_file_with_unusable_config(monkeypatch, tmp_path,
+                                                                   content):
+    (tmp_path / "config.test.yaml").write_text(content)
+    monkeypatch.setenv("ENV", "test")
+    monkeypatch.setattr(main, "__file__", str(tmp_path / "main.py"))
+
+    assert main.get_authorized_keys_mode() == "file"
+
+
+def test_authorized_keys_mode_defaults_to_file_without_config(monkeypatch):
+    monkeypatch.delenv("ENV", raising=False)
+
+    assert main.get_authorized_keys_mode() == "file"
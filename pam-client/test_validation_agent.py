@@ -0,0 +1,264 @@
+import base64
+import hashlib
+import json
+import os
+import socket
+import tempfile
+import threading
+from unittest.mock import MagicMock
+
+import pytest
+
+from auth_server_client import AuthResponse
+from validation_agent import (AgentServer, AuthorizedKeysCache, DecisionCache,
+                              ValidationAgent, ssh_key_fingerprint)
+
+KEY_BLOB = base64.b64encode(b"\x00\x00\x00\x07ssh-rsa-test-blob").decode()
+ENTRY = f'environment="REMOTEUSER=Jane Doe|admin" ssh-rsa {KEY_BLOB} jane@example.com'
+FINGERPRINT = "SHA256:" + base64.b64encode(
+    hashlib.sha256(base64.b64decode(KEY_BLOB)).digest()).decode().rstrip("=")
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture
+def cache(clock):
+    return DecisionCache(allow_ttl=30, deny_ttl=5, max_entries=2, clock=clock)
+
+
+@pytest.fixture
+def client():
+    client = MagicMock()
+    client.authenticate.return_value = AuthResponse(
+        allowed=True, authorized_keys_entry="ssh-rsa AAAA test")
+    return client
+
+
+@pytest.fixture
+def agent(client, cache):
+    return ValidationAgent(client, cache)
+
+
+def test_cache_expires_allow_and_deny_with_their_own_ttl(cache, clock):
+    cache.put("abc", "admin", {"allowed": True})
+    cache.put("def", "admin", {"allowed": False})
+
+    clock.now = 10
+    assert cache.get("ABC", "admin") == {"allowed": True}
+    assert cache.get("def", "admin") is None
+
+    clock.now = 31
+    assert cache.get("abc", "admin") is None
+
+
+def test_cache_evicts_least_recently_used(cache):
+    cache.put("a", "u", {"allowed": True})
+    cache.put("b", "u", {"allowed": True})
+    cache.get("a", "u")
+    cache.put("c", "u", {"allowed": True})
+
+    assert cache.get("b", "u") is None
+    assert cache.get("a", "u") is not None
+    assert len(cache) == 2
+
+
+def test_cache_invalidate_serial(cache):
+    cache.put("abc", "u1", {"allowed": True})
+    cache.put("abc", "u2", {"allowed": True})
+
+    cache.invalidate_serial("ABC")
+
+    assert len(cache) == 0
+
+
+def test_validate_uses_cache_on_repeat_logins(agent, client):
+    first = agent.handle({"op": "validate", "serial_id": "abc", "username": "admin"})
+    second = agent.handle({"op": "validate", "serial_id": "abc", "username": "admin"})
+
+    assert first == second
+    assert first["allowed"] is True
+    assert first["authorized_keys_entry"] == "ssh-rsa AAAA test"
+    client.authenticate.assert_called_once_with("abc", "admin")
+
+
+def test_validate_passes_the_ssh_certificate_through(agent, client):
+    client.authenticate.return_value = AuthResponse(
+        allowed=True, authorized_keys_entry="ssh-rsa AAAA test",
+        ssh_certificate="ssh-rsa-cert-v01@openssh.com AAAA")
+
+    response = agent.handle({"op": "validate", "serial_id": "abc", "username": "admin"})
+
+    assert response["ssh_certificate"] == "ssh-rsa-cert-v01@openssh.com AAAA"
+
+
+def test_validate_does_not_cache_errors(agent, client):
+    client.authenticate.side_effect = ConnectionError("down")
+
+    response = agent.handle({"op": "validate", "serial_id": "abc", "username": "admin"})
+    agent.handle({"op": "validate", "serial_id": "abc", "username": "admin"})
+
+    assert response["allowed"] is False
+    assert client.authenticate.call_count == 2
+
+
+def test_validate_requires_serial_and_username(agent, client):
+    response = agent.handle({"op": "validate", "serial_id": "abc"})
+
+    assert response["allowed"] is False
+    client.authenticate.assert_not_called()
+
+
+def test_agent_server_round_trip(agent):
+    socket_path = os.path.join(tempfile.mkdtemp(), "agent.sock")
+    server = AgentServer(socket_path, agent)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.connect(socket_path)
+            sock.sendall(json.dumps(
+                {"op": "validate", "serial_id": "abc", "username": "admin"}).encode() + b"\n")
+            response = json.loads(sock.makefile("rb").readline())
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    assert response["allowed"] is True
+    assert not os.path.exists(socket_path)
+
+
+def test_validate_falls_back_to_grace_cache_when_server_is_down(client, cache):
+    grace_cache = MagicMock()
+    grace_cache.lookup.return_value = {"allowed": True, "authorized_keys_entry": "entry"}
+    agent = ValidationAgent(client, cache, grace_cache=grace_cache)
+    client.authenticate.side_effect = ConnectionError("down")
+
+    response = agent.handle({"op": "validate", "serial_id": "abc", "username": "admin"})
+
+    assert response == {"allowed": True, "authorized_keys_entry": "entry", "grace": True}
+    grace_cache.lookup.assert_called_once_with("abc", "admin")
+
+
+def test_validate_discards_grace_decision_on_explicit_deny(client, cache):
+    grace_cache = MagicMock()
+    agent = ValidationAgent(client, cache, grace_cache=grace_cache)
+    client.authenticate.return_value = AuthResponse(allowed=False)
+
+    agent.handle({"op": "validate", "serial_id": "abc", "username": "admin"})
+
+    grace_cache.discard.assert_called_once_with("abc", "admin")
+
+
+def test_ssh_key_fingerprint_matches_openssh_format():
+    assert ssh_key_fingerprint(ENTRY) == FINGERPRINT
+    assert ssh_key_fingerprint("no key here") is None
+
+
+def test_authorized_keys_cache_lookup_by_user_and_fingerprint(clock):
+    keys_cache = AuthorizedKeysCache(ttl=60, clock=clock)
+    keys_cache.put("admin", ENTRY)
+
+    assert keys_cache.get("admin", FINGERPRINT) == [ENTRY]
+    assert keys_cache.get("admin") == [ENTRY]
+    assert keys_cache.get("admin", "SHA256:other") == []
+    assert keys_cache.get("root") == []
+
+    clock.now = 60
+    assert keys_cache.get("admin") == []
+
+
+def test_allowed_validation_registers_authorized_keys_entry(client, cache, clock):
+    keys_cache = AuthorizedKeysCache(ttl=60, clock=clock)
+    agent = ValidationAgent(client, cache, keys_cache=keys_cache)
+    client.authenticate.return_value = AuthResponse(allowed=True, authorized_keys_entry=ENTRY)
+
+    agent.handle({"op": "validate", "serial_id": "abc", "username": "admin"})
+    response = agent.handle({"op": "keys", "username": "admin", "fingerprint": FINGERPRINT})
+
+    assert response == {"entries": [ENTRY]}
+
+
+def test_authorized_keys_command_prints_agent_entries(client, cache, clock, capsys, monkeypatch):
+    import authorized_keys_command
+
+    keys_cache = AuthorizedKeysCache(ttl=60, clock=clock)
+    keys_cache.put("admin", ENTRY)
+    agent = ValidationAgent(client, cache, keys_cache=keys_cache)
+    socket_path = os.path.join(tempfile.mkdtemp(), "agent.sock")
+    monkeypatch.setattr(authorized_keys_command, "AGENT_SOCKET_PATH", socket_path)
+    server = AgentServer(socket_path, agent)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        exit_code = authorized_keys_command.main(["cmd", "admin", FINGERPRINT])
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    assert exit_code == 0
+    assert capsys.readouterr().out == ENTRY + "\n"
+
+
+def test_authorized_keys_command_prints_nothing_without_agent(capsys, monkeypatch):
+    import authorized_keys_command
+
+    monkeypatch.setattr(authorized_keys_command, "AGENT_SOCKET_PATH", "/nonexistent/agent.sock")
+
+    assert authorized_keys_command.main(["cmd", "admin"]) == 0
+    assert capsys.readouterr().out == ""
+
+
+@pytest.fixture
+def tickets(clock):
+    return DecisionCache(allow_ttl=3600, deny_ttl=0, clock=clock)
+
+
+@pytest.fixture
+def ticket_agent(client, cache, tickets):
+    client.authenticate.return_value = AuthResponse(
+        allowed=True, authorized_keys_entry=ENTRY, session_ticket="payload.mac")
+    client.verify_ticket.return_value = True
+    return ValidationAgent(client, cache, tickets=tickets)
+
+
+def test_expired_decision_is_renewed_with_its_session_ticket(ticket_agent, client, clock):
+    first = ticket_agent.validate("abc", "admin")
+    clock.now = 31
+
+    renewed = ticket_agent.validate("abc", "admin")
+
+    assert renewed == first
+    assert "session_ticket" not in renewed
+    assert client.authenticate.call_count == 1
+    client.verify_ticket.assert_called_once_with("abc", "admin", FINGERPRINT, "payload.mac")
+
+
+def test_rejected_session_ticket_falls_back_to_full_validation(ticket_agent, client, tickets, clock):
+    ticket_agent.validate("abc", "admin")
+    clock.now = 31
+    client.verify_ticket.return_value = False
+    client.authenticate.return_value = AuthResponse(allowed=False)
+
+    decision = ticket_agent.validate("abc", "admin")
+
+    assert decision["allowed"] is False
+    assert client.authenticate.call_count == 2
+    assert tickets.get("abc", "admin") is None
+
+
+def test_revocation_event_drops_session_tickets(ticket_agent, client, tickets):
+    ticket_agent.validate("abc", "admin")
+
+    ticket_agent.apply_event("revocation", {"serial_id": "ABC"})
+
+    assert tickets.get("abc", "admin") is None
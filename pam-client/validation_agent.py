@@ -0,0 +1,441 @@
+# validation_agent.py
+"""
+Long-lived validation agent for the bastion.
+
+The PAM module is loaded for every login, so it cannot keep connections or
+results between invocations. This agent runs as a small daemon, listens on a
+Unix socket and answers validation requests from the PAM hook using a pooled
+keep-alive client to the auth server and an in-memory decision cache.
+
+Protocol: the client writes one JSON object terminated by a newline and reads
+one JSON object terminated by a newline.
+
+    {"op": "validate", "serial_id": "1EB97F...", "username": "admin"}
+    {"allowed": true, "authorized_keys_entry": "environment=..."}
+
+With agent.event_stream enabled, revocation and policy events pushed by the
+auth server drop the affected cache entries at once (see event_stream.py).
+
+When the auth server issues session tickets, the agent keeps the ticket of
+each allowed decision and, once the decision expires from the cache, asks the
+server to verify the ticket instead of running a full validation.
+
+When a grace cache is configured, signed positive decisions are also kept on
+disk and honoured while the auth server is unreachable (see grace_cache.py).
+
+Allowed decisions also register their authorized_keys entry per
+(username, key fingerprint) so that sshd can fetch it through
+authorized_keys_command.py instead of reading ~/.ssh/authorized_keys.
+
+    {"op": "keys", "username": "admin", "fingerprint": "SHA256:..."}
+    {"entries": ["environment=..."]}
+"""
+import base64
+import hashlib
+import json
+import logging
+import os
+import re
+import socketserver
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Tuple
+
+from auth_server_client import AuthServerClient
+from event_stream import EventStreamSubscriber
+from grace_cache import GraceCache
+from load_config import load_config
+
+DEFAULT_SOCKET_PATH = "/run/rbac-agent/agent.sock"
+MAX_REQUEST_BYTES = 4096
+
+SSH_KEY_PATTERN = re.compile(
+    r"(?:^|\s)(?:ssh-rsa|ssh-ed25519|ecdsa-sha2-nistp\d+)\s+([A-Za-z0-9+/]+={0,2})(?:\s|$)"
+)
+
+
+def ssh_key_fingerprint(authorized_keys_entry: str) -> Optional[str]:
+    """Returns the OpenSSH SHA256 fingerprint (as printed by sshd's %f) of an entry's key."""
+    match = SSH_KEY_PATTERN.search(authorized_keys_entry)
+    if match is None:
+        return None
+    try:
+        blob = base64.b64decode(match.group(1), validate=True)
+    except ValueError:
+        return None
+    digest = base64.b64encode(hashlib.sha256(blob).digest()).decode("ascii")
+    return "SHA256:" + digest.rstrip("=")
+
+
+def _serial_key(serial_id: str) -> str:
+    return serial_id.upper().lstrip("0") or "0"
+
+
+class DecisionCache:
+    """Thread-safe TTL cache of auth decisions keyed by (serial_id, username)."""
+
+    def __init__(self, allow_ttl: float, deny_ttl: float,
+                 max_entries: int = 10000,
+                 clock: Callable[[], float] = time.monotonic):
+        self.allow_ttl = allow_ttl
+        self.deny_ttl = deny_ttl
+        self.max_entries = max_entries
+        self._clock = clock
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[float, dict]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, serial_id: str, username: str) -> Optional[dict]:
+        key = (serial_id.upper(), username)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, decision = entry
+            if self._clock() >= expires_at:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return decision
+
+    def put(self, serial_id: str, username: str, decision: dict):
+        ttl = self.allow_ttl if decision.get("allowed") else self.deny_ttl
+        if ttl <= 0:
+            return
+        key = (serial_id.upper(), username)
+        with self._lock:
+            self._entries[key] = (self._clock() + ttl, decision)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate_serial(self, serial_id: str) -> List[Tuple[str, dict]]:
+        """Drops every cached decision for the given certificate serial; returns (username, decision) pairs."""
+        serial_id = _serial_key(serial_id)
+        dropped = []
+        with self._lock:
+            for key in [key for key in self._entries if _serial_key(key[0]) == serial_id]:
+                dropped.append((key[1], self._entries.pop(key)[1]))
+        return dropped
+
+    def discard(self, serial_id: str, username: str):
+        with self._lock:
+            self._entries.pop((serial_id.upper(), username), None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class AuthorizedKeysCache:
+    """Thread-safe TTL cache of authorized_keys entries keyed by (username, fingerprint)."""
+
+    def __init__(self, ttl: float, max_entries: int = 10000,
+                 clock: Callable[[], float] = time.monotonic):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._clock = clock
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[float, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def put(self, username: str, authorized_keys_entry: str) -> bool:
+        fingerprint = ssh_key_fingerprint(authorized_keys_entry)
+        if fingerprint is None:
+            return False
+        key = (username, fingerprint)
+        with self._lock:
+            self._entries[key] = (self._clock() + self.ttl, authorized_keys_entry)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return True
+
+    def get(self, username: str, fingerprint: Optional[str] = None) -> List[str]:
+        """Returns the live entries of a user, restricted to one key when fingerprint is given."""
+        now = self._clock()
+        with self._lock:
+            if fingerprint is not None:
+                keys = [(username, fingerprint)]
+            else:
+                keys = [key for key in self._entries if key[0] == username]
+            entries = []
+            for key in keys:
+                entry = self._entries.get(key)
+                if entry is None:
+                    continue
+                if now >= entry[0]:
+                    del self._entries[key]
+                    continue
+                entries.append(entry[1])
+            return entries
+
+    def discard(self, username: str, authorized_keys_entry: str):
+        fingerprint = ssh_key_fingerprint(authorized_keys_entry)
+        with self._lock:
+            self._entries.pop((username, fingerprint), None)
+
+    def discard_user(self, username: str):
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == username]:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class ValidationAgent:
+    """Answers agent requests, going to the auth server only on cache misses."""
+
+    def __init__(self, client: AuthServerClient, cache: DecisionCache,
+                 logger: logging.Logger = logging.getLogger(__name__),
+                 grace_cache: Optional[GraceCache] = None,
+                 keys_cache: Optional[AuthorizedKeysCache] = None,
+                 tickets: Optional[DecisionCache] = None):
+        self.client = client
+        self.cache = cache
+        self.logger = logger
+        self.grace_cache = grace_cache
+        self.keys_cache = keys_cache
+        # Allowed decisions with their session ticket, kept longer than the decision cache
+        self.tickets = tickets
+        self.policy_version: Optional[str] = None
+
+    def handle(self, request: dict) -> dict:
+        op = request.get("op", "validate")
+        if op == "validate":
+            serial_id = request.get("serial_id")
+            username = request.get("username")
+            if not serial_id or not username:
+                return {"allowed": False, "error": "serial_id and username are required"}
+            decision = self.validate(serial_id, username)
+            self._register_keys(username, decision)
+            return decision
+        if op == "keys":
+            username = request.get("username")
+            if not username or self.keys_cache is None:
+                return {"entries": []}
+            return {"entries": self.keys_cache.get(username, request.get("fingerprint"))}
+        if op == "ping":
+            return {"ok": True}
+        return {"allowed": False, "error": f"unknown op: {op}"}
+
+    def validate(self, serial_id: str, username: str) -> dict:
+        cached = self.cache.get(serial_id, username)
+        if cached is not None:
+            self.logger.debug("Cache hit for serial %s and user %s", serial_id, username)
+            return cached
+        ticketed = self._validate_ticket(serial_id, username)
+        if ticketed is not None:
+            return ticketed
+        try:
+            response = self.client.authenticate(serial_id, username)
+        except Exception as e:  # pylint: disable=broad-except
+            # Errors are never cached so the next login retries the auth server
+            self.logger.error("Auth server call failed for serial %s: %s", serial_id, e)
+            return self._grace_decision(serial_id, username)
+        decision = {"allowed": response.allowed,
+                    "authorized_keys_entry": response.authorized_keys_entry,
+                    "expires_at": response.expires_at,
+                    "signature": response.signature,
+                    "ssh_certificate": response.ssh_certificate}
+        self.cache.put(serial_id, username, decision)
+        self._store_ticket(serial_id, username, decision, response.session_ticket)
+        if self.grace_cache is not None:
+            if decision["allowed"]:
+                self.grace_cache.store(serial_id, username, decision)
+            else:
+                self.grace_cache.discard(serial_id, username)
+        return decision
+
+    def apply_event(self, event_type: str, data: dict):
+        """Applies an event from the auth server's event stream (see event_stream.py)."""
+        if event_type == "revocation" and data.get("serial_id"):
+            self.invalidate_serial(data["serial_id"], revoked=data.get("revoked", True))
+        elif event_type == "resync":
+            self.resync()
+        elif event_type == "policy" and data.get("version"):
+            if self.policy_version is not None and data["version"] != self.policy_version:
+                self.logger.info("Access policy changed, clearing decision cache")
+                self.cache.clear()
+                if self.tickets is not None:
+                    self.tickets.clear()
+            self.policy_version = data["version"]
+
+    def resync(self):
+        """Drops every cached decision, for when events may have been missed."""
+        self.cache.clear()
+        if self.tickets is not None:
+            self.tickets.clear()
+        if self.keys_cache is not None:
+            self.keys_cache.clear()
+        if self.grace_cache is not None:
+            self.grace_cache.clear()
+        self.logger.info("Event stream resync, dropped all cached decisions")
+
+    def invalidate_serial(self, serial_id: str, revoked: bool = True):
+        dropped = self.cache.invalidate_serial(serial_id)
+        if self.tickets is not None:
+            self.tickets.invalidate_serial(serial_id)
+        if self.keys_cache is not None:
+            for username, decision in dropped:
+                if decision.get("authorized_keys_entry"):
+                    self.keys_cache.discard(username, decision["authorized_keys_entry"])
+        if revoked and self.grace_cache is not None:
+            self.grace_cache.discard_serial(serial_id)
+        self.logger.info("Serial %s %s, dropped %s cached decisions", serial_id,
+                         "revoked" if revoked else "unrevoked", len(dropped))
+
+    def _validate_ticket(self, serial_id: str, username: str) -> Optional[dict]:
+        """Returns the ticketed decision if the auth server still accepts its ticket."""
+        if self.tickets is None:
+            return None
+        ticketed = self.tickets.get(serial_id, username)
+        if ticketed is None:
+            return None
+        try:
+            valid = self.client.verify_ticket(
+                serial_id, username, ticketed["fingerprint"], ticketed["session_ticket"])
+        except Exception as e:  # pylint: disable=broad-except
+            # A full validation follows, which falls back to the grace cache if needed
+            self.logger.warning("Session ticket check failed for serial %s: %s", serial_id, e)
+            return None
+        if not valid:
+            self.tickets.discard(serial_id, username)
+            return None
+        self.logger.debug("Session ticket accepted for serial %s and user %s", serial_id, username)
+        decision = ticketed["decision"]
+        self.cache.put(serial_id, username, decision)
+        return decision
+
+    def _store_ticket(self, serial_id: str, username: str, decision: dict,
+                      session_ticket: Optional[str]):
+        if self.tickets is None or not decision["allowed"] or not session_ticket:
+            return
+        # The server binds the ticket to the key, so the entry's fingerprint is sent back with it
+        fingerprint = ssh_key_fingerprint(decision.get("authorized_keys_entry") or "")
+        if fingerprint is not None:
+            self.tickets.put(serial_id, username, {"allowed": True, "decision": decision,
+                                                   "fingerprint": fingerprint,
+                                                   "session_ticket": session_ticket})
+
+    def _register_keys(self, username: str, decision: dict):
+        entry = decision.get("authorized_keys_entry")
+        if self.keys_cache is not None and decision.get("allowed") and entry:
+            if not self.keys_cache.put(username, entry):
+                self.logger.warning("Could not fingerprint authorized_keys entry for user %s",
+                                    username)
+
+    def _grace_decision(self, serial_id: str, username: str) -> dict:
+        if self.grace_cache is not None:
+            decision = self.grace_cache.lookup(serial_id, username)
+            if decision is not None:
+                self.logger.warning("Using signed grace decision for serial %s and user %s",
+                                    serial_id, username)
+                return dict(decision, grace=True)
+        return {"allowed": False, "authorized_keys_entry": None,
+                "error": "auth server unavailable"}
+
+
+class _AgentRequestHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        line = self.rfile.readline(MAX_REQUEST_BYTES)
+        try:
+            request = json.loads(line)
+            if not isinstance(request, dict):
+                raise ValueError("request must be a JSON object")
+        except ValueError:
+            response = {"allowed": False, "error": "invalid request"}
+        else:
+            response = self.server.agent.handle(request)
+        self.wfile.write(json.dumps(response).encode("utf-8") + b"\n")
+
+
+class AgentServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """Threaded Unix socket server exposing a ValidationAgent."""
+    daemon_threads = True
+
+    def __init__(self, socket_path: str, agent: ValidationAgent, mode: int = 0o660):
+        self.agent = agent
+        self.socket_path = socket_path
+        # A stale socket left by a previous run would make bind() fail
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+        super().__init__(socket_path, _AgentRequestHandler)
+        os.chmod(socket_path, mode)
+
+    def server_close(self):
+        super().server_close()
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+
+
+def build_agent(config: Dict, logger: logging.Logger) -> ValidationAgent:
+    """Builds a ValidationAgent from the "auth_server" and "agent" config sections."""
+    auth_server = config["auth_server"]
+    agent_config = config.get("agent", {})
+    cert = None
+    if auth_server.get("client_certificate") and auth_server.get("client_key"):
+        cert = (auth_server["client_certificate"], auth_server["client_key"])
+    hedge_delay_ms = auth_server.get("hedge_delay_ms")
+    client = AuthServerClient(
+        base_url=auth_server.get("base_urls") or auth_server["base_url"],
+        logger=logger,
+        timeout=auth_server.get("timeout_seconds", 5.0),
+        pool_maxsize=auth_server.get("pool_maxsize", 10),
+        verify=auth_server.get("ca_bundle", True),
+        cert=cert,
+        hedge_delay=hedge_delay_ms / 1000 if hedge_delay_ms else None,
+    )
+    cache = DecisionCache(
+        allow_ttl=agent_config.get("allow_ttl_seconds", 30),
+        deny_ttl=agent_config.get("deny_ttl_seconds", 5),
+        max_entries=agent_config.get("max_entries", 10000),
+    )
+    grace_cache = None
+    if config.get("grace_cache"):
+        grace_cache = GraceCache.from_config(config["grace_cache"])
+    keys_cache = AuthorizedKeysCache(
+        ttl=agent_config.get("authorized_keys_ttl_seconds", 120),
+        max_entries=agent_config.get("max_entries", 10000),
+    )
+    tickets = None
+    if agent_config.get("session_ticket_ttl_seconds", 28800) > 0:
+        tickets = DecisionCache(
+            allow_ttl=agent_config.get("session_ticket_ttl_seconds", 28800),
+            deny_ttl=0,
+            max_entries=agent_config.get("max_entries", 10000),
+        )
+    return ValidationAgent(client, cache, logger, grace_cache=grace_cache,
+                           keys_cache=keys_cache, tickets=tickets)
+
+
+def main():
+    logging.basicConfig(level=logging.INFO,
+                        format="[%(asctime)s] %(levelname)s in %(module)s: %(message)s")
+    logger = logging.getLogger("validation_agent")
+    config = load_config(os.path.dirname(os.path.abspath(__file__)))
+    agent = build_agent(config, logger)
+    agent_config = config.get("agent", {})
+    if agent_config.get("event_stream"):
+        token = None
+        if agent_config.get("event_stream_token_path"):
+            with open(agent_config["event_stream_token_path"], "r", encoding="utf-8") as file:
+                token = file.read().strip()
+        EventStreamSubscriber(agent.client, agent, logger,
+                              read_timeout=agent_config.get("event_stream_timeout_seconds", 45),
+                              token=token).start()
+    socket_path = agent_config.get("socket_path", DEFAULT_SOCKET_PATH)
+    with AgentServer(socket_path, agent) as server:
+        logger.info("Validation agent listening on %s", socket_path)
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == "__main__":
+    main()